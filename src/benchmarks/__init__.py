@@ -0,0 +1,4 @@
+"""
+    Micro-benchmarks and load harnesses for the bot, run them from the `src` directory
+ex: `python -m benchmarks.timestamp_parsing`
+"""
@@ -0,0 +1,113 @@
+"""
+    Times the hot path lookups (nucleus user by USER_ID, whitelist, course watermarks) at 100k users, on the schema
+right before migration 0003 and again once it is applied. 0003 only indexes USER_ID, the whitelist and watermark
+lookups are already served by unique constraints and are kept as controls. Runs in a scratch schema that is dropped
+afterwards, needs a reachable PostgreSQL.
+
+Usage: python -m benchmarks.db_lookups [dsn] [users] [iterations]
+The dsn defaults to the [database] section of settings.ini.
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+
+import asyncpg
+
+from dependencies.database.migrator import migrate
+from dependencies.database.queries import QUERIES
+
+SCHEMA = 'nucleo_benchmark'
+# The baseline is the schema right before the hot path indexes, only 0003 is applied between the two runs. The
+# later migrations add unrelated tables and would make the comparison drift as they are added
+BASELINE_VERSION = 2
+INDEXES_VERSION = 3
+CLASSES = 200
+COURSES_PER_CLASS = 12
+
+
+def settings_dsn() -> str:
+    from config import Settings
+    configs = Settings()
+    return f'postgres://{configs.db_user}:{configs.db_password}@{configs.db_host}:{configs.db_port}/{configs.db_name}'
+
+
+async def seed(connection: asyncpg.Connection, users: int):
+    now = datetime.utcnow()
+    classes = [f'C{index:03d}' for index in range(CLASSES)]
+    discord_ids = random.sample(range(10 ** 17, 10 ** 18), users)
+    await connection.copy_records_to_table('NUCLEUS_CLASS', records=[(class_id,) for class_id in classes],
+                                           schema_name=SCHEMA)
+    await connection.copy_records_to_table(
+        'NUCLEUS_DISCORD_USERS', records=[(discord_id, f'user{index}') for index, discord_id in enumerate(discord_ids)],
+        columns=['DISCORD_ID', 'DISCORD_USERNAME'], schema_name=SCHEMA)
+    await connection.copy_records_to_table(
+        'NUCLEUS_USERS',
+        records=[(f'{index:07d}', 'First', 'Last', f'{index}@psgtech.ac.in', classes[index % CLASSES], 'cookies', now,
+                  discord_id) for index, discord_id in enumerate(discord_ids)],
+        columns=['USER_ID', 'FIRST_NAME', 'LAST_NAME', 'EMAIL', 'CLASS_ID', 'COOKIES', 'LAST_LOGIN', 'DISCORD_ID'],
+        schema_name=SCHEMA)
+    await connection.copy_records_to_table(
+        'USER_AUTH', records=[(discord_id, random.randint(0, 9)) for discord_id in discord_ids],
+        columns=['ITEM_ID', 'LEVEL'], schema_name=SCHEMA)
+    await connection.copy_records_to_table(
+        'CHANNEL_AUTH', records=[(index // 50, discord_id, 1) for index, discord_id in enumerate(discord_ids)],
+        columns=['SERVER_ID', 'CHANNEL_ID', 'WHITELIST_LEVEL'], schema_name=SCHEMA)
+    await connection.copy_records_to_table(
+        'NUCLEUS_COURSES',
+        records=[(class_id, f'{index:02d}{class_id}', f'Course {index}', now, now)
+                 for class_id in classes for index in range(COURSES_PER_CLASS)],
+        columns=['CLASS_ID', 'COURSE_ID', 'COURSE_NAME', 'ASSIGNMENTS_LAST_CHECKED', 'RESOURCES_LAST_CHECKED'],
+        schema_name=SCHEMA)
+    # Both runs start from an up to date visibility map, index only scans aren't held back by the fresh rows
+    await connection.execute('VACUUM ANALYZE')
+    return discord_ids
+
+
+async def time_lookups(connection: asyncpg.Connection, discord_ids: list, iterations: int) -> dict:
+    samples = random.sample(range(len(discord_ids)), iterations)
+    lookups = {
+        # No index on USER_ID before 0003, a sequential scan
+        'get_user': lambda index: (QUERIES['get_user'], f'{index:07d}'),
+        # Found through the CHANNEL_ID_UNIQUE index, before and after
+        'whitelist_check': lambda index: (QUERIES['whitelist_check'], index // 50, discord_ids[index]),
+        # Found through the leading CLASS_ID of the UNIQUE_ENTRY_COURSES index, before and after
+        'get_courses_last_checked': lambda index: (QUERIES['get_courses_last_checked'], f'C{index % CLASSES:03d}'),
+    }
+    results = {}
+    for name, arguments in lookups.items():
+        timings = []
+        for index in samples:
+            start = time.perf_counter()
+            await connection.fetch(*arguments(index))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = (timings[len(timings) // 2], timings[int(len(timings) * 0.99)])
+    return results
+
+
+async def main(dsn: str, users: int = 100000, iterations: int = 2000):
+    connection = await asyncpg.connect(dsn, server_settings={'search_path': SCHEMA})
+    try:
+        await connection.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}')
+        await migrate(connection, target=BASELINE_VERSION)
+        print(f'Seeding {users} users')
+        discord_ids = await seed(connection, users)
+        before = await time_lookups(connection, discord_ids, iterations)
+        await migrate(connection, target=INDEXES_VERSION)
+        await connection.execute('ANALYZE')
+        after = await time_lookups(connection, discord_ids, iterations)
+
+        print(f'{"query":<28}{"p50 before":>12}{"p50 after":>12}{"p99 before":>12}{"p99 after":>12}  (ms)')
+        for name in before:
+            print(f'{name:<28}{before[name][0] * 1000:>12.3f}{after[name][0] * 1000:>12.3f}'
+                  f'{before[name][1] * 1000:>12.3f}{after[name][1] * 1000:>12.3f}')
+    finally:
+        await connection.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        await connection.close()
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(sys.argv[1] if len(sys.argv) > 1 else settings_dsn(),
+                                                     *map(int, sys.argv[2:4])))
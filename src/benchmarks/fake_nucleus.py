@@ -0,0 +1,273 @@
+"""
+    A local stand-in for the Nucleus API, serving `/oauth` and `/server` with the `path` header routing used by
+`Nucleus` on synthetic classes, courses, assignments and resources. Latency, server errors and session expiry can
+be injected, and `upload` adds new items so the detector has something to find.
+
+Usage: python -m benchmarks.fake_nucleus [--port 8080] [--classes 2] [--accounts 10] [--courses 6] [--latency 0.05]
+Point the client at it with `Nucleus.use_base_url('http://localhost:8080')`, every account logs in with `password`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from aiohttp import web
+
+PASSWORD = 'password'
+RESOURCE_TYPES = ['book', 'questions', 'notes', 'presentation', 'homework', 'worksheet']
+SESSION_COOKIE = 'connect.sid'
+
+
+def nucleus_timestamp(timestamp: datetime) -> str:
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class SyntheticClass:
+    """One class with its students, courses and uploads, generated from a seed"""
+
+    def __init__(self, class_id: str, accounts: int, courses: int, assignments_per_course: int = 5,
+                 resources_per_course: int = 20, seed: int = 0):
+        self.random = random.Random(f'{class_id}-{seed}')
+        self.class_id = class_id
+        self.usernames = [f'{class_id}{index:02d}' for index in range(1, accounts + 1)]
+        self.courses = [{'courseId': f'{class_id[:2]}XC{index:02d}', 'courseName': f'Course {index}'}
+                        for index in range(1, courses + 1)]
+        self.assignments: List[dict] = []
+        self.resources: Dict[str, List[dict]] = {course['courseId']: [] for course in self.courses}
+        # Submissions of every student, by assignment title
+        self.submitted: Dict[str, set] = {username: set() for username in self.usernames}
+        start = datetime.utcnow() - timedelta(days=60)
+        for course in self.courses:
+            for _ in range(assignments_per_course):
+                self.add_assignment(course, start + timedelta(minutes=self.random.randint(0, 60 * 24 * 59)))
+            for _ in range(resources_per_course):
+                self.add_resource(course, start + timedelta(minutes=self.random.randint(0, 60 * 24 * 59)))
+        for username in self.usernames:
+            for assignment in self.assignments:
+                if self.random.random() < 0.7:
+                    self.submitted[username].add(assignment['title'])
+
+    def add_assignment(self, course: dict, added_on: datetime) -> dict:
+        number = len(self.assignments) + 1
+        assignment = {
+            '_id': f'{self.class_id}-A{number}',
+            'title': f'{course["courseId"]} Assignment {number}',
+            'courseId': course['courseId'],
+            'courseName': course['courseName'],
+            'description': f'Solve the problems of unit {self.random.randint(1, 5)}.',
+            'addedOn': nucleus_timestamp(added_on),
+            'targetDateTime': nucleus_timestamp(added_on + timedelta(days=7)),
+            'question': {'details': {'previewLink': f'https://example.com/{self.class_id}/assignments/{number}'}},
+        }
+        self.assignments.append(assignment)
+        return assignment
+
+    def add_resource(self, course: dict, added_on: datetime) -> dict:
+        resources = self.resources[course['courseId']]
+        number = len(resources) + 1
+        resource = {
+            '_id': f'{course["courseId"]}-R{number}',
+            'name': f'{course["courseName"]} Material {number}',
+            'courseId': course['courseId'],
+            'type': self.random.choice(RESOURCE_TYPES),
+            'tags': [f'unit {self.random.randint(1, 5)}'],
+            'details': {'addedOn': nucleus_timestamp(added_on),
+                        'previewLink': f'https://example.com/{course["courseId"]}/resources/{number}'},
+        }
+        resources.append(resource)
+        return resource
+
+    def upload(self, assignments: int = 1, resources: int = 1):
+        """Adds new items now, as a teacher uploading them"""
+        for _ in range(assignments):
+            self.add_assignment(self.random.choice(self.courses), datetime.utcnow())
+        for _ in range(resources):
+            self.add_resource(self.random.choice(self.courses), datetime.utcnow())
+
+    def assignments_of(self, username: str, course_id: str) -> List[dict]:
+        result = []
+        for assignment in self.assignments:
+            if course_id != 'all' and assignment['courseId'] != course_id:
+                continue
+            submission = {}
+            if assignment['title'] in self.submitted[username]:
+                submission = {'details': {'addedOn': assignment['addedOn'],
+                                          'previewLink': assignment['question']['details']['previewLink'] + '/sub'}}
+            result.append({**assignment, 'submissions': {'submissionDetails': submission}})
+        return result
+
+
+class FakeNucleus:
+    """
+    latency: float - Mean added latency in seconds, the actual delay is uniform in [0.5, 1.5] of it.
+    error_rate: float - Share of requests answered with a 500.
+    expiry_rate: float - Share of requests after which the session of the caller expires.
+    session_ttl: float - Seconds after which a session expires, never when None.
+    """
+
+    def __init__(self, classes: List[SyntheticClass], latency: float = 0.0, error_rate: float = 0.0,
+                 expiry_rate: float = 0.0, session_ttl: Optional[float] = None):
+        self.classes = {synthetic_class.class_id: synthetic_class for synthetic_class in classes}
+        self.accounts = {username: synthetic_class for synthetic_class in classes
+                         for username in synthetic_class.usernames}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.expiry_rate = expiry_rate
+        self.session_ttl = session_ttl
+        self.sessions: Dict[str, tuple] = {}
+        self.requests = 0
+        self.logins = 0
+        self.not_modified = 0
+        self.app = web.Application()
+        self.app.router.add_post('/oauth', self.oauth)
+        self.app.router.add_get('/server', self.server)
+        self.__runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serves in the running loop and returns the base url, port 0 picks a free port"""
+        self.__runner = web.AppRunner(self.app)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, host, port).start()
+        self.base_url = f'http://{host}:{self.__runner.addresses[0][1]}'
+        return self.base_url
+
+    async def close(self):
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    def login(self, username: str) -> str:
+        """Creates a session directly, for seeding accounts without going through `/oauth`"""
+        token = secrets.token_hex(16)
+        self.sessions[token] = (username, datetime.utcnow())
+        return token
+
+    async def __inject(self) -> Optional[web.Response]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if self.error_rate and random.random() < self.error_rate:
+            return web.Response(status=500, text='Internal Server Error')
+        return None
+
+    def __session_user(self, request: web.Request) -> Optional[str]:
+        token = request.cookies.get(SESSION_COOKIE)
+        session = self.sessions.get(token)
+        if session is None:
+            return None
+        username, created_at = session
+        if self.session_ttl is not None and (datetime.utcnow() - created_at).total_seconds() > self.session_ttl:
+            del self.sessions[token]
+            return None
+        if self.expiry_rate and random.random() < self.expiry_rate:
+            del self.sessions[token]
+        return username
+
+    async def oauth(self, request: web.Request) -> web.Response:
+        failure = await self.__inject()
+        if failure is not None:
+            return failure
+        form = await request.post()
+        username = form.get('rollNo')
+        if username not in self.accounts:
+            return web.json_response({'status': 'Failure', 'message': 'User not found'})
+        if form.get('password') != PASSWORD:
+            return web.json_response({'status': 'Failure', 'message': 'Invalid Password'})
+        self.logins += 1
+        response = web.json_response({'status': 'Success'})
+        response.set_cookie(SESSION_COOKIE, self.login(username))
+        return response
+
+    async def server(self, request: web.Request) -> web.Response:
+        failure = await self.__inject()
+        if failure is not None:
+            return failure
+        username = self.__session_user(request)
+        if username is None:
+            # Nucleus answers expired sessions with its login page
+            return web.Response(text='<html><body>Login</body></html>', content_type='text/html')
+        synthetic_class = self.accounts[username]
+        url = urlsplit(request.headers.get('path', ''))
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        data = self.route(synthetic_class, username, url.path, query)
+        if data is None:
+            return web.json_response({'status': 'Failure', 'message': 'Not Found'}, status=404)
+        body = json.dumps({'status': 'Success', 'data': data}).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
+
+    @staticmethod
+    def route(synthetic_class: SyntheticClass, username: str, path: str, query: dict):
+        if path == '/profile':
+            return {'firstName': 'Student', 'lastName': username, 'email': f'{username.lower()}@psgtech.ac.in',
+                    'mobileNo': '9000000000', 'classId': synthetic_class.class_id,
+                    'courses': {'core': synthetic_class.courses, 'elective': []}}
+        if path == '/assignment':
+            return {'assignments': synthetic_class.assignments_of(username, query.get('courseId', 'all'))}
+        if path == '/resources':
+            return synthetic_class.resources.get(query.get('courseId'))
+        if path.startswith('/schedule/schedule/'):
+            courses = synthetic_class.courses
+            schedule = {f'{8 + hour:02d}:30 - {9 + hour:02d}:20': [{'title': course['courseName'],
+                                                                    'courseId': course['courseId']}]
+                        for hour, course in enumerate(courses[:6])}
+            return {'schedule': schedule,
+                    'meetUrls': {course['courseId']: f'https://meet.google.com/{course["courseId"].lower()}'
+                                 for course in courses}}
+        if path.startswith('/class/'):
+            return {'classId': synthetic_class.class_id, 'courses': synthetic_class.courses}
+        return None
+
+    def stats(self) -> dict:
+        return {'requests': self.requests, 'logins': self.logins, 'not_modified': self.not_modified,
+                'sessions': len(self.sessions)}
+
+
+def generate_classes(classes: int, accounts: int, courses: int, seed: int = 0) -> List[SyntheticClass]:
+    return [SyntheticClass(f'2{index}PW', accounts, courses, seed=seed) for index in range(classes)]
+
+
+async def serve(arguments: argparse.Namespace):
+    fake = FakeNucleus(generate_classes(arguments.classes, arguments.accounts, arguments.courses),
+                       arguments.latency, arguments.error_rate, arguments.expiry_rate, arguments.session_ttl)
+    base_url = await fake.start(arguments.host, arguments.port)
+    print(f'Fake Nucleus serving on {base_url}, accounts: {", ".join(sorted(fake.accounts))}')
+    try:
+        while True:
+            await asyncio.sleep(arguments.upload_interval or 3600)
+            if arguments.upload_interval:
+                for synthetic_class in fake.classes.values():
+                    synthetic_class.upload()
+    finally:
+        await fake.close()
+
+
+def argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--classes', type=int, default=2)
+    parser.add_argument('--accounts', type=int, default=10, help='accounts per class')
+    parser.add_argument('--courses', type=int, default=6, help='courses per class')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--expiry-rate', type=float, default=0.0)
+    parser.add_argument('--session-ttl', type=float, default=None)
+    parser.add_argument('--upload-interval', type=float, default=0, help='seconds between uploads, 0 disables')
+    return parser
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.get_event_loop().run_until_complete(serve(argument_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,298 @@
+"""
+    Load harness for the Nucleus side of the bot: runs the real `NucleusCog` against the local `fake_nucleus`
+server with N accounts x M courses, drives `assignments_detector` ticks and the schedule/assignments/resources
+commands, and reports throughput with p50/p99 latencies.
+
+The database is replaced by an in-memory store and the Discord output by recorders, so the numbers cover the
+Nucleus round trips, caching and the detector's own work.
+
+Usage: python -m benchmarks.load_test [--classes 2] [--accounts 25] [--courses 8] [--ticks 5] [--requests 500]
+                                      [--concurrency 50] [--latency 0.05] [--error-rate 0] [--expiry-rate 0]
+                                      [--conn-limit-per-host 10] [--max-retries 2] [--retry-backoff 0.05] [--trace]
+                                      [--log-level WARNING]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List
+
+from benchmarks.fake_nucleus import PASSWORD, SESSION_COOKIE, FakeNucleus, generate_classes
+from bot.cogs import nucleus_cog
+from dependencies.log import setup_logging
+from dependencies.nucleus import Nucleus
+from dependencies.session import EndpointProfile
+from dependencies.tracing import Tracer
+from dependencies.utils import parse_nucleus_timestamp
+
+
+class InMemoryDatabase:
+    """The subset of `Database` used by `NucleusCog`, kept in dictionaries"""
+
+    def __init__(self):
+        self.healthy = True
+        self.alert_accounts: Dict[str, list] = {}
+        self.users: Dict[int, list] = {}
+        self.courses: Dict[str, Dict[str, list]] = defaultdict(dict)
+        self.alert_channels: Dict[str, list] = defaultdict(list)
+        self.outbox: Dict[tuple, tuple] = {}
+
+    async def get_alert_accounts(self):
+        return [(username, *account) for username, account in self.alert_accounts.items()]
+
+    async def update_alert_account(self, user_id: str, cookies: str, password: str):
+        self.alert_accounts[user_id][0] = cookies
+        self.alert_accounts[user_id][2] = password
+        self.alert_accounts[user_id][5] = datetime.now()
+
+    async def update_alert_account_backoff(self, user_id: str, failure_count: int, next_run_at):
+        self.alert_accounts[user_id][3:5] = [failure_count, next_run_at]
+
+    async def get_courses_last_checked(self, class_id: str) -> dict:
+        return {course_id: tuple(last_checked) for course_id, last_checked in self.courses[class_id].items()}
+
+    async def record_detection(self, assignment_updates, resource_updates, alerts):
+        for index, updates in enumerate((assignment_updates, resource_updates)):
+            for class_id, course_id, new_date in updates:
+                last_checked = self.courses[class_id][course_id]
+                last_checked[index] = max(last_checked[index], new_date)
+        for alert in alerts:
+            self.outbox.setdefault((alert[2], alert[4], alert[5]), alert)
+
+    async def get_alert_details(self, class_id: str):
+        return self.alert_channels[class_id]
+
+    async def get_user_by_discord_id(self, discord_id: int):
+        return self.users.get(discord_id)
+
+    async def set_nucleus_user_expired(self, user_id: str, expired: bool):
+        for user in self.users.values():
+            if user[0] == user_id:
+                user[11] = expired
+
+
+class RecordingHTTP:
+    def __init__(self):
+        self.requests = 0
+
+    async def request(self, route, **kwargs):
+        self.requests += 1
+
+
+class HarnessBot:
+    def __init__(self, db: InMemoryDatabase):
+        self.db = db
+        self.http = RecordingHTTP()
+        self.alert_dispatcher = SimpleNamespace(wake=lambda: None)
+        self.tracer = Tracer()
+        # A single process owns every class
+        self.detector_ownership = SimpleNamespace(owns=lambda class_id: True)
+        self.configs = SimpleNamespace(
+            detector_max_accounts=5, detector_account_timeout=300, detector_backoff_base=300,
+            detector_backoff_max=21600, detector_backoff_jitter=0.2, detector_keepalive_interval=60,
+            detector_cookie_max_age=86400, detector_cookie_refresh_margin=3600, detector_cookie_refresh_spread=0.1,
+            detector_max_logins=2, cache_ttls={'schedule': 300, 'assignments': 60, 'resources': 300, 'profile': 3600},
+            cache_stale_ttl=600)
+        self.__never_ready = asyncio.Event()
+
+    async def wait_until_ready(self):
+        # Keeps the cog's own loops idle, the harness runs the ticks itself
+        await self.__never_ready.wait()
+
+    def get_channel(self, _channel_id):
+        return None
+
+    def get_guild(self, _guild_id):
+        return None
+
+
+class RecordingChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.messages = 0
+
+    async def send(self, *args, **kwargs):
+        self.messages += 1
+
+
+class HarnessContext:
+    def __init__(self, bot: HarnessBot, discord_id: int):
+        self.bot = bot
+        self.channel = RecordingChannel(discord_id)
+        dm_channel = RecordingChannel(discord_id + 1)
+        self.author = SimpleNamespace(id=discord_id, dm_channel=dm_channel, send=dm_channel.send)
+        self.message = SimpleNamespace(author=self.author)
+
+    async def send(self, *args, **kwargs):
+        await self.channel.send(*args, **kwargs)
+
+    async def reply(self, *args, **kwargs):
+        await self.channel.send(*args, **kwargs)
+
+
+async def record_paginated(ctx, channel, source, timeout: float = 120.0):
+    # Only the first page is rendered, as the menu would
+    source.build_embed(await source.get_page(0))
+    await channel.send()
+
+
+async def record_packed_embeds(ctx, channel, embeds, max_messages: int = 3):
+    await channel.send()
+
+
+def percentile(sorted_values: List[float], quantile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(quantile * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def report(name: str, latencies: List[float], elapsed: float, unit: str):
+    latencies = sorted(latencies)
+    print(f'{name:<24}{len(latencies):>8} {unit:<10}{len(latencies) / elapsed:>10.1f}/s'
+          f'{percentile(latencies, 0.5) * 1000:>10.1f} ms p50{percentile(latencies, 0.99) * 1000:>10.1f} ms p99')
+
+
+def seed(db: InMemoryDatabase, fake: FakeNucleus):
+    discord_id = 10 ** 17
+    for synthetic_class in fake.classes.values():
+        db.alert_channels[synthetic_class.class_id] = [(discord_id, discord_id, discord_id)]
+        # Watermarks start at the latest existing upload, as left by a previous detector run
+        for course in synthetic_class.courses:
+            course_id = course['courseId']
+            assignments = [parse_nucleus_timestamp(assignment['addedOn'], aware=False)
+                           for assignment in synthetic_class.assignments if assignment['courseId'] == course_id]
+            resources = [parse_nucleus_timestamp(resource['details']['addedOn'], aware=False)
+                         for resource in synthetic_class.resources[course_id]]
+            db.courses[synthetic_class.class_id][course_id] = [max(assignments, default=datetime.min),
+                                                               max(resources, default=datetime.min)]
+        for username in synthetic_class.usernames:
+            discord_id += 2
+            cookies = json.dumps({SESSION_COOKIE: fake.login(username)})
+            # Cookies, class, password, failure count, next run, updated at
+            db.alert_accounts[username] = [cookies, synthetic_class.class_id, PASSWORD, 0, None, datetime.now()]
+            db.users[discord_id] = [username, 'Student', username, '', '', synthetic_class.class_id, 2, None,
+                                    cookies, None, None, False, discord_id]
+
+
+async def print_report(report: str):
+    print(report)
+
+
+async def run_detector(cog: nucleus_cog.NucleusCog, fake: FakeNucleus, db: InMemoryDatabase, ticks: int,
+                       trace: bool = False):
+    account_latencies = []
+    if trace:
+        cog.bot.tracer.arm('detector', ticks, callback=print_report)
+    detect_account_changes = cog._NucleusCog__detect_account_changes
+
+    async def timed_detection(user):
+        start = time.perf_counter()
+        try:
+            return await detect_account_changes(user)
+        finally:
+            account_latencies.append(time.perf_counter() - start)
+
+    cog._NucleusCog__detect_account_changes = timed_detection
+    await cog.session_pool.sync()
+    tick_latencies = []
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for synthetic_class in fake.classes.values():
+            synthetic_class.upload()
+        tick_start = time.perf_counter()
+        await cog.assignments_detector.coro(cog)
+        tick_latencies.append(time.perf_counter() - tick_start)
+        # Expired sessions are logged in again between ticks, as the keep-alive would
+        await cog.session_pool.refresh_due()
+    elapsed = time.perf_counter() - start
+    report('detector tick', tick_latencies, elapsed, 'ticks')
+    report('detector account', account_latencies, elapsed, 'accounts')
+    print(f'{"alerts queued":<24}{len(db.outbox):>8}')
+
+
+async def run_commands(cog: nucleus_cog.NucleusCog, bot: HarnessBot, fake: FakeNucleus, db: InMemoryDatabase,
+                       requests: int, concurrency: int):
+    latencies = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+    discord_ids = list(db.users)
+
+    async def invoke(command: str):
+        discord_id = random.choice(discord_ids)
+        ctx = HarnessContext(bot, discord_id)
+        async with semaphore:
+            start = time.perf_counter()
+            if command == 'schedule':
+                await cog.schedule.callback(cog, ctx)
+            elif command == 'assignments':
+                await cog.assignments.callback(cog, ctx, random.choice(['', 'all']))
+            else:
+                class_id = db.users[discord_id][5]
+                course_id = random.choice(fake.classes[class_id].courses)['courseId']
+                await cog.resources.callback(cog, ctx, course_id)
+            latencies[command].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(invoke(random.choice(['schedule', 'assignments', 'resources'])) for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    for command, command_latencies in sorted(latencies.items()):
+        report(command, command_latencies, elapsed, 'requests')
+    report('all commands', [latency for values in latencies.values() for latency in values], elapsed, 'requests')
+    print(f'{"response cache":<24}{cog.response_cache.stats()}')
+    print(f'{"users marked expired":<24}{sum(1 for user in db.users.values() if user[11]):>8}')
+
+
+async def main(arguments: argparse.Namespace):
+    log_listener = setup_logging(arguments.log_level, {'aiohttp.access': 'WARNING'}, json_output=False)
+    fake = FakeNucleus(generate_classes(arguments.classes, arguments.accounts, arguments.courses),
+                       arguments.latency, arguments.error_rate, arguments.expiry_rate)
+    Nucleus.use_profile(EndpointProfile(await fake.start(), conn_limit_per_host=arguments.conn_limit_per_host,
+                                        max_retries=arguments.max_retries, retry_backoff=arguments.retry_backoff,
+                                        retry_statuses=(500, 502, 503, 504)))
+    # The Discord side is recorded instead of sent, the menus need a gateway connection
+    nucleus_cog.send_paginated = record_paginated
+    nucleus_cog.send_packed_embeds = record_packed_embeds
+    db = InMemoryDatabase()
+    seed(db, fake)
+    bot = HarnessBot(db)
+    cog = nucleus_cog.NucleusCog(bot)
+    print(f'{arguments.classes} classes x {arguments.accounts} accounts x {arguments.courses} courses, '
+          f'latency {arguments.latency * 1000:.0f} ms, errors {arguments.error_rate:.0%}, '
+          f'expiry {arguments.expiry_rate:.0%}')
+    try:
+        await run_detector(cog, fake, db, arguments.ticks, arguments.trace)
+        await run_commands(cog, bot, fake, db, arguments.requests, arguments.concurrency)
+        print(f'{"fake nucleus":<24}{fake.stats()}')
+        print(f'{"nucleus session":<24}{dict(retries=Nucleus.session.retries)}')
+    finally:
+        cog.assignments_detector.cancel()
+        cog.cookie_keepalive.cancel()
+        await Nucleus.session.close()
+        await fake.close()
+        log_listener.stop()
+
+
+def argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('--classes', type=int, default=2)
+    parser.add_argument('--accounts', type=int, default=25, help='accounts per class')
+    parser.add_argument('--courses', type=int, default=8, help='courses per class')
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--expiry-rate', type=float, default=0.0)
+    parser.add_argument('--conn-limit-per-host', type=int, default=EndpointProfile().conn_limit_per_host)
+    parser.add_argument('--max-retries', type=int, default=EndpointProfile().max_retries)
+    parser.add_argument('--retry-backoff', type=float, default=0.05)
+    parser.add_argument('--log-level', default='WARNING', help='level of the bot logs printed along the report')
+    parser.add_argument('--trace', action='store_true', help='print the tracer report of the detector ticks')
+    return parser
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(argument_parser().parse_args()))
@@ -0,0 +1,59 @@
+"""
+    Compares `parse_nucleus_timestamp` against the `datetime.strptime` + offset
+it replaced, for unique strings (cold cache) and repeated strings (as seen by the detector).
+
+Usage: python -m benchmarks.timestamp_parsing [iterations]
+"""
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from dependencies.utils import NUCLEUS_TIMESTAMP_FORMAT, parse_nucleus_timestamp, nucleus_timestamp_to_ist
+
+
+def generate_timestamps(count: int):
+    start = datetime(2021, 1, 1)
+    return [(start + timedelta(seconds=random.randint(0, 10 ** 8), milliseconds=random.randint(0, 999)))
+            .strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z' for _ in range(count)]
+
+
+def strptime_ist(timestamp: str):
+    return datetime.strptime(timestamp, NUCLEUS_TIMESTAMP_FORMAT) + timedelta(hours=5, minutes=30)
+
+
+def report(name: str, seconds: float, iterations: int, baseline: float = None):
+    per_call = seconds / iterations * 10 ** 6
+    speedup = f'  ({baseline / seconds:.1f}x)' if baseline else ''
+    print(f'{name:<40}{per_call:>8.3f} us/call{speedup}')
+
+
+def main(iterations: int = 100000):
+    unique = generate_timestamps(iterations)
+    repeated = generate_timestamps(200) * (iterations // 200)
+
+    for assertion_timestamp in unique[:1000]:
+        assert parse_nucleus_timestamp(assertion_timestamp, aware=False) == \
+               datetime.strptime(assertion_timestamp, NUCLEUS_TIMESTAMP_FORMAT)
+
+    print(f'{iterations} timestamps')
+    baseline = timeit.timeit(lambda: [strptime_ist(timestamp) for timestamp in unique], number=1)
+    report('strptime + timedelta (unique)', baseline, iterations)
+    parse_nucleus_timestamp.cache_clear()
+    seconds = timeit.timeit(lambda: [nucleus_timestamp_to_ist(timestamp) for timestamp in unique], number=1)
+    report('nucleus_timestamp_to_ist (unique)', seconds, iterations, baseline)
+    parse_nucleus_timestamp.cache_clear()
+    seconds = timeit.timeit(lambda: [parse_nucleus_timestamp(timestamp, aware=False) for timestamp in unique],
+                            number=1)
+    report('parse_nucleus_timestamp (unique)', seconds, iterations, baseline)
+
+    baseline = timeit.timeit(lambda: [strptime_ist(timestamp) for timestamp in repeated], number=1)
+    report('strptime + timedelta (repeated)', baseline, len(repeated))
+    parse_nucleus_timestamp.cache_clear()
+    seconds = timeit.timeit(lambda: [parse_nucleus_timestamp(timestamp, aware=False) for timestamp in repeated],
+                            number=1)
+    report('parse_nucleus_timestamp (repeated)', seconds, len(repeated), baseline)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+import aiohttp
+import discord
+
+from bot.bot_utils import pack_embeds, send_embeds
+from dependencies.database import Database, OutboxAlert
+
+log = logging.getLogger(__name__)
+
+
+def alert_type(alerts: List[OutboxAlert]) -> str:
+    item_types = {alert.item_type for alert in alerts}
+    if item_types == {'assignment', 'resource'}:
+        return 'Assignments + Resources'
+    return 'Assignments' if 'assignment' in item_types else 'Resources'
+
+
+class AlertDispatcher:
+    """
+    Delivers the detector alerts queued in `ALERT_OUTBOX`.
+
+    Alerts are leased with `FOR UPDATE SKIP LOCKED`, so a second instance never picks the same rows and the rows of a
+    dispatcher that died are picked up again once the lease runs out. A row is marked sent only after Discord accepted
+    the message, delivery is at-least-once. Channels are served concurrently, each one in order with its alerts packed
+    into as few messages as the embed limits allow, through the bot's HTTP client which waits out the Discord rate
+    limits.
+    """
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, bot, db: Database, batch_size: int = 100, poll_interval: float = 5, lease: float = 60,
+                 max_attempts: int = 8, retry_delay: float = 30, retention_days: int = 30):
+        self.bot = bot
+        self.db = db
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention_days = retention_days
+        self.sent = 0
+        self.failed = 0
+        # Set by `start`, `wake` does nothing before that
+        self.__wake: Optional[asyncio.Event] = None
+        self.__task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.__task is not None:
+            return
+        self.__wake = asyncio.Event()
+        self.__task = asyncio.ensure_future(self.__run())
+
+    def wake(self):
+        """Called by the detector after queueing alerts so they don't wait for the next poll"""
+        if self.__wake is not None:
+            self.__wake.set()
+
+    async def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    async def __run(self):
+        await self.bot.wait_until_ready()
+        last_prune = 0.0
+        while True:
+            self.__wake.clear()
+            try:
+                # Claims would only fail while the database is down, the alerts wait in the outbox meanwhile
+                claimed = await self.dispatch_once() if self.db.healthy else 0
+                if time.monotonic() - last_prune > self.PRUNE_INTERVAL:
+                    await self.db.prune_alert_outbox(self.retention_days, self.max_attempts)
+                    last_prune = time.monotonic()
+            except Exception:
+                log.exception('Alert dispatcher error')
+                claimed = 0
+            # A full batch means there is probably more waiting
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self.__wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_once(self) -> int:
+        """Claims one batch of alerts and delivers it, returns the number of alerts claimed"""
+        alerts = await self.db.claim_alerts(self.batch_size, self.lease, self.max_attempts)
+        by_channel = defaultdict(list)
+        for alert in alerts:
+            by_channel[alert.channel_id].append(alert)
+        await asyncio.gather(*(self.__deliver(channel_id, channel_alerts)
+                               for channel_id, channel_alerts in by_channel.items()))
+        return len(alerts)
+
+    async def __deliver(self, channel_id: int, alerts: List[OutboxAlert]):
+        # Classes sharing a channel ping their own role, the alerts of each role go out together
+        by_role = defaultdict(list)
+        for alert in alerts:
+            by_role[alert.role_id].append(alert)
+        groups = list(by_role.values())
+        for number, group in enumerate(groups):
+            later_ids = [alert.alert_id for later_group in groups[number + 1:] for alert in later_group]
+            if not await self.__deliver_group(channel_id, group, later_ids):
+                return
+
+    async def __deliver_group(self, channel_id: int, alerts: List[OutboxAlert], later_ids: List[int]) -> bool:
+        """Sends the alerts of one role, returns False when the delivery stopped on a failure"""
+        role_id = alerts[0].role_id
+        # Alerts left over from a delivery that already pinged the role are retried without pinging it again
+        mention = bool(role_id) and not all(alert.mentioned for alert in alerts)
+        # Embed limits are checked on the decoded embeds, the stored dicts are sent as they are
+        messages = pack_embeds([discord.Embed.from_dict(alert.embed) for alert in alerts])
+        index = 0
+        for message in messages:
+            batch = alerts[index:index + len(message)]
+            # Built from the stored id, the guild and its roles are only cached by the process holding its shard
+            content = f'<@&{role_id}> - {alert_type(alerts)}' if index == 0 and mention else None
+            # The later groups wait along with a failed message so the channel stays in order
+            pending_ids = [alert.alert_id for alert in alerts[index:]] + later_ids
+            try:
+                await send_embeds(self.bot.http, channel_id, [alert.embed for alert in batch], content)
+            except (discord.Forbidden, discord.NotFound) as err:
+                # The channel is gone or closed to the bot, retrying won't help
+                await self.db.discard_alerts(pending_ids, self.max_attempts)
+                self.failed += len(pending_ids)
+                log.warning('Discarded %d alerts for channel %d: %s', len(pending_ids), channel_id, err)
+                return False
+            except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                await self.db.retry_alerts(pending_ids, self.retry_delay)
+                self.failed += len(pending_ids)
+                log.warning('Alert delivery to channel %d failed, retrying later: %s', channel_id, err)
+                return False
+            await self.db.mark_alerts_sent([alert.alert_id for alert in batch])
+            self.sent += len(batch)
+            index += len(batch)
+            if content is not None and index < len(alerts):
+                await self.db.mark_alerts_mentioned([alert.alert_id for alert in alerts[index:]])
+        return True
@@ -1,16 +1,36 @@
 import datetime
-import sys
-import traceback
+import logging
+import socket
+import time
 import os
 
 
 import discord
 from discord.ext import commands
 
+from bot.alert_dispatcher import AlertDispatcher
+from bot.metrics_server import MetricsServer
+from bot.reaction_queue import ReactionQueue
 from config import Settings
 from dependencies.database import Database
+from dependencies.log import correlation_id, setup_logging
+from dependencies.metrics import CommandMetrics, phase_timings, timed_phase
+from dependencies.tracing import Tracer, span
+from dependencies.nucleus import Nucleus
+from dependencies.ownership import DetectorOwnership
+from dependencies.session import EndpointProfile
 
 exclude_extensions = ['__init__.py', 'bot_checks.py']
+log = logging.getLogger(__name__)
+
+
+def _timed_discord_request(request):
+    """Wraps `HTTPClient.request` so every Discord API call counts towards the `discord` phase of the command"""
+    async def timed_request(route, **kwargs):
+        with timed_phase('discord'), span('discord', f'{route.method} {route.path}'):
+            return await request(route, **kwargs)
+
+    return timed_request
 
 
 def _custom_prefix_adder(*args):
@@ -27,13 +47,42 @@ def _custom_prefix_adder(*args):
 class Bot(commands.AutoShardedBot):
     def __init__(self):
         self.configs = Settings()
+        self.log_listener = setup_logging(self.configs.log_level, self.configs.log_levels, self.configs.log_json,
+                                          self.configs.log_sample_rates)
         intents = discord.Intents().all()
         super().__init__(command_prefix=_custom_prefix_adder(self.configs.bot_prefix),
                          description=self.configs.bot_description, pm_help=None, help_attrs=dict(hidden=True),
-                         fetch_offline_members=False, heartbeat_timeout=150.0, intents=intents)
+                         fetch_offline_members=False, heartbeat_timeout=150.0, intents=intents,
+                         shard_count=self.configs.shard_count, shard_ids=self.configs.shard_ids)
         self.bot_token = self.configs.bot_token
+        self.http.request = _timed_discord_request(self.http.request)
+        self.command_metrics = CommandMetrics()
+        self.tracer = Tracer()
+        self.metrics_server = MetricsServer(self, self.configs.metrics_host, self.configs.metrics_port) \
+            if self.configs.metrics_enabled else None
         self.db = Database(self.configs.db_host, self.configs.db_name, self.configs.db_user, self.configs.db_password,
-                           self.configs.db_port, self.configs.min_db_conns, self.configs.max_db_conns, loop=self.loop)
+                           self.configs.db_port, self.configs.min_db_conns, self.configs.max_db_conns,
+                           cache_ttl=self.configs.db_cache_ttl, cache_size=self.configs.db_cache_size,
+                           health_check_interval=self.configs.db_health_check_interval)
+        self.nucleus_session = Nucleus.use_profile(EndpointProfile(
+            self.configs.nucleus_base_url, self.configs.nucleus_conn_limit, self.configs.nucleus_conn_limit_per_host,
+            self.configs.nucleus_dns_cache_ttl, self.configs.nucleus_keepalive_timeout,
+            self.configs.nucleus_connect_timeout, self.configs.nucleus_request_timeout,
+            self.configs.nucleus_max_retries, self.configs.nucleus_retry_backoff,
+            tuple(self.configs.nucleus_retry_statuses)))
+        self.alert_dispatcher = AlertDispatcher(self, self.db, self.configs.outbox_batch_size,
+                                                self.configs.outbox_poll_interval, self.configs.outbox_lease,
+                                                self.configs.outbox_max_attempts, self.configs.outbox_retry_delay,
+                                                self.configs.outbox_retention_days)
+
+        # Processes with different shard ranges split the detector classes between them through leases
+        node_id = self.configs.detector_node_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.detector_ownership = DetectorOwnership(self.db, node_id, self.configs.detector_lease,
+                                                    self.configs.detector_lease_renew_interval,
+                                                    self.configs.detector_node_ttl)
+        self.reaction_queue = ReactionQueue(self, self.db, self.configs.reactions_enabled,
+                                            self.configs.reactions_burst_threshold,
+                                            self.configs.reactions_burst_window, self.configs.reactions_max_pending)
 
         self.uptime: datetime.datetime = datetime.datetime.now()
 
@@ -42,10 +91,8 @@ class Bot(commands.AutoShardedBot):
             try:
                 if extension.endswith('.py') and extension not in exclude_extensions:
                     self.load_extension(f'bot.cogs.{extension[:-3]}')
-            except Exception as e:
-                print(f'failed to load extension because of:  {e}, type:  {type(e)}')
-                traceback.print_exc()
-                # TODO probably log it
+            except Exception:
+                log.exception('Failed to load extension %s', extension)
 
     async def on_command_error(self, ctx, error):
         if isinstance(error, commands.errors.CommandInvokeError):
@@ -61,9 +108,8 @@ class Bot(commands.AutoShardedBot):
         elif isinstance(error, commands.CommandInvokeError):
             original = error.original
             if not isinstance(original, discord.HTTPException):
-                print(f'In {ctx.command.qualified_name}:', file=sys.stderr)
-                traceback.print_tb(original.__traceback__)
-                print(f'{original.__class__.__name__}: {original}', file=sys.stderr)
+                log.error('In %s:', ctx.command.qualified_name,
+                          exc_info=(type(original), original, original.__traceback__))
         elif isinstance(error, commands.ArgumentParsingError):
             await ctx.send(error)
 
@@ -85,13 +131,14 @@ class Bot(commands.AutoShardedBot):
     async def on_ready(self):
         if not hasattr(self, 'uptime'):
             self.uptime = datetime.datetime.utcnow()
-        await self.db.__init_check__()
-        print(f'Ready: {self.user} (ID: {self.user.id})')
+        log.info('Ready: %s (ID: %d)', self.user, self.user.id)
 
     async def invoke(self, ctx):
         """|coro|
 
-        Overridden function to add emotes during the start and the end of commands.
+        Overridden function to queue emotes for the start and the end of commands, sent in the background by
+        `reaction_queue`, to record the time spent in each phase of the command in `command_metrics` and to tag the
+        logs of the command with its correlation id.
 
         Invokes the command given under the invocation context and
         handles all the internal event dispatch mechanisms.
@@ -103,20 +150,45 @@ class Bot(commands.AutoShardedBot):
         """
         if ctx.command is not None:
             self.dispatch('command', ctx)
+            timings = {}
+            timings_token = phase_timings.set(timings)
+            correlation_token = correlation_id.set(f'cmd-{ctx.message.id}')
+            start = time.perf_counter()
+            # Only cleared once the command completed, an unexpected error counts as a failure as well
+            failed = True
+            trace = None
+            react = False
             try:
-                if await self.can_run(ctx, call_once=True):
-                    await ctx.message.add_reaction('🧐')
+                if not self.db.is_ready:
+                    await self.db.wait_until_ready()
+                trace = self.tracer.begin('command', ctx.command.qualified_name)
+                react = self.reaction_queue.should_react(ctx.message)
+                with timed_phase('check'):
+                    can_run = await self.can_run(ctx, call_once=True)
+                if can_run:
+                    if react:
+                        self.reaction_queue.add(ctx.message, '🧐')
                     await ctx.command.invoke(ctx)
-                    await ctx.message.add_reaction('😀')
+                    if react:
+                        self.reaction_queue.add(ctx.message, '😀')
                 else:
                     raise commands.CheckFailure('The global check once functions failed.')
             except commands.CommandError as exc:
                 await ctx.command.dispatch_error(ctx, exc)
-                await ctx.message.add_reaction('🔥')
+                if react:
+                    self.reaction_queue.add(ctx.message, '🔥')
             else:
+                failed = False
                 self.dispatch('command_completion', ctx)
             finally:
-                await ctx.message.remove_reaction('🧐', self.user)
+                timings['total'] = time.perf_counter() - start
+                # The context is restored first, whatever the cleanup below raises
+                phase_timings.reset(timings_token)
+                correlation_id.reset(correlation_token)
+                self.tracer.end(trace)
+                if react:
+                    self.reaction_queue.remove(ctx.message, '🧐')
+                self.command_metrics.observe(ctx.command.qualified_name, timings, failed)
         elif ctx.invoked_with:
             exc = commands.CommandNotFound('Command "{}" is not found'.format(ctx.invoked_with))
             self.dispatch('command_error', ctx, exc)
@@ -126,11 +198,37 @@ class Bot(commands.AutoShardedBot):
             return
         await self.process_commands(message)
 
+    async def start(self, *args, **kwargs):
+        # The database is ready before the gateway connects, init failures stop the startup instead of a task
+        await self.db.start()
+        await self.detector_ownership.start()
+        await self.alert_dispatcher.start()
+        await self.reaction_queue.start()
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except OSError as err:
+                # Processes sharing settings.ini share the port as well, only the first one to bind serves /metrics
+                log.error('Metrics server not started on %s:%d: %s', self.metrics_server.host,
+                          self.metrics_server.port, err)
+                self.metrics_server = None
+        await super().start(*args, **kwargs)
+
     async def close(self):
         await super().close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.alert_dispatcher.close()
+        await self.reaction_queue.close()
+        await self.detector_ownership.close()
+        await self.nucleus_session.close()
+        await self.db.close()
 
     def run(self):
         try:
             super().run(self.configs.bot_token, reconnect=True)
-        except Exception as e:
-            print(f"Startup Error: {type(e)}: {e}")
+        except Exception:
+            log.exception('Startup error')
+        finally:
+            # Flushes the queued records before the process exits
+            self.log_listener.stop()
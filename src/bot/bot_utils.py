@@ -1,8 +1,16 @@
 import asyncio
-from typing import Union, List
+from typing import Any, Callable, List, Union
 
 import discord
+from discord.ext import menus
 from discord.ext.commands import Context
+from discord.http import Route
+
+MAX_EMBEDS_PER_MESSAGE = 10
+# Shared by every embed of a message
+MAX_EMBED_CHARACTERS = 6000
+# Longer results are shown as a paginated menu instead of a burst of messages
+MAX_PACKED_MESSAGES = 3
 
 
 def generate_embed(title: str, author: discord.Member, *, description: str = '', color: int = 0) -> discord.Embed:
@@ -35,3 +43,75 @@ async def emoji_selection_detector(ctx: Context, emoji_list: List[Union[discord.
     except asyncio.TimeoutError:
         await m.delete()
         return None
+
+
+def pack_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """
+    Packs the embeds into messages of at most 10 embeds and 6000 characters, keeping their order. Filling each
+    message before starting the next one gives the least number of messages for an ordered sequence.
+    """
+    messages = []
+    message = []
+    characters = 0
+    for embed in embeds:
+        length = len(embed)
+        if message and (len(message) == MAX_EMBEDS_PER_MESSAGE or characters + length > MAX_EMBED_CHARACTERS):
+            messages.append(message)
+            message, characters = [], 0
+        message.append(embed)
+        characters += length
+    if message:
+        messages.append(message)
+    return messages
+
+
+async def send_embeds(http: discord.http.HTTPClient, channel_id: int, embeds: List[Union[discord.Embed, dict]],
+                      content: str = None):
+    """Sends up to 10 embeds in one message, `Messageable.send` of discord.py 1.7 only takes a single embed"""
+    payload = {'embeds': [embed.to_dict() if isinstance(embed, discord.Embed) else embed for embed in embeds]}
+    if content:
+        payload['content'] = content
+    route = Route('POST', '/channels/{channel_id}/messages', channel_id=channel_id)
+    return await http.request(route, json=payload)
+
+
+class LazyEmbedPageSource(menus.ListPageSource):
+    """
+    Pages over the raw items, the embed of a page is only built when the page is shown so a menu costs the same for
+    any number of items.
+
+    build_embed: Callable - Builds the embed from the items of a page (the item itself when `per_page` is 1).
+    """
+
+    def __init__(self, items: list, per_page: int, build_embed: Callable[[Any], discord.Embed]):
+        super().__init__(items, per_page=per_page)
+        self.build_embed = build_embed
+
+    async def format_page(self, menu, page):
+        return self.build_embed(page).set_footer(text=f'Page {menu.current_page + 1}/{self.get_max_pages()}')
+
+
+async def send_paginated(ctx: Context, channel: Union[discord.TextChannel, discord.DMChannel],
+                         source: LazyEmbedPageSource, timeout: float = 120.0):
+    """Shows the pages in a single message, with reaction controls only when there is more than one page"""
+    if not source.is_paginating():
+        return await channel.send(embed=source.build_embed(await source.get_page(0)))
+    menu = menus.MenuPages(source=source, clear_reactions_after=True, timeout=timeout)
+    await menu.start(ctx, channel=channel)
+
+
+async def send_packed_embeds(ctx: Context, channel: Union[discord.TextChannel, discord.DMChannel],
+                             embeds: List[discord.Embed], max_messages: int = MAX_PACKED_MESSAGES):
+    """
+    Sends the embeds in as few messages as possible, falls back to a paginated menu when that would still take more
+    than `max_messages` messages.
+    """
+    messages = pack_embeds(embeds)
+    if len(messages) > max_messages:
+        return await send_paginated(ctx, channel, LazyEmbedPageSource(embeds, 1, lambda embed: embed))
+    for message in messages:
+        await send_embeds(ctx.bot.http, channel.id, message)
+
+
+async def get_dm_channel(user: Union[discord.User, discord.Member]) -> discord.DMChannel:
+    return user.dm_channel or await user.create_dm()
@@ -4,6 +4,7 @@ from discord.ext.commands import Context
 
 from bot import bot_exceptions
 from dependencies.database import Database
+from dependencies.metrics import timed_phase
 
 
 async def get_author_permission(ctx: Context) -> int:
@@ -13,16 +14,17 @@ async def get_author_permission(ctx: Context) -> int:
         ids = [author.id, *[role.id for role in author.roles]]
     else:
         ids = [author.id]
-    perm = await db.permission_retriever(*ids)
-    if perm is None:
-        perm = 0
-    return perm
+    permission, = await db.resolve_permissions(ids)
+    if permission.level is None:
+        return 0
+    return permission.level
 
 
 def check_permission_level(required_level: int = 0):
     async def check(ctx: Context):
-        is_god: bool = await ctx.bot.is_owner(ctx.author)
-        perm = await get_author_permission(ctx)
+        with timed_phase('check'):
+            is_god: bool = await ctx.bot.is_owner(ctx.author)
+            perm = await get_author_permission(ctx)
         if perm >= required_level or is_god:
             return True
         raise bot_exceptions.NotEnoughPerms(f"{ctx.author} does not have enough permission to run the command")
@@ -37,7 +39,8 @@ def is_whitelist(allow_dm=False):
         db: Database = ctx.bot.db
         channel_id: int = ctx.channel.id
         server_id: int = ctx.guild.id
-        data = await db.whitelist_check(server_id, channel_id)
+        with timed_phase('check'):
+            data = await db.whitelist_check(server_id, channel_id)
         if data:
             return data
         raise bot_exceptions.NotOnWhiteList
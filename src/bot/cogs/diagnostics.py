@@ -0,0 +1,96 @@
+import io
+
+import discord
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from dependencies.database import Database
+from dependencies.utils import format_table
+from . import bot_checks
+
+
+def table_block(header: tuple, rows: list) -> str:
+    """Formats the rows as a fixed width table inside a code block"""
+    return '```\n' + '\n'.join(format_table(header, rows)) + '\n```'
+
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db: Database = bot.db
+
+    @commands.command(brief='Shows the latency and call count of the database queries')
+    @bot_checks.is_whitelist()
+    @bot_checks.check_permission_level(8)
+    async def query_stats(self, ctx: Context):
+        """
+        Shows the call count and latency (mean, p50, p99 and max in milliseconds) of every database query that has
+        run since startup (top 20 by total time), along with the permission/whitelist cache hit rates.
+        """
+        stats = sorted(self.db.query_stats().items(), key=lambda item: item[1]['count'] * item[1]['mean'],
+                       reverse=True)
+        if not stats:
+            return await ctx.send('No queries have run yet.')
+        rows = [(name, summary['count'], f"{summary['mean'] * 1000:.2f}", f"{summary['p50'] * 1000:.2f}",
+                 f"{summary['p99'] * 1000:.2f}", f"{summary['max'] * 1000:.2f}") for name, summary in stats[:20]]
+        cache_rows = [(name, cache['size'], cache['hits'], cache['misses'], f"{cache['hit_rate']:.1%}")
+                      for name, cache in self.db.cache_stats().items()]
+        await ctx.send(table_block(('query', 'calls', 'mean', 'p50', 'p99', 'max'), rows))
+        await ctx.send(table_block(('cache', 'size', 'hits', 'misses', 'hit rate'), cache_rows))
+
+    @commands.command(brief='Shows how long the commands spend checking, on Nucleus and on Discord')
+    @commands.is_owner()
+    async def stats(self, ctx: Context):
+        """
+        Shows the call and error count of every command that has run since startup (top 20 by total time) with the
+        p50 / p99 in milliseconds of its total time and of the check, upstream (Nucleus) and Discord phases.
+        The full histograms are exported on the metrics endpoint.
+        """
+        summary = sorted(self.bot.command_metrics.summary().items(),
+                         key=lambda item: item[1]['total']['count'] * item[1]['total']['mean'], reverse=True)
+        if not summary:
+            return await ctx.send('No commands have run yet.')
+        errors = self.bot.command_metrics.errors
+        rows = [(command, phases['total']['count'], errors.get(command, 0),
+                 *(f"{phases[phase]['p50'] * 1000:.0f}/{phases[phase]['p99'] * 1000:.0f}"
+                   for phase in ('total', 'check', 'upstream', 'discord')))
+                for command, phases in summary[:20]]
+        await ctx.send(table_block(('command', 'calls', 'errors', 'total', 'check', 'upstream', 'discord'), rows))
+
+    @commands.command(brief='Traces the next detector ticks or commands and sends a report of where the time went')
+    @commands.is_owner()
+    async def trace(self, ctx: Context, target: str, count: int = 1, sample_rate: float = 1.0,
+                    profile: bool = False):
+        """
+        Records the Nucleus requests, database queries and Discord calls of the next `count` detector ticks or
+        command invocations and sends the report here once they are done: the slowest spans and the time per
+        account and per course.
+        Target: str - `detector`, `command` or `stop` to end the capture early
+        Sample rate: float - Chance of each tick / invocation to be traced, keeps the overhead low on busy bots
+        Profile: bool - Also runs the detector ticks under cProfile, noticeably slower
+        """
+        tracer = self.bot.tracer
+        if target == 'stop':
+            report = tracer.disarm()
+            if report is None:
+                return await ctx.send('Nothing was traced.')
+            return await self.__send_report(ctx, report)
+        if target not in tracer.TARGETS or count < 1 or not 0 < sample_rate <= 1:
+            return await ctx.send('Usage: `trace <detector|command|stop> [count >= 1] [sample rate in (0, 1]] '
+                                  '[profile]`')
+        if tracer.armed:
+            return await ctx.send(f'Already tracing the {tracer.target}, {tracer.remaining} left. '
+                                  f'Use `trace stop` first.')
+        tracer.arm(target, count, sample_rate, profile, lambda report: self.__send_report(ctx, report))
+        await ctx.send(f'Tracing the next {count} {target} run(s) at a {sample_rate:.0%} sample rate'
+                       f'{" with cProfile" if tracer.profile else ""}.')
+
+    @staticmethod
+    async def __send_report(ctx: Context, report: str):
+        summary = report.split('\n\n')[0]
+        await ctx.send(f'```\n{summary}\n```', file=discord.File(io.BytesIO(report.encode()), 'trace.txt'))
+
+
+def setup(bot):
+    cog = Diagnostics(bot)
+    bot.add_cog(cog)
@@ -83,6 +83,20 @@ class ModCommands(commands.Cog):
         except discord.Forbidden:
             await ctx.reply(f"I dont have enough Permissions!")
 
+    @commands.command(brief='Turns the command start/finish reactions on or off for this server')
+    @commands.guild_only()
+    @bot_checks.check_permission_level(8)
+    async def reactions(self, ctx: Context, state: str):
+        """
+        Turns the 🧐 / 😀 / 🔥 reactions added to the commands on or off for the whole server.
+        State: str - `on` or `off`
+        """
+        if state.lower() not in ('on', 'off'):
+            return await ctx.reply('The state has to be `on` or `off`')
+        enabled = state.lower() == 'on'
+        await self.bot.reaction_queue.set_enabled(ctx.guild.id, enabled)
+        await ctx.reply(f"Command reactions turned {'on' if enabled else 'off'} for this server")
+
 
 def setup(bot):
     cog = ModCommands(bot)
@@ -1,26 +1,61 @@
+import asyncio
+import hashlib
 import json
+import logging
 import random
 import re
-import time
-from datetime import datetime, timedelta
-from typing import Optional, Union
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional, Union
 
+import aiohttp
 import dateparser
-from discord import Embed
+from discord import Embed, HTTPException
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
 
 from dependencies.database import Database
+from dependencies.log import correlated, new_correlation_id
 from dependencies.nucleus import Nucleus
+from dependencies.response_cache import ResponseCache
+from dependencies.scheduler import AccountScheduler
+from dependencies.session import UPSTREAM_ERRORS, NucleusUnavailable
+from dependencies.session_pool import AlertSessionPool
+from dependencies.tracing import span, tagged, with_tags
+from dependencies.utils import nucleus_timestamp_to_ist, parse_nucleus_timestamp
 from . import bot_checks
-from ..bot_utils import generate_embed, emoji_selection_detector
+from ..bot_utils import (LazyEmbedPageSource, generate_embed, emoji_selection_detector, get_dm_channel,
+                         send_packed_embeds, send_paginated)
 
 NUMERIC_EMOTES = ['1⃣', '2⃣', '3⃣', '4⃣', '5⃣', '6⃣', '7⃣', '8⃣', '9⃣', '0⃣']
+SESSION_EXPIRED_MESSAGE = 'Session expired, Please login to perform this command.'
+UNREACHABLE_MESSAGE = 'Nucleus seems to be unreachable right now, Please try again later.'
+# Items shown per page of the paginated menus, within the 25 fields and 6000 characters of an embed
+RESOURCES_PER_PAGE = 10
+SUBMITTED_ASSIGNMENTS_PER_PAGE = 8
+# Cookie refresh failures are reported here
+ADMIN_CHANNEL_ID = 755021030489325638
+
+log = logging.getLogger(__name__)
+
+
+def has_response_data(response: dict) -> bool:
+    return isinstance(response, dict) and 'data' in response
+
+
+def alert_item_id(item: dict) -> str:
+    """Identifies an assignment or resource for the alert deduplication, by its Nucleus id when it has one"""
+    for key in ('_id', 'id'):
+        if item.get(key):
+            return str(item[key])
+    details = item.get('details') or {}
+    identity = (item.get('courseId'), item.get('title') or item.get('name'), item.get('addedOn') or
+                details.get('addedOn'), details.get('previewLink'))
+    return hashlib.sha1(json.dumps(identity).encode()).hexdigest()
 
 
 def generate_assignment_embed(assignment: dict, description: str):
-    utc_deadline = datetime.strptime(assignment['targetDateTime'], '%Y-%m-%dT%H:%M:%S.%fZ')
-    deadline = utc_deadline + timedelta(hours=5, minutes=30)
+    deadline = nucleus_timestamp_to_ist(assignment['targetDateTime'])
     color = random.randint(0, 16777215)
     embed_dict = {
         "color": color,
@@ -90,37 +125,37 @@ def generate_schedule_embed(schedule: dict, date: datetime, meet_urls: dict):
     return Embed.from_dict(embed_dict)
 
 
+def submitted_assignment_fields(assignment: dict) -> List[dict]:
+    assignment_added_on_time = assignment['addedOn']
+    submission_added_on_time = assignment['submissions']['submissionDetails']["details"]['addedOn']
+
+    assignment_preview_link = assignment["question"]["details"]["previewLink"]
+    submission_preview_link = assignment["submissions"]["submissionDetails"]["details"]["previewLink"]
+
+    added_on = nucleus_timestamp_to_ist(assignment_added_on_time)
+    submitted_date = nucleus_timestamp_to_ist(submission_added_on_time)
+    field = {
+        'name': assignment['title'],
+        'value': assignment["courseName"],
+        'inline': True
+    }
+    field_left = {
+        'name': 'Added On',
+        'value': f'[{added_on.strftime("%d/%m/%Y")}]({assignment_preview_link})',
+        'inline': True
+    }
+    field_right = {
+        'name': 'Submitted On',
+        'value': f'[{submitted_date.strftime("%d/%m/%Y")}]({submission_preview_link})',
+        'inline': True
+    }
+    return [field, field_left, field_right]
+
+
 def generate_submitted_assignment_embed(submitted: list, color: int):
     fields = []
     for assignment in submitted:
-        assignment_added_on_time = assignment['addedOn']
-        submission_added_on_time = assignment['submissions']['submissionDetails']["details"]['addedOn']
-
-        assignment_preview_link = assignment["question"]["details"]["previewLink"]
-        submission_preview_link = assignment["submissions"]["submissionDetails"]["details"]["previewLink"]
-
-        added_on = datetime.strptime(assignment_added_on_time, '%Y-%m-%dT%H:%M:%S.%fZ')
-        added_on += timedelta(hours=5, minutes=30)
-        submitted_date = datetime.strptime(submission_added_on_time, '%Y-%m-%dT%H:%M:%S.%fZ')
-        submitted_date += timedelta(hours=5, minutes=30)
-        field = {
-            'name': assignment['title'],
-            'value': assignment["courseName"],
-            'inline': True
-        }
-        field_left = {
-            'name': 'Added On',
-            'value': f'[{added_on.strftime("%d/%m/%Y")}]({assignment_preview_link})',
-            'inline': True
-        }
-        field_right = {
-            'name': 'Submitted On',
-            'value': f'[{submitted_date.strftime("%d/%m/%Y")}]({submission_preview_link})',
-            'inline': True
-        }
-        fields.append(field)
-        fields.append(field_left)
-        fields.append(field_right)
+        fields.extend(submitted_assignment_fields(assignment))
 
     embed_dict = {
         "color": color,
@@ -133,36 +168,39 @@ def generate_submitted_assignment_embed(submitted: list, color: int):
     return Embed.from_dict(embed_dict)
 
 
+def resource_fields(resource: dict) -> List[dict]:
+    added_on_time = resource["details"]['addedOn']
+    preview_link = resource["details"]["previewLink"]
+
+    added_on = nucleus_timestamp_to_ist(added_on_time)
+    if 'type' in resource:
+        if resource['type'] == 'book':
+            title_emote = ':books:'
+        elif resource['type'] == 'questions':
+            title_emote = ':question:'
+        elif resource['type'] == 'notes':
+            title_emote = ':page_facing_up:'
+        elif resource['type'] == 'presentation':
+            title_emote = ':bookmark_tabs:'
+        elif resource['type'] == 'homework':
+            title_emote = ':pencil:'
+        elif resource['type'] == 'worksheet':
+            title_emote = ':bookmark:'
+    else:
+        title_emote = ''
+
+    field = {
+        'name': title_emote + ' ' + resource['name'],
+        'value': f'[{added_on.strftime("%d/%m/%Y")}]({preview_link})',
+    }
+    return [field]
+
+
 def generate_resources_embed(resources: list, color: int):
     fields = []
     course_id = resources[0]['courseId']
     for resource in resources:
-        added_on_time = resource["details"]['addedOn']
-        preview_link = resource["details"]["previewLink"]
-
-        added_on = datetime.strptime(added_on_time, '%Y-%m-%dT%H:%M:%S.%fZ')
-        added_on += timedelta(hours=5, minutes=30)
-        if 'type' in resource:
-            if resource['type'] == 'book':
-                title_emote = ':books:'
-            elif resource['type'] == 'questions':
-                title_emote = ':question:'
-            elif resource['type'] == 'notes':
-                title_emote = ':page_facing_up:'
-            elif resource['type'] == 'presentation':
-                title_emote = ':bookmark_tabs:'
-            elif resource['type'] == 'homework':
-                title_emote = ':pencil:'
-            elif resource['type'] == 'worksheet':
-                title_emote = ':bookmark:'
-        else:
-            title_emote = ''
-
-        field = {
-            'name': title_emote + ' ' + resource['name'],
-            'value': f'[{added_on.strftime("%d/%m/%Y")}]({preview_link})',
-        }
-        fields.append(field)
+        fields.extend(resource_fields(resource))
 
     embed_dict = {
         "color": color,
@@ -176,8 +214,7 @@ def generate_resources_embed(resources: list, color: int):
 
 
 def generate_resource_embed(resource: dict, description: str):
-    added_on = datetime.strptime(resource['details']['addedOn'], '%Y-%m-%dT%H:%M:%S.%fZ')
-    added_on += timedelta(hours=5, minutes=30)
+    added_on = nucleus_timestamp_to_ist(resource['details']['addedOn'])
     color = random.randint(0, 16777215)
     tags = '| '.join(resource['tags'])
 
@@ -218,6 +255,17 @@ class NucleusCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db: Database = bot.db
+        self.__class_locks = defaultdict(asyncio.Lock)
+        configs = bot.configs
+        self.scheduler = AccountScheduler(self.db, configs.detector_backoff_base, configs.detector_backoff_max,
+                                          configs.detector_backoff_jitter)
+        self.response_cache = ResponseCache(configs.cache_ttls, configs.cache_stale_ttl)
+        self.session_pool = AlertSessionPool(self.db, self.scheduler, configs.detector_cookie_max_age,
+                                             configs.detector_cookie_refresh_margin,
+                                             configs.detector_cookie_refresh_spread, configs.detector_max_logins)
+        self.cookie_keepalive.change_interval(seconds=configs.detector_keepalive_interval)
+        self.cookie_keepalive.add_exception_type(Exception)
+        self.cookie_keepalive.start()
         self.assignments_detector.add_exception_type(Exception)
         self.assignments_detector.start()
 
@@ -230,9 +278,11 @@ class NucleusCog(commands.Cog):
                 return f"Can't parse out a date from `{date_string}`"
         return date
 
-    @staticmethod
-    async def __interactive_course_selection(ctx: Context, user: Nucleus) -> Optional[str]:
-        user_profile = await user.get_profile()
+    async def __interactive_course_selection(self, ctx: Context, user: Nucleus) -> Optional[str]:
+        user_profile = await self.__fetch_response(user, 'profile', user.username, user.get_profile)
+        if isinstance(user_profile, str):
+            await ctx.send(user_profile)
+            return None
         user_courses = user_profile['data']['courses']
         core_courses = user_courses['core']
         elective_courses = user_courses['elective']
@@ -262,12 +312,34 @@ class NucleusCog(commands.Cog):
         discord_user = await self.db.get_user_by_discord_id(discord_id)
         if not discord_user:
             return 'Login to perform this command.'
+        if discord_user[11]:
+            return SESSION_EXPIRED_MESSAGE
         cookies = json.loads(discord_user[8])
         user_id = discord_user[0]
-        user = Nucleus(user_id, cookies)
-        if await user.is_expired():
-            return 'Session expired, Please login to perform this command.'
-        return user
+        class_id = discord_user[5]
+        # The session is assumed to be valid, expiry is only looked into when a request fails
+        return Nucleus(user_id, cookies, class_id)
+
+    async def __handle_failed_response(self, user: Nucleus) -> str:
+        """Confirms whether a failed request was due to an expired session and returns the message for the user"""
+        try:
+            expired = await user.is_expired()
+        except UPSTREAM_ERRORS:
+            expired = False
+        if expired:
+            await self.db.set_nucleus_user_expired(user.username, True)
+            return SESSION_EXPIRED_MESSAGE
+        return UNREACHABLE_MESSAGE
+
+    async def __fetch_response(self, user: Nucleus, endpoint: str, key, fetch) -> Union[str, dict]:
+        """Fetches through the response cache, returns the message for the user when the request failed"""
+        try:
+            response = await self.response_cache.get_or_fetch(endpoint, key, fetch, has_response_data)
+        except UPSTREAM_ERRORS:
+            return UNREACHABLE_MESSAGE
+        if not has_response_data(response):
+            return await self.__handle_failed_response(user)
+        return response
 
     @bot_checks.is_whitelist(allow_dm=True)
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -292,7 +364,11 @@ class NucleusCog(commands.Cog):
         if isinstance(user, str):
             return await ctx.send(user)
 
-        schedule_response = await user.schedule(date.strftime("%Y-%m-%d"))
+        date_string = date.strftime("%Y-%m-%d")
+        schedule_response = await self.__fetch_response(user, 'schedule', (user.class_id, date_string),
+                                                        lambda: user.schedule(date_string))
+        if isinstance(schedule_response, str):
+            return await ctx.send(schedule_response)
         schedule = schedule_response['data']['schedule']
         meet_urls = schedule_response['data']['meetUrls']
         embed = generate_schedule_embed(schedule, date, meet_urls)
@@ -318,7 +394,9 @@ class NucleusCog(commands.Cog):
                 return await ctx.send(user)
             not_submitted = []
             submitted = []
-            assignments_response = await user.assignments()
+            assignments_response = await self.__fetch_response(user, 'assignments', user.username, user.assignments)
+            if isinstance(assignments_response, str):
+                return await ctx.send(assignments_response)
             assignments = assignments_response['data']['assignments']
             if not assignments:
                 return await ctx.message.author.send('No assignments uploaded.')
@@ -328,25 +406,25 @@ class NucleusCog(commands.Cog):
                 else:
                     submitted.append(assignment)
 
+            dm_channel = await get_dm_channel(ctx.author)
             if option == 'all':
-                counter = 0
-                color = random.randint(0, 16777215)
                 if not submitted:
                     await ctx.message.author.send('You have not submitted any assignments.')
-                while counter < len(submitted):
-                    assignments_iter = submitted[counter:counter + 8]
-                    embed_s = generate_submitted_assignment_embed(assignments_iter, color)
-                    await ctx.message.author.send(embed=embed_s)
-                    counter += 8
+                else:
+                    color = random.randint(0, 16777215)
+                    await send_paginated(ctx, dm_channel, LazyEmbedPageSource(
+                        submitted, SUBMITTED_ASSIGNMENTS_PER_PAGE,
+                        lambda page: generate_submitted_assignment_embed(page, color)))
             if not not_submitted:
                 return await ctx.message.author.send('You have submitted all assignments till date.')
 
-            for assignment in not_submitted:
-                embed_uns = generate_assignment_embed(assignment, 'Assignments not Submitted')
-                await ctx.message.author.send(embed=embed_uns)
+            # Packed into as few DMs as the embed limits allow instead of one DM per assignment
+            embeds = [generate_assignment_embed(assignment, 'Assignments not Submitted')
+                      for assignment in not_submitted]
+            await send_packed_embeds(ctx, dm_channel, embeds)
 
-        except Exception as err:
-            print(err)
+        except Exception:
+            log.exception('The assignments command failed')
 
     @bot_checks.is_whitelist(allow_dm=True)
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -374,105 +452,167 @@ class NucleusCog(commands.Cog):
             if course_match is None:
                 return await ctx.reply('Invalid courseId!')
 
-            resources_response = await user.resources(course_id)
+            resources_response = await self.__fetch_response(user, 'resources', (user.class_id, course_id),
+                                                             lambda: user.resources(course_id))
+            if isinstance(resources_response, str):
+                return await ctx.send(resources_response)
             resources = resources_response['data']
             if not resources:
                 return await ctx.message.author.send(f'{course_id} - No resources uploaded.')
 
-            counter = 0
             color = random.randint(0, 16777215)
+            await send_paginated(ctx, await get_dm_channel(ctx.author), LazyEmbedPageSource(
+                resources, RESOURCES_PER_PAGE, lambda page: generate_resources_embed(page, color)))
 
-            while counter < len(resources):
-                resource_iter = resources[counter:counter + 8]
-                embed_r = generate_resources_embed(resource_iter, color)
-                await ctx.message.author.send(embed=embed_r)
-                counter += 8
-
-        except Exception as err:
-            print(err)
+        except Exception:
+            log.exception('The resources command failed')
 
     @tasks.loop(seconds=600)
     async def assignments_detector(self):
-        print(f'Detector Running! - {datetime.now()}')
+        tick_id = new_correlation_id('tick')
+        trace = self.bot.tracer.begin('detector', tick_id)
         try:
-            alert_accounts = await self.db.get_alert_accounts()
-            for username, cookies_str, class_id, password in alert_accounts:
-                cookies = json.loads(cookies_str)
-                user = Nucleus(username, cookies)
-                user_response = await user.get_profile()
-                if user_response == {}:
-                    user = await Nucleus.login(username, password)
-                    if user:
-                        await self.db.update_alert_account(user.username, json.dumps(user.cookies), password)
-                    else:
-                        admin_channel = self.bot.get_channel(755021030489325638)
-                        await admin_channel.send(f'@everyone Account cookie refresh failed - `{username}`')
-                        time.sleep(3600)
-                        continue
-
-                assignments_response = await user.assignments()
-                assignments = assignments_response["data"]["assignments"]
-
-                new_assignments = []
-                nucleus_courses = await self.db.get_assignments_last_checked(class_id)
-
-                for assignment in assignments:
+            with correlated(tick_id):
+                if not self.db.healthy:
+                    # The watermarks can't be read or moved, the tick would only pile up failures
+                    log.warning('Detector tick skipped, the database is unhealthy')
+                    return
+                log.info('Detector running', extra={'event': 'detector.tick'})
+                if not self.session_pool.sessions:
+                    await self.session_pool.sync()
+                account_semaphore = asyncio.Semaphore(self.bot.configs.detector_max_accounts)
+                # Logins are left to the cookie keep-alive, only the accounts holding a session are polled, and
+                # only for the classes this process holds the detector lease of
+                await asyncio.gather(*(self.__run_account_detection(account_semaphore, user)
+                                       for user in self.session_pool.ready_sessions(self.bot.detector_ownership.owns)))
+        except Exception:
+            log.exception('Detector tick %s failed', tick_id)
+        finally:
+            self.bot.tracer.end(trace)
+
+    async def __run_account_detection(self, account_semaphore: asyncio.Semaphore, user: Nucleus):
+        """
+        Runs the detection for one account so that a slow or failing account doesn't hold back the others. Accounts
+        that keep failing are backed off by the session pool and left out of the next ticks meanwhile.
+        """
+        async with account_semaphore:
+            try:
+                with tagged(account=user.username), span('detector', 'account'):
+                    polled = await asyncio.wait_for(self.__detect_account_changes(user),
+                                                    timeout=self.bot.configs.detector_account_timeout)
+            except asyncio.TimeoutError:
+                Nucleus.session.validators.forget_account(user.username)
+                log.warning('Detector timed out for %s', user.username, extra={'username': user.username})
+            except (NucleusUnavailable, aiohttp.ClientError) as err:
+                # An outage, not an expired session, the session is kept for the next tick
+                Nucleus.session.validators.forget_account(user.username)
+                log.warning('Nucleus unavailable for %s: %s', user.username, err, extra={'username': user.username})
+            except Exception:
+                # The next tick does a full fetch so nothing is skipped because of a half processed response
+                Nucleus.session.validators.forget_account(user.username)
+                log.exception('Detector failed for %s', user.username, extra={'username': user.username})
+            else:
+                if polled:
+                    await self.session_pool.record_success(user.username)
+                return
+            await self.session_pool.record_failure(user.username)
+
+    async def __detect_account_changes(self, user: Nucleus) -> bool:
+        """Polls the account and queues the alerts of the new items, returns False when the session has expired"""
+        class_id = user.class_id
+        course_ids = list(await self.db.get_courses_last_checked(class_id))
+        # Unchanged responses come back as NOT_MODIFIED and are skipped without parsing or diffing
+        assignments_response, *course_responses = await asyncio.gather(
+            user.assignments(conditional=True),
+            *(with_tags(user.resources(course_id, conditional=True), course=course_id)
+              for course_id in course_ids))
+
+        if assignments_response == {} or {} in course_responses:
+            # The login page instead of JSON, server errors raise `NucleusUnavailable` instead. The keep-alive
+            # logs in again on its next run
+            Nucleus.session.validators.forget_account(user.username)
+            self.session_pool.invalidate(user.username)
+            log.info('Session expired for %s', user.username,
+                     extra={'event': 'detector.session_expired', 'username': user.username})
+            return False
+
+        # Accounts of the same class fetch in parallel but share the watermarks, only the diff against the latest
+        # watermarks and their update are done one account at a time
+        class_lock = self.__class_locks[class_id]
+        with span('detector', 'class lock wait'):
+            await class_lock.acquire()
+        try:
+            # Watermarks are indexed by course once so every item is resolved in O(1)
+            courses_last_checked = await self.db.get_courses_last_checked(class_id)
+            new_assignments = []
+            assignment_updates = []
+            if assignments_response is not Nucleus.NOT_MODIFIED:
+                for assignment in assignments_response["data"]["assignments"]:
                     course_id = assignment['courseId']
-                    added_on_str = assignment['addedOn']
-                    added_on = datetime.strptime(added_on_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-                    for course in nucleus_courses:
-                        if course_id == course[0]:
-                            last_checked = course[1]
-                            if added_on > last_checked:
-                                new_assignments.append(assignment)
-                                await self.db.update_assignments_last_uploaded(class_id, course_id, added_on)
-
-                new_resources = []
-                nucleus_courses = await self.db.get_resources_last_checked(class_id)
-
-                for course in nucleus_courses:
-                    course_response = await user.resources(course[0])
-                    for resource in course_response['data']:
-                        added_on_str = resource['details']['addedOn']
-                        last_checked = course[1]
-                        added_on = datetime.strptime(added_on_str, '%Y-%m-%dT%H:%M:%S.%fZ')
-                        if added_on > last_checked:
-                            new_resources.append(resource)
-                            await self.db.update_resouces_last_uploaded(class_id, resource['courseId'], added_on)
-
-                if len(new_assignments) != 0 or len(new_resources) != 0:
-                    try:
-                        alert_details = await self.db.get_alert_details(class_id)
-                        for channel_id, guild_id, role_id in alert_details:
-                            guild = self.bot.get_guild(guild_id)
-                            channel = guild.get_channel(channel_id)
-                            role = guild.get_role(role_id)
-                            if role:
-                                if new_assignments and new_resources:
-                                    alert_type = 'Assignments + Resources'
-                                else:
-                                    alert_type = 'Assignments' if new_assignments else 'Resources'
-                                await channel.send(f'{role.mention} - {alert_type}')
-
-                            for assignment in new_assignments:
-                                embed = generate_assignment_embed(assignment, description='New Assignment Detected!')
-                                await channel.send(embed=embed)
-
-                            for resource in new_resources:
-                                if resource['type'] != 'assignment':
-                                    embed = generate_resource_embed(resource, description='New resource uploaded!')
-                                    await channel.send(embed=embed)
-
-                    except Exception as err:
-                        print('Error inside loop', err)
-
-        except Exception as err:
-            print(f'Error outside loop {err}')
+                    if course_id not in courses_last_checked:
+                        continue
+                    added_on = parse_nucleus_timestamp(assignment['addedOn'], aware=False)
+                    if added_on > courses_last_checked[course_id][0]:
+                        new_assignments.append(assignment)
+                        assignment_updates.append((class_id, course_id, added_on))
+
+            new_resources = []
+            resource_updates = []
+            for course_id, course_response in zip(course_ids, course_responses):
+                if course_response is Nucleus.NOT_MODIFIED or course_id not in courses_last_checked:
+                    continue
+                last_checked = courses_last_checked[course_id][1]
+                for resource in course_response['data']:
+                    added_on = parse_nucleus_timestamp(resource['details']['addedOn'], aware=False)
+                    if added_on > last_checked:
+                        new_resources.append(resource)
+                        resource_updates.append((class_id, resource['courseId'], added_on))
+
+            alerts = []
+            if new_assignments or new_resources:
+                items = [('assignment', alert_item_id(assignment),
+                          generate_assignment_embed(assignment, description='New Assignment Detected!').to_dict())
+                         for assignment in new_assignments]
+                items.extend(('resource', alert_item_id(resource),
+                              generate_resource_embed(resource, description='New resource uploaded!').to_dict())
+                             for resource in new_resources if resource['type'] != 'assignment')
+                alert_details = await self.db.get_alert_details(class_id)
+                alerts = [(class_id, guild_id, channel_id, role_id, item_type, item_id, embed)
+                          for channel_id, guild_id, role_id in alert_details for item_type, item_id, embed in items]
+            # Alerts are queued along with the watermarks, a crash before delivery doesn't lose them
+            await self.db.record_detection(assignment_updates, resource_updates, alerts)
+        finally:
+            class_lock.release()
+
+        if alerts:
+            self.bot.alert_dispatcher.wake()
+        return True
 
     @assignments_detector.before_loop
     async def before_detection(self):
         await self.bot.wait_until_ready()
 
+    @tasks.loop(seconds=60)
+    async def cookie_keepalive(self):
+        try:
+            with correlated(new_correlation_id('keepalive')):
+                failures = await self.session_pool.refresh_due(self.bot.detector_ownership.owns)
+        except Exception:
+            log.exception('Cookie keep-alive failed')
+            return
+        for username, next_run_at in failures:
+            # Sent by id, the admin channel is only cached by the process holding its shard
+            try:
+                await self.bot.http.send_message(
+                    ADMIN_CHANNEL_ID, f'@everyone Account cookie refresh failed - `{username}`, retrying after '
+                                      f'{next_run_at.strftime("%d/%m/%Y %H:%M:%S")}')
+            except (HTTPException, aiohttp.ClientError, asyncio.TimeoutError):
+                log.warning('Could not report the cookie refresh failure of %s', username, exc_info=True)
+
+    @cookie_keepalive.before_loop
+    async def before_keepalive(self):
+        await self.bot.wait_until_ready()
+
     @bot_checks.is_whitelist()
     @commands.cooldown(1, 10, commands.BucketType.user)
     @commands.command(brief='Generate nucleus login cookies for the current discord user')
@@ -507,8 +647,10 @@ class NucleusCog(commands.Cog):
         await ctx.message.author.send('`Login Succeeded!`')
         try:
             await user.update_database(self.db, ctx.message.author.id, ctx.message.author.name)
-        except Exception as err:
-            print(err)
+            self.response_cache.invalidate('profile', user.username)
+            self.response_cache.invalidate('assignments', user.username)
+        except Exception:
+            log.exception('Updating the nucleus user %s failed', user.username)
 
     @bot_checks.is_whitelist()
     @bot_checks.check_permission_level(8)
@@ -545,8 +687,8 @@ class NucleusCog(commands.Cog):
         try:
             await user.update_alert_accounts(self.db, password)
             await ctx.send('Alert account updated!')
-        except Exception as err:
-            print(err)
+        except Exception:
+            log.exception('Updating the alert account %s failed', user.username)
 
     @bot_checks.is_whitelist()
     @bot_checks.check_permission_level(8)
@@ -613,7 +755,7 @@ class NucleusCog(commands.Cog):
             await self.db.add_class_alert(class_id, role_id, channel.id, guild.id)
             return await ctx.send('Class Alert Added!')
         except Exception as error:
-            print(error)
+            log.warning('Adding the alert of class %s failed: %s', class_id, error)
             return await ctx.reply(error)
 
 
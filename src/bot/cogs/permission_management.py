@@ -1,3 +1,4 @@
+import logging
 from typing import Union
 
 import discord
@@ -8,6 +9,8 @@ from bot import bot_exceptions
 from dependencies.database import Database, DatabaseDuplicateEntry
 from . import bot_checks
 
+log = logging.getLogger(__name__)
+
 
 class PermissionManagement(commands.Cog):
     def __init__(self, bot):
@@ -16,7 +19,7 @@ class PermissionManagement(commands.Cog):
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx: Context, error):
-        print(error, type(error))
+        log.info('Command error %s: %s', type(error).__name__, error)
         if isinstance(error, bot_exceptions.NotEnoughPerms):
             await ctx.send(f"Who told you that you could do that? | error:  {error}")
         elif isinstance(error, bot_exceptions.NotOnWhiteList):
@@ -33,8 +36,8 @@ class PermissionManagement(commands.Cog):
             return
         user_obj: discord.guild.Member = ctx.guild.get_member(user_id)
         ids = [user_obj.id, *[role.id for role in user_obj.roles]]
-        permission_level, permission_name = await self.db.permission_retriever(*ids, with_name=True)
-        await ctx.send(f'Permission level for {user_obj.display_name}:   {permission_level} ({permission_name})')
+        permission, = await self.db.resolve_permissions(ids)
+        await ctx.send(f'Permission level for {user_obj.display_name}:   {permission.level} ({permission.name})')
 
     @commands.command(aliases=['authorized_users', 'super_users', 'su'])
     @bot_checks.is_whitelist()
@@ -75,14 +78,16 @@ class PermissionManagement(commands.Cog):
 
         # Level checker between target and self
         self_author: discord.Member = ctx.author
-        self_level = await db.permission_retriever(*[self_author.id, *[role.id for role in self_author.roles]])
+        self_permission, target_permission = await db.resolve_permissions(
+            [self_author.id, *[role.id for role in self_author.roles]], item_id)
+        self_level = self_permission.level
         is_owner: bool = await ctx.bot.is_owner(self_author)
         if self_level is None:
             if is_owner:
                 self_level = 11
             else:
                 self_level = 6
-        target_level: Union[None, int] = await db.permission_retriever(item_id)
+        target_level: Union[None, int] = target_permission.level
         if target_level is None:
             await db.auth_adder(item_id, level, role, role_server_id)
             await ctx.send(f'Successfully authorized `{item.name}` to clearance level {level}')
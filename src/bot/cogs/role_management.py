@@ -2,6 +2,7 @@
 This module provides a discord.py Cog `RoleManagement`.
 """
 
+import logging
 import re
 
 import discord
@@ -10,6 +11,8 @@ from discord.ext import commands
 from . import bot_checks
 from ..bot_utils import generate_embed
 
+log = logging.getLogger(__name__)
+
 
 class RoleManagement(commands.Cog):
     """
@@ -40,11 +43,11 @@ class RoleManagement(commands.Cog):
                 member = discord.utils.find(lambda m: m.id == payload.user_id, guild.members)
                 if member is not None:
                     await member.add_roles(role)
-                    print('Role added.')
+                    log.info('Role %s added to %d', role.name, member.id)
                 else:
-                    print('Member not found!')
+                    log.info('Member %d not found', payload.user_id)
             else:
-                print('Role not found.')
+                log.info('Role %s not found', payload.emoji.name)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload):
@@ -66,11 +69,11 @@ class RoleManagement(commands.Cog):
                 member = discord.utils.find(lambda m: m.id == payload.user_id, guild.members)
                 if member is not None:
                     await member.remove_roles(role)
-                    print('Role removed.')
+                    log.info('Role %s removed from %d', role.name, member.id)
                 else:
-                    print('Member not found!')
+                    log.info('Member %d not found', payload.user_id)
             else:
-                print('Role not found.')
+                log.info('Role %s not found', payload.emoji.name)
 
     @commands.command()
     @bot_checks.is_whitelist()
@@ -95,7 +98,7 @@ class RoleManagement(commands.Cog):
                 embed.set_footer(text='Have a great day! :)')
                 await self.client.send_message(ctx.message.channel, embed=embed)
             except discord.Forbidden as e:
-                print(f'create_role name={name} color={color} failed with error :{e}')
+                log.warning('create_role name=%s color=%s failed with error: %s', name, color, e)
         else:
             await ctx.send('Invalid color argument.')
 
@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+from aiohttp import web
+
+from dependencies.metrics import prometheus_histogram, prometheus_labels
+from dependencies.nucleus import Nucleus
+
+
+def render_metrics(bot) -> str:
+    """The command, database, outbox, reaction queue and Nucleus session metrics in the Prometheus text format"""
+    lines: List[str] = ['# HELP nucleo_command_phase_seconds Time spent by the commands in each phase',
+                        '# TYPE nucleo_command_phase_seconds histogram']
+    for (command, phase), histogram in sorted(bot.command_metrics.histograms.items()):
+        lines.extend(prometheus_histogram('nucleo_command_phase_seconds', histogram,
+                                          {'command': command, 'phase': phase}))
+    lines.extend(['# HELP nucleo_command_errors_total Commands that ended with an error',
+                  '# TYPE nucleo_command_errors_total counter'])
+    for command, errors in sorted(bot.command_metrics.errors.items()):
+        lines.append(f'nucleo_command_errors_total{{{prometheus_labels({"command": command})}}} {errors}')
+    lines.extend(['# HELP nucleo_db_query_seconds Latency of the registered database queries',
+                  '# TYPE nucleo_db_query_seconds histogram'])
+    for name, histogram in sorted(bot.db.query_metrics.items()):
+        if histogram.count:
+            lines.extend(prometheus_histogram('nucleo_db_query_seconds', histogram, {'query': name}))
+    lines.extend(['# HELP nucleo_db_healthy Whether the last database health check succeeded',
+                  '# TYPE nucleo_db_healthy gauge',
+                  f'nucleo_db_healthy {int(bot.db.healthy)}',
+                  '# HELP nucleo_alerts_sent_total Detector alerts delivered to Discord',
+                  '# TYPE nucleo_alerts_sent_total counter',
+                  f'nucleo_alerts_sent_total {bot.alert_dispatcher.sent}',
+                  '# HELP nucleo_alerts_failed_total Detector alert deliveries that failed',
+                  '# TYPE nucleo_alerts_failed_total counter',
+                  f'nucleo_alerts_failed_total {bot.alert_dispatcher.failed}',
+                  '# HELP nucleo_reactions_skipped_total Commands left without reactions because of a burst',
+                  '# TYPE nucleo_reactions_skipped_total counter',
+                  f'nucleo_reactions_skipped_total {bot.reaction_queue.skipped}',
+                  '# HELP nucleo_nucleus_retries_total Nucleus requests sent again by the retry policy',
+                  '# TYPE nucleo_nucleus_retries_total counter',
+                  f'nucleo_nucleus_retries_total {Nucleus.session.retries}'])
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    Serves `render_metrics` on `GET /metrics` for a Prometheus scraper. Meant to listen on a local or private
+    address only, there is no authentication.
+    """
+
+    def __init__(self, bot, host: str = '127.0.0.1', port: int = 9464):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.__runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        if self.__runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self.metrics)
+        self.__runner = web.AppRunner(app, access_log=None)
+        await self.__runner.setup()
+        try:
+            await web.TCPSite(self.__runner, self.host, self.port).start()
+        except OSError:
+            await self.__runner.cleanup()
+            self.__runner = None
+            raise
+
+    async def close(self):
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def metrics(self, _request: web.Request) -> web.Response:
+        return web.Response(text=render_metrics(self.bot), headers={'Content-Type': 'text/plain; version=0.0.4'})
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+
+from dependencies.database import Database
+
+log = logging.getLogger(__name__)
+
+
+class ReactionQueue:
+    """
+    Adds and removes the command start/finish reactions in the background so the commands never wait for them.
+
+    Pending reactions are kept per message and coalesce, a reaction removed before it was added is never sent. A single
+    worker sends them in order. Under a burst of more than `burst_threshold` commands in `burst_window` seconds, or
+    with `max_pending` messages already waiting, new commands get no reactions at all. Guilds can turn them off with
+    `set_enabled`, stored in `GUILD_SETTINGS`.
+    """
+
+    def __init__(self, bot, db: Database, enabled: bool = True, burst_threshold: int = 20, burst_window: float = 10,
+                 max_pending: int = 100):
+        self.bot = bot
+        self.db = db
+        self.enabled = enabled
+        self.burst_threshold = burst_threshold
+        self.burst_window = burst_window
+        self.max_pending = max_pending
+        self.skipped = 0
+        self.disabled_guilds: Set[int] = set()
+        self.__recent_commands: deque = deque()
+        # Message id -> (message, emoji -> True to add / False to remove), in the order they were queued
+        self.__pending: 'OrderedDict[int, Tuple[discord.Message, OrderedDict]]' = OrderedDict()
+        # Set by `start`, reactions queued before that are dropped
+        self.__wake: Optional[asyncio.Event] = None
+        self.__task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.__task is not None:
+            return
+        self.disabled_guilds = set(await self.db.get_reactions_disabled_guilds())
+        self.__wake = asyncio.Event()
+        self.__task = asyncio.ensure_future(self.__run())
+
+    async def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+        self.__pending.clear()
+
+    async def set_enabled(self, guild_id: int, enabled: bool):
+        await self.db.set_guild_reactions(guild_id, enabled)
+        if enabled:
+            self.disabled_guilds.discard(guild_id)
+        else:
+            self.disabled_guilds.add(guild_id)
+
+    def should_react(self, message: discord.Message) -> bool:
+        """Decides once per command whether its reactions are sent, counts the command towards the burst window"""
+        if not self.enabled or self.__task is None:
+            return False
+        if message.guild is not None and message.guild.id in self.disabled_guilds:
+            return False
+        now = time.monotonic()
+        recent = self.__recent_commands
+        recent.append(now)
+        while recent[0] < now - self.burst_window:
+            recent.popleft()
+        if len(recent) > self.burst_threshold or len(self.__pending) >= self.max_pending:
+            self.skipped += 1
+            return False
+        return True
+
+    def add(self, message: discord.Message, emoji: str):
+        self.__queue(message, emoji, True)
+
+    def remove(self, message: discord.Message, emoji: str):
+        self.__queue(message, emoji, False)
+
+    def __queue(self, message: discord.Message, emoji: str, add: bool):
+        if self.__wake is None:
+            return
+        entry = self.__pending.get(message.id)
+        if entry is None:
+            entry = self.__pending[message.id] = (message, OrderedDict())
+        reactions = entry[1]
+        if not add and reactions.get(emoji) is True:
+            # Never sent, nothing to remove
+            del reactions[emoji]
+            if not reactions:
+                del self.__pending[message.id]
+            return
+        reactions[emoji] = add
+        reactions.move_to_end(emoji)
+        self.__wake.set()
+
+    async def __run(self):
+        while True:
+            await self.__wake.wait()
+            self.__wake.clear()
+            while self.__pending:
+                _message_id, (message, reactions) = self.__pending.popitem(last=False)
+                try:
+                    await self.__send(message, reactions)
+                except Exception:
+                    # Connection errors and timeouts from the HTTP layer, the worker keeps going with the next message
+                    log.exception('Reactions on message %d failed', message.id)
+
+    async def __send(self, message: discord.Message, reactions: Dict[str, bool]):
+        for emoji, add in reactions.items():
+            try:
+                if add:
+                    await message.add_reaction(emoji)
+                else:
+                    await message.remove_reaction(emoji, self.bot.user)
+            except (discord.Forbidden, discord.NotFound):
+                # Missing permissions or a deleted message, the other reactions would fail the same way
+                return
+            except discord.HTTPException as err:
+                log.info('Reaction %s on message %d failed: %s', emoji, message.id, err,
+                         extra={'event': 'reactions.failed'})
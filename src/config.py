@@ -1,5 +1,6 @@
 from ast import literal_eval
 from configparser import ConfigParser
+from typing import Optional
 
 import exceptions
 
@@ -40,7 +41,27 @@ class Settings:
         config['main bot'] = {'token': '', 'prefix': '!', 'description': 'A bot'}
         config['test bot'] = {'token': '', 'prefix': '?', 'description': 'A test bot'}
         config['database'] = {'host': '', 'name': '', 'user': '', 'port': '3306', 'password': '', 'min conns': '1',
-                              'max conns': '5'}
+                              'max conns': '5', 'cache ttl': '60', 'cache size': '1024',
+                              'health check interval': '60'}
+        config['nucleus'] = {'base url': 'https://nucleus.amcspsgtech.in', 'conn limit': '100',
+                             'conn limit per host': '10', 'dns cache ttl': '300', 'keepalive timeout': '30',
+                             'connect timeout': '10', 'request timeout': '30', 'max retries': '2',
+                             'retry backoff': '0.5', 'retry statuses': '(502, 503, 504)'}
+        config['detector'] = {'max concurrent accounts': '5', 'account timeout': '300', 'backoff base': '300',
+                              'backoff max': '21600', 'backoff jitter': '0.2', 'keepalive interval': '60',
+                              'cookie max age': '86400', 'cookie refresh margin': '3600',
+                              'cookie refresh spread': '0.1', 'max concurrent logins': '2', 'node id': '',
+                              'lease': '120', 'lease renew interval': '30', 'node ttl': '90'}
+        config['sharding'] = {'shard count': 'None', 'shard ids': 'None'}
+        config['cache'] = {'schedule ttl': '300', 'assignments ttl': '60', 'resources ttl': '300',
+                           'profile ttl': '3600', 'stale ttl': '600'}
+        config['outbox'] = {'batch size': '100', 'poll interval': '5', 'lease': '60', 'max attempts': '8',
+                            'retry delay': '30', 'retention days': '30'}
+        config['reactions'] = {'enabled': 'True', 'burst threshold': '20', 'burst window': '10', 'max pending': '100'}
+        config['metrics'] = {'enabled': 'True', 'host': '127.0.0.1', 'port': '9464'}
+        config['logging'] = {'level': 'INFO', 'levels': "{'discord': 'WARNING', 'aiohttp.access': 'WARNING'}",
+                             'json': 'True',
+                             'sample rates': "{'detector.session_expired': 0.2, 'reactions.failed': 0.1}"}
         config['misc'] = {'use-test': 'False'}
         with open('../settings.ini', 'w') as settings_file:
             config.write(settings_file)
@@ -59,6 +80,68 @@ class Settings:
         self.db_port: int = literal_eval(db_section['port'])
         self.min_db_conns: int = literal_eval(db_section['min conns'])
         self.max_db_conns: int = literal_eval(db_section['max conns'])
+        self.db_cache_ttl: float = literal_eval(db_section.get('cache ttl', '60'))
+        self.db_cache_size: int = literal_eval(db_section.get('cache size', '1024'))
+        self.db_health_check_interval: float = literal_eval(db_section.get('health check interval', '60'))
+        # Settings files written before the section existed fall back to the defaults
+        nucleus_section = config_file['nucleus'] if config_file.has_section('nucleus') else {}
+        self.nucleus_base_url: str = nucleus_section.get('base url', 'https://nucleus.amcspsgtech.in')
+        self.nucleus_conn_limit: int = literal_eval(nucleus_section.get('conn limit', '100'))
+        self.nucleus_conn_limit_per_host: int = literal_eval(nucleus_section.get('conn limit per host', '10'))
+        self.nucleus_dns_cache_ttl: int = literal_eval(nucleus_section.get('dns cache ttl', '300'))
+        self.nucleus_keepalive_timeout: float = literal_eval(nucleus_section.get('keepalive timeout', '30'))
+        self.nucleus_connect_timeout: float = literal_eval(nucleus_section.get('connect timeout', '10'))
+        self.nucleus_request_timeout: float = literal_eval(nucleus_section.get('request timeout', '30'))
+        self.nucleus_max_retries: int = literal_eval(nucleus_section.get('max retries', '2'))
+        self.nucleus_retry_backoff: float = literal_eval(nucleus_section.get('retry backoff', '0.5'))
+        self.nucleus_retry_statuses: tuple = literal_eval(nucleus_section.get('retry statuses', '(502, 503, 504)'))
+        detector_section = config_file['detector'] if config_file.has_section('detector') else {}
+        self.detector_max_accounts: int = literal_eval(detector_section.get('max concurrent accounts', '5'))
+        self.detector_account_timeout: float = literal_eval(detector_section.get('account timeout', '300'))
+        self.detector_backoff_base: float = literal_eval(detector_section.get('backoff base', '300'))
+        self.detector_backoff_max: float = literal_eval(detector_section.get('backoff max', '21600'))
+        self.detector_backoff_jitter: float = literal_eval(detector_section.get('backoff jitter', '0.2'))
+        self.detector_keepalive_interval: float = literal_eval(detector_section.get('keepalive interval', '60'))
+        self.detector_cookie_max_age: float = literal_eval(detector_section.get('cookie max age', '86400'))
+        self.detector_cookie_refresh_margin: float = literal_eval(detector_section.get('cookie refresh margin', '3600'))
+        self.detector_cookie_refresh_spread: float = literal_eval(detector_section.get('cookie refresh spread', '0.1'))
+        self.detector_max_logins: int = literal_eval(detector_section.get('max concurrent logins', '2'))
+        # Empty picks host:pid, has to be unique among the running processes
+        self.detector_node_id: str = detector_section.get('node id', '')
+        self.detector_lease: float = literal_eval(detector_section.get('lease', '120'))
+        self.detector_lease_renew_interval: float = literal_eval(detector_section.get('lease renew interval', '30'))
+        self.detector_node_ttl: float = literal_eval(detector_section.get('node ttl', '90'))
+        sharding_section = config_file['sharding'] if config_file.has_section('sharding') else {}
+        self.shard_count: Optional[int] = literal_eval(sharding_section.get('shard count', 'None'))
+        self.shard_ids: Optional[list] = literal_eval(sharding_section.get('shard ids', 'None'))
+        cache_section = config_file['cache'] if config_file.has_section('cache') else {}
+        self.cache_ttls: dict = {endpoint: literal_eval(cache_section.get(f'{endpoint} ttl', default))
+                                 for endpoint, default in (('schedule', '300'), ('assignments', '60'),
+                                                           ('resources', '300'), ('profile', '3600'))}
+        self.cache_stale_ttl: float = literal_eval(cache_section.get('stale ttl', '600'))
+        outbox_section = config_file['outbox'] if config_file.has_section('outbox') else {}
+        self.outbox_batch_size: int = literal_eval(outbox_section.get('batch size', '100'))
+        self.outbox_poll_interval: float = literal_eval(outbox_section.get('poll interval', '5'))
+        self.outbox_lease: float = literal_eval(outbox_section.get('lease', '60'))
+        self.outbox_max_attempts: int = literal_eval(outbox_section.get('max attempts', '8'))
+        self.outbox_retry_delay: float = literal_eval(outbox_section.get('retry delay', '30'))
+        self.outbox_retention_days: int = literal_eval(outbox_section.get('retention days', '30'))
+        reactions_section = config_file['reactions'] if config_file.has_section('reactions') else {}
+        self.reactions_enabled: bool = literal_eval(reactions_section.get('enabled', 'True'))
+        self.reactions_burst_threshold: int = literal_eval(reactions_section.get('burst threshold', '20'))
+        self.reactions_burst_window: float = literal_eval(reactions_section.get('burst window', '10'))
+        self.reactions_max_pending: int = literal_eval(reactions_section.get('max pending', '100'))
+        logging_section = config_file['logging'] if config_file.has_section('logging') else {}
+        self.log_level: str = logging_section.get('level', 'INFO')
+        self.log_levels: dict = literal_eval(logging_section.get(
+            'levels', "{'discord': 'WARNING', 'aiohttp.access': 'WARNING'}"))
+        self.log_json: bool = literal_eval(logging_section.get('json', 'True'))
+        self.log_sample_rates: dict = literal_eval(logging_section.get('sample rates', '{}'))
+        metrics_section = config_file['metrics'] if config_file.has_section('metrics') else {}
+        self.metrics_enabled: bool = literal_eval(metrics_section.get('enabled', 'True'))
+        self.metrics_host: str = metrics_section.get('host', '127.0.0.1')
+        # Processes started from the same settings file try the same port, the ones after the first run without it
+        self.metrics_port: int = literal_eval(metrics_section.get('port', '9464'))
 
     def __init__(self):
         self.bot_section = None
@@ -75,4 +158,52 @@ class Settings:
         self.db_password = ''
         self.min_db_conns = 0
         self.max_db_conns = 0
+        self.db_cache_ttl = 60
+        self.db_cache_size = 1024
+        self.db_health_check_interval = 60
+        self.nucleus_base_url = 'https://nucleus.amcspsgtech.in'
+        self.nucleus_conn_limit = 100
+        self.nucleus_conn_limit_per_host = 10
+        self.nucleus_dns_cache_ttl = 300
+        self.nucleus_keepalive_timeout = 30
+        self.nucleus_connect_timeout = 10
+        self.nucleus_request_timeout = 30
+        self.nucleus_max_retries = 2
+        self.nucleus_retry_backoff = 0.5
+        self.nucleus_retry_statuses = (502, 503, 504)
+        self.detector_max_accounts = 5
+        self.detector_account_timeout = 300
+        self.detector_backoff_base = 300
+        self.detector_backoff_max = 21600
+        self.detector_backoff_jitter = 0.2
+        self.detector_keepalive_interval = 60
+        self.detector_cookie_max_age = 86400
+        self.detector_cookie_refresh_margin = 3600
+        self.detector_cookie_refresh_spread = 0.1
+        self.detector_max_logins = 2
+        self.detector_node_id = ''
+        self.detector_lease = 120
+        self.detector_lease_renew_interval = 30
+        self.detector_node_ttl = 90
+        self.shard_count = None
+        self.shard_ids = None
+        self.cache_ttls = {}
+        self.cache_stale_ttl = 600
+        self.outbox_batch_size = 100
+        self.outbox_poll_interval = 5
+        self.outbox_lease = 60
+        self.outbox_max_attempts = 8
+        self.outbox_retry_delay = 30
+        self.outbox_retention_days = 30
+        self.reactions_enabled = True
+        self.reactions_burst_threshold = 20
+        self.reactions_burst_window = 10
+        self.reactions_max_pending = 100
+        self.log_level = 'INFO'
+        self.log_levels = {}
+        self.log_json = True
+        self.log_sample_rates = {}
+        self.metrics_enabled = True
+        self.metrics_host = '127.0.0.1'
+        self.metrics_port = 9464
         self.__load_values_to_attribute()
@@ -1,3 +1,3 @@
 # from . import database_exceptions
-from .database import Database
+from .database import Database, OutboxAlert, Permission
 from .database_exceptions import *
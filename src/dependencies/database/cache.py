@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+
+class TTLCache:
+    """
+    A small LRU cache whose entries expire after `ttl` seconds.
+
+    None of the methods await, so they are atomic on the event loop. A lookup that misses should grab the
+    `generation` before querying the database and pass it back to `set`, results read before an invalidation are
+    then dropped instead of repopulating the cache with stale data.
+    """
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return TTLCache.MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: int = None):
+        if generation is not None and generation != self.generation:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self.generation += 1
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        self.generation += 1
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def clear(self):
+        self.generation += 1
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
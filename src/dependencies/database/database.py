@@ -1,264 +1,419 @@
 import asyncio
+import json
+import logging
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, List, NamedTuple, Optional, Tuple
 import asyncpg
 
+from dependencies.metrics import Histogram
+from dependencies.tracing import span
+from .cache import TTLCache
 from .database_exceptions import DatabaseDuplicateEntry, DatabaseInitError, DatabaseMissingArguments
+from .migrator import migrate
+from .queries import QUERIES
+
+log = logging.getLogger(__name__)
+
+
+class Permission(NamedTuple):
+    level: Optional[int]
+    name: Optional[str]
+
+
+class OutboxAlert(NamedTuple):
+    alert_id: int
+    guild_id: int
+    channel_id: int
+    role_id: Optional[int]
+    item_type: str
+    embed: dict
+    mentioned: bool
 
 
 class Database:
     def __init__(self, database_host: str, database_name: str, database_user: str, database_password,
                  database_port: int = 5432, min_conns: int = 3, max_conns: int = 10,
-                 loop: asyncio.AbstractEventLoop = None):
+                 cache_ttl: float = 60, cache_size: int = 1024, health_check_interval: float = 60):
         self.db_connections = {}
+        # Caches for the lookups done by the command checks, keyed by the sorted id group / (server_id, channel_id)
+        self.permission_cache = TTLCache(cache_size, cache_ttl)
+        self.whitelist_cache = TTLCache(cache_size, cache_ttl)
+        self.query_metrics = {name: Histogram() for name in QUERIES}
         self.db_pool: asyncpg.pool.Pool
         self.running = False
+        # Kept up to date by the health check loop, the detector and the alert dispatcher pause while it is False
+        self.healthy = False
+        self.health_check_interval = health_check_interval
         self._database_data = {'dsn': f'postgres://{database_user}:{database_password}'
                                       f'@{database_host}:{database_port}/{database_name}', 'min_size': min_conns,
                                'max_size': max_conns}
-
-        self.loop = loop
-        if self.loop is None:
-            self.loop = asyncio.get_event_loop()
-
-        self.__async_init_task = self.loop.create_task(self.__pool_starter__())
-
-    async def __pool_starter__(self):
+        # Created from a coroutine, in Python 3.8 an Event made here would bind to whichever loop was current
+        self.__ready: Optional[asyncio.Event] = None
+        self.__health_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Creates the pool, applies the pending migrations and warms up the connections. Has to be awaited before the
+        bot connects, the query methods assume the pool is ready and don't check for it.
+        """
+        if self.running:
+            return
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
         try:
-            self.db_pool: asyncpg.pool.Pool = await asyncpg.create_pool(**self._database_data)
-            self.running = True
-            await self.__database_initializer__()
-            return True
+            # Every registered query has to fit in the statement cache to stay prepared on each connection
+            self.db_pool: asyncpg.pool.Pool = await asyncpg.create_pool(
+                **self._database_data, statement_cache_size=max(100, 2 * len(QUERIES)))
+            await self.__apply_migrations()
+            await self.__warm_up()
         except Exception as e:
             raise DatabaseInitError(f'Database Initialization Error: {type(e)}: {e}') from e
-
-    async def __init_check__(self):
+        self.running = True
+        self.healthy = True
+        self.__health_task = asyncio.ensure_future(self.__health_check_loop())
+        self.__ready.set()
+
+    async def __warm_up(self):
+        """Opens `min_size` connections and round trips on each so the first commands don't pay for it"""
+        connections = []
+        try:
+            for _ in range(self._database_data['min_size']):
+                connections.append(await self.db_pool.acquire())
+            await asyncio.gather(*(self.__run_query__('fetchval', 'health_check', connection=connection)
+                                   for connection in connections))
+        finally:
+            for connection in connections:
+                await self.db_pool.release(connection)
+
+    async def __health_check_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.__run_query__('fetchval', 'health_check')
+                self.healthy = True
+            except (asyncpg.PostgresError, OSError, asyncio.TimeoutError) as err:
+                self.healthy = False
+                log.warning('Database health check failed: %s', err)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.running
+
+    async def wait_until_ready(self):
+        """Only awaited while starting up, the steady state path checks `is_ready` first"""
         if self.running:
             return
-        await self.__async_init_task
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+        await self.__ready.wait()
+
+    async def close(self):
+        if self.__health_task is not None:
+            self.__health_task.cancel()
+            self.__health_task = None
+        if self.running:
+            self.running = False
+            await self.db_pool.close()
 
     async def test(self):
-        await self.__init_check__()
         data = await self.db_pool.fetch('SELECT version();')
-        print(data)
+        log.info('%s', data)
+
+    async def __apply_migrations(self):
+        async with self.db_pool.acquire() as connection:
+            await migrate(connection)
 
-    async def __database_initializer__(self):
+    async def __run_query__(self, method: str, name: str, *args, connection: asyncpg.Connection = None):
+        """Runs the registered query `name` with `fetch`, `fetchrow`, `fetchval`, `execute` or `executemany`"""
+        executor = connection if connection is not None else self.db_pool
+        start = time.perf_counter()
         try:
-            with open('./dependencies/database/database_initialization.sql') as file:
-                query = file.read()
-                await self.db_pool.execute(query)
-        except FileNotFoundError:
-            print('Please run the the launcher with the repository as the working directory.')
+            with span('db', name):
+                return await getattr(executor, method)(QUERIES[name], *args)
+        finally:
+            self.query_metrics[name].observe(time.perf_counter() - start)
+
+    def query_stats(self) -> dict:
+        """Latency summary and call count of every query that has run at least once"""
+        return {name: histogram.summary() for name, histogram in self.query_metrics.items() if histogram.count}
+
+    def cache_stats(self) -> dict:
+        return {'permission': self.permission_cache.stats(), 'whitelist': self.whitelist_cache.stats()}
+
+    async def resolve_permissions(self, author_ids: Iterable[int], *target_ids: int) -> List[Permission]:
+        """
+        Resolves the effective permission of the author and of every target in a single round trip.
+
+        author_ids: Iterable[int] - The author's id along with the ids of their roles.
+        target_ids: int - Ids resolved on their own, ex: the user or role being authorized.
+        Returns the author's `Permission` followed by one per target, with a None level and name when no entry
+        applies.
+        """
+        groups = [tuple(sorted(set(author_ids))), *((target_id,) for target_id in target_ids)]
+        if not all(groups):
+            raise DatabaseMissingArguments('Missing arguments at the permission resolver')
+        permissions = {}
+        for ids in groups:
+            cached = self.permission_cache.get(ids)
+            if cached is not TTLCache.MISSING:
+                permissions[ids] = cached
+        missing = [ids for ids in dict.fromkeys(groups) if ids not in permissions]
+        if missing:
+            generation = self.permission_cache.generation
+            group_indexes = [index for index, ids in enumerate(missing) for _ in ids]
+            item_ids = [item_id for ids in missing for item_id in ids]
+            for row in await self.__run_query__('fetch', 'resolve_permissions', group_indexes, item_ids):
+                permission = Permission(row[1], row[2])
+                permissions[missing[row[0]]] = permission
+                self.permission_cache.set(missing[row[0]], permission, generation)
+        return [permissions[ids] for ids in groups]
 
     async def permission_retriever(self, *ids, with_name=False):
-        await self.__init_check__()
-        if len(ids) == 0:
-            raise DatabaseMissingArguments('Missing arguments at the permission retriever')
-        if with_name:
-            query = f'SELECT MAX("LEVEL"), "NAME" FROM "USER_AUTH" INNER JOIN "PERMISSIONS_NAMES" USING ("LEVEL") ' \
-                    f'WHERE "ITEM_ID" IN({", ".join(f"${x + 1}" for x in range(len(ids)))})'
-        else:
-            query = f'SELECT MAX("LEVEL") FROM "USER_AUTH" WHERE "ITEM_ID" IN ' \
-                    f'({", ".join(f"${x + 1}" for x in range(len(ids)))}) '
-        data = await self.db_pool.fetchrow(query, *ids)
-        permission_level = data[0]
+        permission = (await self.resolve_permissions(ids))[0]
         if with_name:
-            return permission_level, data[1]
-        return permission_level
+            return permission.level, permission.name
+        return permission.level
 
     async def auth_retriever(self, include_roles: bool = False):
-        await self.__init_check__()
-        query = 'SELECT "ITEM_ID", "LEVEL", "NAME", "ROLE" FROM "USER_AUTH" ' \
-                'INNER JOIN "PERMISSIONS_NAMES" USING ("LEVEL") '
-        if include_roles is False:
-            query = ' '.join((query, 'AND USER_AUTH.`ROLE` = 0'))
-
-        data = await self.db_pool.fetch(query)
+        data = await self.__run_query__('fetch', 'auth_retriever' if include_roles else 'auth_retriever_users')
         return [{'id': item[0], 'level': item[1], 'nick': item[2], 'role': bool(item[3])} for item in data]
 
     async def auth_adder(self, target_id: int, level: int, role: bool = False, server_id: int = 0):
-        await self.__init_check__()
-        query = 'INSERT INTO "USER_AUTH" ("ITEM_ID", "LEVEL", "ROLE", "SERVER_ID") VALUES ($1, $2, $3, $4)'
         try:
-            await self.db_pool.execute(query, target_id, level, int(role), server_id)
+            await self.__run_query__('execute', 'auth_adder', target_id, level, int(role), server_id)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry('USER_AUTH has duplicates!') from asyncpg.IntegrityConstraintViolationError
+        finally:
+            self.__invalidate_permission(target_id)
 
     async def auth_changer(self, target_id: int, level: int):
-        await self.__init_check__()
-        query = 'UPDATE "USER_AUTH" set "LEVEL" = $1 where "ITEM_ID" = $2'
-        await self.db_pool.execute(query, level, target_id)
+        try:
+            await self.__run_query__('execute', 'auth_changer', level, target_id)
+        finally:
+            self.__invalidate_permission(target_id)
+
+    def __invalidate_permission(self, target_id: int):
+        self.permission_cache.invalidate_where(lambda key: target_id in key)
 
     async def whitelist_check(self, server_id: int, channel_id: int) -> int:
-        await self.__init_check__()
-        query = 'SELECT "WHITELIST_LEVEL" FROM "CHANNEL_AUTH" WHERE "SERVER_ID" = $1 AND "CHANNEL_ID" = $2'
-        data = await self.db_pool.fetchval(query, server_id, channel_id)
+        cache_key = (server_id, channel_id)
+        cached = self.whitelist_cache.get(cache_key)
+        if cached is not TTLCache.MISSING:
+            return cached
+        generation = self.whitelist_cache.generation
+        data = await self.__run_query__('fetchval', 'whitelist_check', server_id, channel_id)
+        self.whitelist_cache.set(cache_key, data, generation)
         return data
 
     async def whitelist_add(self, server_id: int, channel_id: int, whitelist_level: int = 1):
-        await self.__init_check__()
-        query = 'INSERT INTO "CHANNEL_AUTH" ("SERVER_ID", "CHANNEL_ID", "WHITELIST_LEVEL") VALUES ($1, $2, $3)'
         try:
-            await self.db_pool.execute(query, server_id, channel_id, whitelist_level)
+            await self.__run_query__('execute', 'whitelist_add', server_id, channel_id, whitelist_level)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry('CHANNEL_AUTH has duplicates!') from asyncpg.IntegrityConstraintViolationError
+        finally:
+            self.whitelist_cache.invalidate((server_id, channel_id))
 
     async def whitelist_remove(self, server_id: int, channel_id: int):
-        await self.__init_check__()
-        query = 'DELETE FROM "CHANNEL_AUTH" WHERE "SERVER_ID" = $1 AND "CHANNEL_ID" = $2'
-        await self.db_pool.execute(query, server_id, channel_id)
+        try:
+            await self.__run_query__('execute', 'whitelist_remove', server_id, channel_id)
+        finally:
+            self.whitelist_cache.invalidate((server_id, channel_id))
 
     async def add_nucleus_user(self, user_id: str, first_name: str, last_name: str, email: str, mobile: str,
                                class_id: str, year: int, cookies: str, last_login: datetime, discord_id: int):
-        await self.__init_check__()
-        nucleus_query = 'INSERT INTO "NUCLEUS_USERS" ("USER_ID", "FIRST_NAME", "LAST_NAME", "EMAIL", "MOBILE_NO", ' \
-                        '"CLASS_ID", "YEAR", "COOKIES", "LAST_LOGIN", "DISCORD_ID") VALUES ($1, $2, $3, $4, $5, $6, ' \
-                        '$7, $8, $9, $10) '
         try:
-            await self.db_pool.execute(nucleus_query, user_id, first_name, last_name, email, mobile, class_id, year,
-                                       cookies, last_login, discord_id)
+            await self.__run_query__('execute', 'add_nucleus_user', user_id, first_name, last_name, email, mobile,
+                                     class_id, year, cookies, last_login, discord_id)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry(
                 'NUCLEUS_USERS has duplicates!') from asyncpg.IntegrityConstraintViolationError
 
     async def update_nucleus_user(self, user_id: str, first_name: str, last_name: str, email: str, mobile: str,
                                   class_id: str, year: int, cookies: str, last_login: datetime, discord_id: int):
-        await self.__init_check__()
-        query = 'UPDATE "NUCLEUS_USERS" SET "USER_ID"= $1, "FIRST_NAME" = $2, "LAST_NAME" = $3, "EMAIL" = $4, ' \
-                '"MOBILE_NO" = $5, ' \
-                '"CLASS_ID" = $6, "YEAR" = $7, "COOKIES" = $8, "LAST_LOGIN" = $9 WHERE "DISCORD_ID" = $10'
-        await self.db_pool.execute(query, user_id, first_name, last_name, email, mobile, class_id, year, cookies,
-                                   last_login, discord_id)
+        await self.__run_query__('execute', 'update_nucleus_user', user_id, first_name, last_name, email, mobile,
+                                 class_id, year, cookies, last_login, discord_id)
+
+    async def set_nucleus_user_expired(self, user_id: str, expired: bool):
+        await self.__run_query__('execute', 'set_nucleus_user_expired', user_id, expired)
 
     async def delete_nucleus_user(self, user_id: str):
-        await self.__init_check__()
-        query = 'DELETE FROM "NUCLEUS_USERS" WHERE "USER_ID"=$1'
-        await self.db_pool.execute(query, user_id)
+        await self.__run_query__('execute', 'delete_nucleus_user', user_id)
 
     async def get_assignments_last_checked(self, class_id: str):
-        await self.__init_check__()
-        query = 'SELECT "COURSE_ID", "ASSIGNMENTS_LAST_CHECKED" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID" = $1'
-        result = await self.db_pool.fetch(query, class_id)
+        result = await self.__run_query__('fetch', 'get_assignments_last_checked', class_id)
         return result
 
+    async def get_courses_last_checked(self, class_id: str) -> dict:
+        """Returns {course_id: (assignments_last_checked, resources_last_checked)} for the class"""
+        records = await self.__run_query__('fetch', 'get_courses_last_checked', class_id)
+        return {record[0]: (record[1], record[2]) for record in records}
+
     async def update_assignments_last_uploaded(self, class_id: str, course_id: str, new_date: datetime):
-        await self.__init_check__()
-        query = 'UPDATE "NUCLEUS_COURSES" SET "ASSIGNMENTS_LAST_CHECKED" = $3 WHERE "CLASS_ID" = $1 AND "COURSE_ID" = ' \
-                '$2 '
-        await self.db_pool.execute(query, class_id, course_id, new_date)
+        await self.__run_query__('execute', 'update_assignments_last_uploaded', class_id, course_id, new_date)
 
     async def get_resources_last_checked(self, class_id: str):
-        await self.__init_check__()
-        query = 'SELECT "COURSE_ID", "RESOURCES_LAST_CHECKED" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID" = $1'
-        result = await self.db_pool.fetch(query, class_id)
+        result = await self.__run_query__('fetch', 'get_resources_last_checked', class_id)
         return result
 
     async def update_resouces_last_uploaded(self, class_id: str, course_id: str, new_date: datetime):
-        await self.__init_check__()
-        query = 'UPDATE "NUCLEUS_COURSES" SET "RESOURCES_LAST_CHECKED" = $3 WHERE "CLASS_ID" = $1 AND "COURSE_ID" = $2'
-        await self.db_pool.execute(query, class_id, course_id, new_date)
+        await self.__run_query__('execute', 'update_resources_last_uploaded', class_id, course_id, new_date)
+
+    @staticmethod
+    def __latest_per_course(updates: Iterable[Tuple[str, str, datetime]]) -> List[Tuple[str, str, datetime]]:
+        latest = {}
+        for class_id, course_id, new_date in updates:
+            key = (class_id, course_id)
+            if key not in latest or new_date > latest[key]:
+                latest[key] = new_date
+        return [(class_id, course_id, new_date) for (class_id, course_id), new_date in latest.items()]
+
+    async def record_detection(self, assignment_updates: Iterable[Tuple[str, str, datetime]],
+                               resource_updates: Iterable[Tuple[str, str, datetime]],
+                               alerts: Iterable[Tuple[str, int, int, Optional[int], str, str, dict]]):
+        """
+        Moves the watermarks forward and queues the alerts in one transaction, either both are stored or neither.
+
+        alerts: Iterable - (class_id, guild_id, channel_id, role_id, item_type, item_id, embed) rows, an item already
+        queued for the channel is skipped.
+        """
+        assignment_rows = self.__latest_per_course(assignment_updates)
+        resource_rows = self.__latest_per_course(resource_updates)
+        alert_rows = [(*alert[:6], json.dumps(alert[6])) for alert in alerts]
+        if not (assignment_rows or resource_rows or alert_rows):
+            return
+        async with self.db_pool.acquire() as connection:
+            async with connection.transaction():
+                if assignment_rows:
+                    await self.__run_query__('executemany', 'bulk_update_assignments_last_uploaded', assignment_rows,
+                                             connection=connection)
+                if resource_rows:
+                    await self.__run_query__('executemany', 'bulk_update_resources_last_uploaded', resource_rows,
+                                             connection=connection)
+                if alert_rows:
+                    await self.__run_query__('executemany', 'enqueue_alert', alert_rows, connection=connection)
+
+    async def claim_alerts(self, limit: int, lease: float, max_attempts: int) -> List[OutboxAlert]:
+        """Leases up to `limit` pending alerts for `lease` seconds, rows leased by another dispatcher are skipped"""
+        records = await self.__run_query__('fetch', 'claim_alerts', limit, float(lease), max_attempts)
+        alerts = [OutboxAlert(*record[:5], json.loads(record[5]), record[6]) for record in records]
+        return sorted(alerts, key=lambda alert: alert.alert_id)
+
+    async def mark_alerts_sent(self, alert_ids: List[int]):
+        await self.__run_query__('execute', 'mark_alerts_sent', alert_ids)
+
+    async def mark_alerts_mentioned(self, alert_ids: List[int]):
+        await self.__run_query__('execute', 'mark_alerts_mentioned', alert_ids)
+
+    async def retry_alerts(self, alert_ids: List[int], delay: float):
+        await self.__run_query__('execute', 'retry_alerts', alert_ids, float(delay))
+
+    async def discard_alerts(self, alert_ids: List[int], max_attempts: int):
+        """Gives up on the alerts, they stay in the outbox with their attempts exhausted"""
+        await self.__run_query__('execute', 'discard_alerts', alert_ids, max_attempts)
+
+    async def prune_alert_outbox(self, retention_days: int, max_attempts: int):
+        """Deletes the alerts sent, discarded or out of attempts more than `retention_days` ago"""
+        await self.__run_query__('execute', 'prune_alert_outbox', retention_days, max_attempts)
+
+    async def get_reactions_disabled_guilds(self) -> List[int]:
+        return [row[0] for row in await self.__run_query__('fetch', 'get_reactions_disabled_guilds')]
+
+    async def set_guild_reactions(self, guild_id: int, enabled: bool):
+        await self.__run_query__('execute', 'set_guild_reactions', guild_id, enabled)
+
+    async def get_alert_classes(self) -> List[str]:
+        return [row[0] for row in await self.__run_query__('fetch', 'get_alert_classes')]
+
+    async def heartbeat_detector_node(self, node_id: str, node_ttl: float) -> List[str]:
+        """Records that the node is alive and returns every node alive within `node_ttl` seconds, itself included"""
+        return [row[0] for row in await self.__run_query__('fetch', 'heartbeat_detector_node', node_id,
+                                                           float(node_ttl))]
+
+    async def claim_detector_leases(self, node_id: str, class_ids: List[str], lease: float) -> List[str]:
+        """Renews the leases the node holds and takes the free or expired ones, returns the classes it now holds"""
+        if not class_ids:
+            return []
+        return [row[0] for row in await self.__run_query__('fetch', 'claim_detector_leases', node_id, class_ids,
+                                                           float(lease))]
+
+    async def release_detector_leases(self, node_id: str, class_ids: List[str]):
+        await self.__run_query__('execute', 'release_detector_leases', node_id, class_ids)
+
+    async def remove_detector_node(self, node_id: str):
+        await self.__run_query__('execute', 'remove_detector_node', node_id)
 
     async def add_nucleus_class(self, class_id: str):
-        await self.__init_check__()
-        query = 'INSERT INTO "NUCLEUS_CLASS" ("CLASS_ID") VALUES ($1)'
         try:
-            await self.db_pool.execute(query, class_id)
+            await self.__run_query__('execute', 'add_nucleus_class', class_id)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry(
                 'NUCLEUS_CLASS has duplicates!') from asyncpg.IntegrityConstraintViolationError
 
     async def get_nucleus_class(self):
-        await self.__init_check__()
-        query = 'SELECT "CLASS_ID" FROM "NUCLEUS_CLASS"'
-        records = await self.db_pool.fetch(query)
+        records = await self.__run_query__('fetch', 'get_nucleus_class')
         return [record[0] for record in records]
 
     async def add_class_alert(self, class_id: str, role_id: int, channel_id: int, guild_id: int):
-        await self.__init_check__()
-        query = 'INSERT INTO "CLASS_ALERTS" ("CLASS_ID","ROLE_ID", "ALERT_CHANNEL_ID", "ALERT_GUILD_ID") VALUES ($1, ' \
-                '$2, $3, $4) '
         try:
-            await self.db_pool.execute(query, class_id, role_id, channel_id, guild_id)
+            await self.__run_query__('execute', 'add_class_alert', class_id, role_id, channel_id, guild_id)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry(
                 'CLASS_ALERTS has duplicates!') from asyncpg.IntegrityConstraintViolationError
 
     async def add_nucleus_course(self, class_id: str, course_id: str, course_name: str, is_elective: bool,
                                  last_checked: Optional[datetime] = datetime.now()):
-        await self.__init_check__()
-        query = 'INSERT INTO "NUCLEUS_COURSES" ("CLASS_ID", "COURSE_ID", "COURSE_NAME", "IS_ELECTIVE", ' \
-                '"ASSIGNMENTS_LAST_CHECKED", "RESOURCES_LAST_CHECKED") VALUES ($1, $2, $3, $4, $5, $5) '
         try:
-            await self.db_pool.execute(query, class_id, course_id, course_name, is_elective, last_checked)
+            await self.__run_query__('execute', 'add_nucleus_course', class_id, course_id, course_name, is_elective,
+                                     last_checked)
         except asyncpg.IntegrityConstraintViolationError:
             raise DatabaseDuplicateEntry(
                 'CLASS_ALERTS has duplicates!') from asyncpg.IntegrityConstraintViolationError
 
     async def get_nucleus_course(self, class_id: str):
-        await self.__init_check__()
-        query = 'SELECT "COURSE_ID" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID"=$1'
-        records = await self.db_pool.fetch(query, class_id)
+        records = await self.__run_query__('fetch', 'get_nucleus_course', class_id)
         return [record[0] for record in records]
 
     async def get_nucleus_user_ids(self):
-        await self.__init_check__()
-        query = 'SELECT DISTINCT "USER_ID" FROM "NUCLEUS_USERS"'
-        records = await self.db_pool.fetch(query)
+        records = await self.__run_query__('fetch', 'get_nucleus_user_ids')
         return [record[0] for record in records]
 
     async def add_alert_account(self, user_id: str, password: str, cookies: str, class_id: str):
-        await self.__init_check__()
-        query = 'INSERT INTO "ALERT_ACCOUNTS" ("USER_ID", "PASSWORD", "COOKIES", "CLASS_ID") VALUES ($1, $2, $3, $4)'
-        await self.db_pool.execute(query, user_id, password, cookies, class_id)
+        await self.__run_query__('execute', 'add_alert_account', user_id, password, cookies, class_id)
 
     async def get_user(self, user_id: str):
-        await self.__init_check__()
-        query = 'SELECT * FROM "NUCLEUS_USERS" WHERE "USER_ID"=$1'
-        record = await self.db_pool.fetchrow(query, user_id)
+        record = await self.__run_query__('fetchrow', 'get_user', user_id)
         return record
 
     async def get_user_by_discord_id(self, discord_id: int):
-        await self.__init_check__()
-        query = 'SELECT * FROM "NUCLEUS_USERS" WHERE "DISCORD_ID"=$1'
-        return await self.db_pool.fetchrow(query, discord_id)
+        return await self.__run_query__('fetchrow', 'get_user_by_discord_id', discord_id)
 
     async def get_alert_accounts(self):
-        await self.__init_check__()
-        query = 'SELECT "USER_ID", "COOKIES", "CLASS_ID", "PASSWORD" FROM "ALERT_ACCOUNTS"'
-        records = await self.db_pool.fetch(query)
+        records = await self.__run_query__('fetch', 'get_alert_accounts')
         return records
 
     async def get_alert_account_by_id(self, user_id: str):
-        await self.__init_check__()
-        query = 'SELECT * FROM "ALERT_ACCOUNTS" WHERE "USER_ID"=$1'
-        return await self.db_pool.fetchrow(query, user_id)
+        return await self.__run_query__('fetchrow', 'get_alert_account_by_id', user_id)
 
     async def update_alert_account(self, user_id: str, cookies: str, password: str):
-        await self.__init_check__()
-        query = 'UPDATE "ALERT_ACCOUNTS" SET ("COOKIES","UPDATED_AT", "PASSWORD") = ($2, $3, $4) WHERE "USER_ID"=$1'
         try:
-            await self.db_pool.execute(query, user_id, cookies, datetime.now(), password)
-        except Exception as err:
-            print(err)
+            await self.__run_query__('execute', 'update_alert_account', user_id, cookies, datetime.now(), password)
+        except Exception:
+            log.exception('Updating the alert account %s failed', user_id)
+
+    async def update_alert_account_backoff(self, user_id: str, failure_count: int, next_run_at: Optional[datetime]):
+        await self.__run_query__('execute', 'update_alert_account_backoff', user_id, failure_count, next_run_at)
 
     async def get_alert_details(self, class_id: str):
-        await self.__init_check__()
-        query = 'SELECT "ALERT_CHANNEL_ID", "ALERT_GUILD_ID", "ROLE_ID" FROM "CLASS_ALERTS" WHERE "CLASS_ID"=$1'
-        records = await self.db_pool.fetch(query, class_id)
+        records = await self.__run_query__('fetch', 'get_alert_details', class_id)
         return records
 
     async def add_discord_user(self, discord_id: int, discord_username: str):
-        await self.__init_check__()
-        query = 'INSERT INTO "NUCLEUS_DISCORD_USERS" ("DISCORD_ID", "DISCORD_USERNAME") VALUES ($1, $2)'
-        await self.db_pool.execute(query, discord_id, discord_username)
+        await self.__run_query__('execute', 'add_discord_user', discord_id, discord_username)
 
     async def get_discord_user(self, discord_id: int):
-        await self.__init_check__()
-        query = 'SELECT * FROM "NUCLEUS_DISCORD_USERS" WHERE "DISCORD_ID"=$1'
-        record = await self.db_pool.fetchrow(query, discord_id)
+        record = await self.__run_query__('fetchrow', 'get_discord_user', discord_id)
         return record
 
     async def delete_discord_user(self, discord_id: int):
-        await self.__init_check__()
-        query = 'DELETE FROM "NUCLEUS_DISCORD_USERS" WHERE "DISCORD_ID"=$1'
-        await self.db_pool.execute(query, discord_id)
+        await self.__run_query__('execute', 'delete_discord_user', discord_id)
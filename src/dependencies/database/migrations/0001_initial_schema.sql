@@ -1,17 +1,17 @@
 /*
-  DATABASE INITIALIZATION FILE FOR RAIDER
+  MIGRATION 0001: INITIAL SCHEMA
 
-  Used to verify all constraints and reinforce them
-  at the start up of the bot.
+  The schema previously run from database_initialization.sql at
+  every start up, kept idempotent so existing databases adopt it.
 
 */
 
 
-/*  TABLE:  PERMISSIONS_NAMES    */
+/*  TABLE:  USER_AUTH    */
 CREATE TABLE IF NOT EXISTS "USER_AUTH"
 (
     "ENTRY_ID"  SERIAL
-        constraint channel_auth_pk
+        constraint user_auth_pk
             primary key,
     "ITEM_ID"   bigint             not null,
     "LEVEL"     int      default 0 not null,
@@ -28,7 +28,7 @@ CREATE TABLE IF NOT EXISTS "USER_AUTH"
 CREATE TABLE IF NOT EXISTS "PERMISSIONS_NAMES"
 (
     "ID"    SERIAL
-        constraint channel_auth_pk
+        constraint permissions_names_pk
             primary key,
     "NAME"  varchar(45) not null,
     "LEVEL" int         not null,
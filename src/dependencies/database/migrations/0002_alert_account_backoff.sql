@@ -0,0 +1,9 @@
+/*
+  MIGRATION 0002: ALERT ACCOUNT BACKOFF
+
+  Failure count and next eligible run of the assignments detector
+  for every alert account.
+*/
+
+ALTER TABLE "ALERT_ACCOUNTS" ADD COLUMN IF NOT EXISTS "FAILURE_COUNT" int default 0 not null;
+ALTER TABLE "ALERT_ACCOUNTS" ADD COLUMN IF NOT EXISTS "NEXT_RUN_AT" timestamp;
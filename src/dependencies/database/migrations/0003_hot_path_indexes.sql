@@ -0,0 +1,30 @@
+/*
+  MIGRATION 0003: HOT PATH INDEXES
+
+  Indexes for the lookups done on every command and detector
+  tick that no existing index serves.
+*/
+
+/*  NUCLEUS_USERS: get_user_by_discord_id on every nucleus command, get_user by USER_ID  */
+DO
+$$
+    BEGIN
+        /* The primary key already covers DISCORD_ID on databases created from 0001, older tables may lack it */
+        IF NOT EXISTS(SELECT 1
+                      FROM pg_index i
+                               JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                      WHERE i.indrelid = '"NUCLEUS_USERS"'::regclass
+                        AND a.attname = 'DISCORD_ID') THEN
+            CREATE UNIQUE INDEX "NUCLEUS_USERS_DISCORD_ID_IDX" ON "NUCLEUS_USERS" ("DISCORD_ID");
+        END IF;
+    END
+$$;
+CREATE INDEX IF NOT EXISTS "NUCLEUS_USERS_USER_ID_IDX" ON "NUCLEUS_USERS" ("USER_ID");
+
+/*
+  Already served, measured with benchmarks.db_lookups:
+  CHANNEL_AUTH: whitelist_check by the CHANNEL_ID_UNIQUE index, a single row per channel.
+  USER_AUTH: resolve_permissions by the ITEM_ID_UNIQUE index, a single row per id.
+  NUCLEUS_COURSES: the watermarks of a class by the leading CLASS_ID of UNIQUE_ENTRY_COURSES. A covering index
+  would also lose the HOT updates of the watermark columns written on every detection.
+*/
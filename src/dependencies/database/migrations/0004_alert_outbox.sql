@@ -0,0 +1,33 @@
+/*
+  MIGRATION 0004: ALERT OUTBOX
+
+  Alerts found by the assignments detector, written in the same
+  transaction as the watermarks and drained by the alert dispatcher.
+  An item is queued once per channel, re-detections are ignored.
+*/
+
+CREATE TABLE IF NOT EXISTS "ALERT_OUTBOX"
+(
+    "ALERT_ID"        bigserial
+        constraint alert_outbox_pk
+            primary key,
+    "CLASS_ID"        varchar(4)                not null,
+    "GUILD_ID"        bigint                    not null,
+    "CHANNEL_ID"      bigint                    not null,
+    "ROLE_ID"         bigint,
+    "ITEM_TYPE"       varchar(12)               not null,
+    "ITEM_ID"         varchar                   not null,
+    "EMBED"           jsonb                     not null,
+    "CREATED_AT"      timestamp default now()   not null,
+    "ATTEMPTS"        int       default 0       not null,
+    "NEXT_ATTEMPT_AT" timestamp default now()   not null,
+    "LOCKED_UNTIL"    timestamp,
+    "SENT_AT"         timestamp,
+
+    constraint "UNIQUE_ENTRY_OUTBOX"
+        unique ("CHANNEL_ID", "ITEM_TYPE", "ITEM_ID")
+);
+
+/*  Only the undelivered alerts are scanned by the dispatcher  */
+CREATE INDEX IF NOT EXISTS "ALERT_OUTBOX_PENDING_IDX"
+    ON "ALERT_OUTBOX" ("NEXT_ATTEMPT_AT", "ALERT_ID") WHERE "SENT_AT" IS NULL;
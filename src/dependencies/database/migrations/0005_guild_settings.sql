@@ -0,0 +1,14 @@
+/*
+  MIGRATION 0005: GUILD SETTINGS
+
+  Per guild switches, a guild without a row uses the defaults.
+  REACTIONS toggles the command start/finish reactions.
+*/
+
+CREATE TABLE IF NOT EXISTS "GUILD_SETTINGS"
+(
+    "GUILD_ID"  bigint
+        constraint guild_settings_pk
+            primary key,
+    "REACTIONS" boolean default true not null
+);
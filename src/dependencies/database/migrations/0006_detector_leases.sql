@@ -0,0 +1,25 @@
+/*
+  MIGRATION 0006: DETECTOR LEASES
+
+  Bot processes running the assignments detector heartbeat in
+  DETECTOR_NODES and split the classes between the live ones. A class
+  is only polled by the node holding its lease in DETECTOR_LEASES, an
+  expired lease can be taken over by any node.
+*/
+
+CREATE TABLE IF NOT EXISTS "DETECTOR_NODES"
+(
+    "NODE_ID"      varchar
+        constraint detector_nodes_pk
+            primary key,
+    "HEARTBEAT_AT" timestamp default now() not null
+);
+
+CREATE TABLE IF NOT EXISTS "DETECTOR_LEASES"
+(
+    "CLASS_ID"   varchar(4)
+        constraint detector_leases_pk
+            primary key,
+    "OWNER"      varchar   not null,
+    "EXPIRES_AT" timestamp not null
+);
@@ -0,0 +1,9 @@
+/*
+  MIGRATION 0007: ALERT OUTBOX MENTIONS
+
+  Set on the alerts left over after a message pinging the role went
+  out, their retries are delivered without pinging it again.
+*/
+
+ALTER TABLE "ALERT_OUTBOX"
+    ADD COLUMN IF NOT EXISTS "MENTIONED" boolean default false not null;
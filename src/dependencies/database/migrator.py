@@ -0,0 +1,76 @@
+"""
+    Versioned schema migrations.
+
+Migrations are the `NNNN_name.sql` files of the `migrations` directory, applied in order of their version. Each
+one runs in its own transaction together with its row in `SCHEMA_MIGRATIONS`, so a failing migration leaves no
+trace and is retried on the next start. A session advisory lock keeps two bot instances from migrating at once.
+"""
+import logging
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import asyncpg
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_PATH = Path(__file__).parent / 'migrations'
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.sql$')
+# Arbitrary key of the advisory lock, shared by every instance using the database
+MIGRATION_LOCK_ID = 4_617_201
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: Path
+
+    def read(self) -> str:
+        return self.path.read_text()
+
+
+def discover_migrations(path: Path = MIGRATIONS_PATH) -> List[Migration]:
+    """Lists the migration files sorted by version, raises ValueError on a duplicate version"""
+    migrations = {}
+    for file in path.iterdir():
+        match = MIGRATION_FILE_PATTERN.match(file.name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f'Duplicate migration version {version}: {migrations[version].path.name}, {file.name}')
+        migrations[version] = Migration(version, match.group(2), file)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def applied_versions(connection: asyncpg.Connection) -> set:
+    await connection.execute('CREATE TABLE IF NOT EXISTS "SCHEMA_MIGRATIONS" ('
+                             '"VERSION" int primary key, "NAME" varchar not null, '
+                             '"APPLIED_AT" timestamp default now() not null)')
+    return {row[0] for row in await connection.fetch('SELECT "VERSION" FROM "SCHEMA_MIGRATIONS"')}
+
+
+async def migrate(connection: asyncpg.Connection, target: Optional[int] = None,
+                  path: Path = MIGRATIONS_PATH) -> List[Migration]:
+    """
+    Applies the pending migrations up to `target` (all of them by default) and returns the ones applied.
+
+    connection: asyncpg.Connection - A dedicated connection, the lock is held by its session.
+    target: int - Highest version to apply.
+    """
+    migrations = discover_migrations(path)
+    await connection.execute('SELECT pg_advisory_lock($1)', MIGRATION_LOCK_ID)
+    try:
+        # Read after taking the lock, another instance may have just applied some of them
+        applied = await applied_versions(connection)
+        pending = [migration for migration in migrations
+                   if migration.version not in applied and (target is None or migration.version <= target)]
+        for migration in pending:
+            async with connection.transaction():
+                await connection.execute(migration.read())
+                await connection.execute('INSERT INTO "SCHEMA_MIGRATIONS" ("VERSION", "NAME") VALUES ($1, $2)',
+                                         migration.version, migration.name)
+            log.info('Applied migration %04d_%s', migration.version, migration.name)
+        return pending
+    finally:
+        await connection.execute('SELECT pg_advisory_unlock($1)', MIGRATION_LOCK_ID)
@@ -0,0 +1,163 @@
+"""
+    Registry of every query run by `Database`.
+
+The SQL text of a name never changes, so asyncpg prepares each statement once
+per connection on its first use and reuses it from the connection's statement
+cache afterwards. The names are also the keys of the latency metrics.
+"""
+
+QUERIES = {
+    'health_check':
+        'SELECT 1',
+
+    # Permissions
+    # $1 holds the group index of every id in $2, one row per group with the highest level among its ids
+    'resolve_permissions':
+        'SELECT "GROUP_INDEX", "LEVEL", "NAME" FROM ('
+        'SELECT "GROUP_INDEX", MAX("LEVEL") AS "LEVEL" FROM unnest($1::int[], $2::bigint[]) AS "IDS" ("GROUP_INDEX", '
+        '"ITEM_ID") LEFT JOIN "USER_AUTH" USING ("ITEM_ID") GROUP BY "GROUP_INDEX") AS "LEVELS" '
+        'LEFT JOIN "PERMISSIONS_NAMES" USING ("LEVEL") ORDER BY "GROUP_INDEX"',
+    'auth_retriever':
+        'SELECT "ITEM_ID", "LEVEL", "NAME", "ROLE" FROM "USER_AUTH" INNER JOIN "PERMISSIONS_NAMES" USING ("LEVEL")',
+    'auth_retriever_users':
+        'SELECT "ITEM_ID", "LEVEL", "NAME", "ROLE" FROM "USER_AUTH" INNER JOIN "PERMISSIONS_NAMES" USING ("LEVEL") '
+        'WHERE "ROLE" = 0',
+    'auth_adder':
+        'INSERT INTO "USER_AUTH" ("ITEM_ID", "LEVEL", "ROLE", "SERVER_ID") VALUES ($1, $2, $3, $4)',
+    'auth_changer':
+        'UPDATE "USER_AUTH" set "LEVEL" = $1 where "ITEM_ID" = $2',
+
+    # Channel whitelist
+    'whitelist_check':
+        'SELECT "WHITELIST_LEVEL" FROM "CHANNEL_AUTH" WHERE "SERVER_ID" = $1 AND "CHANNEL_ID" = $2',
+    'whitelist_add':
+        'INSERT INTO "CHANNEL_AUTH" ("SERVER_ID", "CHANNEL_ID", "WHITELIST_LEVEL") VALUES ($1, $2, $3)',
+    'whitelist_remove':
+        'DELETE FROM "CHANNEL_AUTH" WHERE "SERVER_ID" = $1 AND "CHANNEL_ID" = $2',
+
+    # Nucleus users
+    'add_nucleus_user':
+        'INSERT INTO "NUCLEUS_USERS" ("USER_ID", "FIRST_NAME", "LAST_NAME", "EMAIL", "MOBILE_NO", "CLASS_ID", "YEAR", '
+        '"COOKIES", "LAST_LOGIN", "DISCORD_ID") VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)',
+    'update_nucleus_user':
+        'UPDATE "NUCLEUS_USERS" SET "USER_ID"= $1, "FIRST_NAME" = $2, "LAST_NAME" = $3, "EMAIL" = $4, '
+        '"MOBILE_NO" = $5, "CLASS_ID" = $6, "YEAR" = $7, "COOKIES" = $8, "LAST_LOGIN" = $9, "EXPIRED" = false '
+        'WHERE "DISCORD_ID" = $10',
+    'set_nucleus_user_expired':
+        'UPDATE "NUCLEUS_USERS" SET "EXPIRED" = $2 WHERE "USER_ID" = $1',
+    'delete_nucleus_user':
+        'DELETE FROM "NUCLEUS_USERS" WHERE "USER_ID"=$1',
+    'get_nucleus_user_ids':
+        'SELECT DISTINCT "USER_ID" FROM "NUCLEUS_USERS"',
+    'get_user':
+        'SELECT * FROM "NUCLEUS_USERS" WHERE "USER_ID"=$1',
+    'get_user_by_discord_id':
+        'SELECT * FROM "NUCLEUS_USERS" WHERE "DISCORD_ID"=$1',
+
+    # Discord users
+    'add_discord_user':
+        'INSERT INTO "NUCLEUS_DISCORD_USERS" ("DISCORD_ID", "DISCORD_USERNAME") VALUES ($1, $2)',
+    'get_discord_user':
+        'SELECT * FROM "NUCLEUS_DISCORD_USERS" WHERE "DISCORD_ID"=$1',
+    'delete_discord_user':
+        'DELETE FROM "NUCLEUS_DISCORD_USERS" WHERE "DISCORD_ID"=$1',
+
+    # Classes and courses
+    'add_nucleus_class':
+        'INSERT INTO "NUCLEUS_CLASS" ("CLASS_ID") VALUES ($1)',
+    'get_nucleus_class':
+        'SELECT "CLASS_ID" FROM "NUCLEUS_CLASS"',
+    'add_nucleus_course':
+        'INSERT INTO "NUCLEUS_COURSES" ("CLASS_ID", "COURSE_ID", "COURSE_NAME", "IS_ELECTIVE", '
+        '"ASSIGNMENTS_LAST_CHECKED", "RESOURCES_LAST_CHECKED") VALUES ($1, $2, $3, $4, $5, $5)',
+    'get_nucleus_course':
+        'SELECT "COURSE_ID" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID"=$1',
+    'get_assignments_last_checked':
+        'SELECT "COURSE_ID", "ASSIGNMENTS_LAST_CHECKED" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID" = $1',
+    'get_resources_last_checked':
+        'SELECT "COURSE_ID", "RESOURCES_LAST_CHECKED" FROM "NUCLEUS_COURSES" WHERE "CLASS_ID" = $1',
+    'get_courses_last_checked':
+        'SELECT "COURSE_ID", "ASSIGNMENTS_LAST_CHECKED", "RESOURCES_LAST_CHECKED" FROM "NUCLEUS_COURSES" '
+        'WHERE "CLASS_ID" = $1',
+    'update_assignments_last_uploaded':
+        'UPDATE "NUCLEUS_COURSES" SET "ASSIGNMENTS_LAST_CHECKED" = $3 WHERE "CLASS_ID" = $1 AND "COURSE_ID" = $2',
+    'update_resources_last_uploaded':
+        'UPDATE "NUCLEUS_COURSES" SET "RESOURCES_LAST_CHECKED" = $3 WHERE "CLASS_ID" = $1 AND "COURSE_ID" = $2',
+    'bulk_update_assignments_last_uploaded':
+        'UPDATE "NUCLEUS_COURSES" SET "ASSIGNMENTS_LAST_CHECKED" = GREATEST("ASSIGNMENTS_LAST_CHECKED", $3) '
+        'WHERE "CLASS_ID" = $1 AND "COURSE_ID" = $2',
+    'bulk_update_resources_last_uploaded':
+        'UPDATE "NUCLEUS_COURSES" SET "RESOURCES_LAST_CHECKED" = GREATEST("RESOURCES_LAST_CHECKED", $3) '
+        'WHERE "CLASS_ID" = $1 AND "COURSE_ID" = $2',
+
+    # Alerts
+    'add_class_alert':
+        'INSERT INTO "CLASS_ALERTS" ("CLASS_ID","ROLE_ID", "ALERT_CHANNEL_ID", "ALERT_GUILD_ID") '
+        'VALUES ($1, $2, $3, $4)',
+    'get_alert_details':
+        'SELECT "ALERT_CHANNEL_ID", "ALERT_GUILD_ID", "ROLE_ID" FROM "CLASS_ALERTS" WHERE "CLASS_ID"=$1',
+    'add_alert_account':
+        'INSERT INTO "ALERT_ACCOUNTS" ("USER_ID", "PASSWORD", "COOKIES", "CLASS_ID") VALUES ($1, $2, $3, $4)',
+    'get_alert_accounts':
+        'SELECT "USER_ID", "COOKIES", "CLASS_ID", "PASSWORD", "FAILURE_COUNT", "NEXT_RUN_AT", "UPDATED_AT" '
+        'FROM "ALERT_ACCOUNTS"',
+    'get_alert_account_by_id':
+        'SELECT * FROM "ALERT_ACCOUNTS" WHERE "USER_ID"=$1',
+    'update_alert_account':
+        'UPDATE "ALERT_ACCOUNTS" SET ("COOKIES","UPDATED_AT", "PASSWORD") = ($2, $3, $4) WHERE "USER_ID"=$1',
+    'update_alert_account_backoff':
+        'UPDATE "ALERT_ACCOUNTS" SET ("FAILURE_COUNT", "NEXT_RUN_AT") = ($2, $3) WHERE "USER_ID"=$1',
+
+    # Alert outbox
+    'enqueue_alert':
+        'INSERT INTO "ALERT_OUTBOX" ("CLASS_ID", "GUILD_ID", "CHANNEL_ID", "ROLE_ID", "ITEM_TYPE", "ITEM_ID", "EMBED") '
+        'VALUES ($1, $2, $3, $4, $5, $6, $7) ON CONFLICT ("CHANNEL_ID", "ITEM_TYPE", "ITEM_ID") DO NOTHING',
+    'claim_alerts':
+        'UPDATE "ALERT_OUTBOX" SET "LOCKED_UNTIL" = now() + make_interval(secs => $2), "ATTEMPTS" = "ATTEMPTS" + 1 '
+        'WHERE "ALERT_ID" IN (SELECT "ALERT_ID" FROM "ALERT_OUTBOX" WHERE "SENT_AT" IS NULL '
+        'AND "NEXT_ATTEMPT_AT" <= now() AND "ATTEMPTS" < $3 AND ("LOCKED_UNTIL" IS NULL OR "LOCKED_UNTIL" < now()) '
+        'ORDER BY "NEXT_ATTEMPT_AT", "ALERT_ID" LIMIT $1 FOR UPDATE SKIP LOCKED) '
+        'RETURNING "ALERT_ID", "GUILD_ID", "CHANNEL_ID", "ROLE_ID", "ITEM_TYPE", "EMBED", "MENTIONED"',
+    'mark_alerts_sent':
+        'UPDATE "ALERT_OUTBOX" SET "SENT_AT" = now(), "LOCKED_UNTIL" = NULL WHERE "ALERT_ID" = ANY($1::bigint[])',
+    'mark_alerts_mentioned':
+        'UPDATE "ALERT_OUTBOX" SET "MENTIONED" = true WHERE "ALERT_ID" = ANY($1::bigint[])',
+    'retry_alerts':
+        'UPDATE "ALERT_OUTBOX" SET "LOCKED_UNTIL" = NULL, "NEXT_ATTEMPT_AT" = now() + make_interval(secs => $2) '
+        'WHERE "ALERT_ID" = ANY($1::bigint[])',
+    'discard_alerts':
+        'UPDATE "ALERT_OUTBOX" SET "LOCKED_UNTIL" = NULL, "ATTEMPTS" = $2 WHERE "ALERT_ID" = ANY($1::bigint[])',
+    'prune_alert_outbox':
+        'DELETE FROM "ALERT_OUTBOX" WHERE "SENT_AT" < now() - make_interval(days => $1) '
+        'OR ("SENT_AT" IS NULL AND "ATTEMPTS" >= $2 AND "CREATED_AT" < now() - make_interval(days => $1))',
+
+    # Guild settings
+    'get_reactions_disabled_guilds':
+        'SELECT "GUILD_ID" FROM "GUILD_SETTINGS" WHERE NOT "REACTIONS"',
+    'set_guild_reactions':
+        'INSERT INTO "GUILD_SETTINGS" ("GUILD_ID", "REACTIONS") VALUES ($1, $2) '
+        'ON CONFLICT ("GUILD_ID") DO UPDATE SET "REACTIONS" = EXCLUDED."REACTIONS"',
+
+    # Detector ownership
+    'get_alert_classes':
+        'SELECT DISTINCT "CLASS_ID" FROM "ALERT_ACCOUNTS"',
+    # Beats for $1 and returns the nodes seen in the last $2 seconds, nodes silent for a day are dropped
+    'heartbeat_detector_node':
+        'WITH "PRUNED" AS (DELETE FROM "DETECTOR_NODES" WHERE "HEARTBEAT_AT" < now() - interval \'1 day\'), '
+        '"BEAT" AS (INSERT INTO "DETECTOR_NODES" ("NODE_ID", "HEARTBEAT_AT") VALUES ($1, now()) '
+        'ON CONFLICT ("NODE_ID") DO UPDATE SET "HEARTBEAT_AT" = now() RETURNING "NODE_ID") '
+        'SELECT "NODE_ID" FROM "DETECTOR_NODES" WHERE "HEARTBEAT_AT" > now() - make_interval(secs => $2) '
+        'UNION SELECT "NODE_ID" FROM "BEAT"',
+    # Takes or renews the leases of $2 for $3 seconds, returns the classes now held by $1
+    'claim_detector_leases':
+        'INSERT INTO "DETECTOR_LEASES" ("CLASS_ID", "OWNER", "EXPIRES_AT") '
+        'SELECT "CLASS_ID", $1, now() + make_interval(secs => $3) FROM unnest($2::varchar[]) AS "CLASSES" ("CLASS_ID") '
+        'ON CONFLICT ("CLASS_ID") DO UPDATE SET "OWNER" = EXCLUDED."OWNER", "EXPIRES_AT" = EXCLUDED."EXPIRES_AT" '
+        'WHERE "DETECTOR_LEASES"."OWNER" = EXCLUDED."OWNER" OR "DETECTOR_LEASES"."EXPIRES_AT" < now() '
+        'RETURNING "CLASS_ID"',
+    'release_detector_leases':
+        'DELETE FROM "DETECTOR_LEASES" WHERE "OWNER" = $1 AND "CLASS_ID" = ANY($2::varchar[])',
+    'remove_detector_node':
+        'WITH "NODE" AS (DELETE FROM "DETECTOR_NODES" WHERE "NODE_ID" = $1) '
+        'DELETE FROM "DETECTOR_LEASES" WHERE "OWNER" = $1',
+}
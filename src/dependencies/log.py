@@ -0,0 +1,128 @@
+"""
+    This Module sets up the bot logging: records are put on a queue by a `QueueHandler` on the event loop and
+formatted and written by a `QueueListener` thread, so the loop never blocks on stdout.
+
+Records are tagged with the correlation id of the command or detector tick that logged them. Records logged with an
+`event` extra can be sampled, ex: `log.info('...', extra={'event': 'detector.session_expired'})`.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, Optional
+
+# Set for the duration of a command (`cmd-<message id>`) or a detector tick (`tick-<random>`)
+correlation_id: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
+
+# Attributes every LogRecord has, anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def new_correlation_id(prefix: str) -> str:
+    return f'{prefix}-{uuid.uuid4().hex[:8]}'
+
+
+@contextmanager
+def correlated(correlation: str) -> Iterator[None]:
+    """Tags every record logged in the block, and in the tasks it starts, with `correlation`"""
+    token = correlation_id.set(correlation)
+    try:
+        yield
+    finally:
+        correlation_id.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation id onto the record, has to run on the loop where the context is"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` share of the records of every sampled event, warnings and above are always kept"""
+
+    def __init__(self, sample_rates: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.sample_rates.get(getattr(record, 'event', None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class LoopQueueHandler(QueueHandler):
+    """
+    Renders the message and the traceback before queueing, the record is then plain data the listener thread can
+    format as JSON without touching the original arguments.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-8s %(name)s [%(correlation)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.correlation = getattr(record, 'correlation_id', None) or '-'
+        return super().format(record)
+
+
+def setup_logging(level: str = 'INFO', levels: Dict[str, str] = None, json_output: bool = True,
+                  sample_rates: Dict[str, float] = None, stream=None) -> QueueListener:
+    """
+    Routes the root logger through the queue and starts the listener writing to `stream` (stdout by default).
+    `levels` overrides the level of single loggers, ex: {'discord': 'WARNING'}. Stop the returned listener on
+    shutdown to flush the queue.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = LoopQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    output_handler = logging.StreamHandler(stream or sys.stdout)
+    output_handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+    listener = QueueListener(log_queue, output_handler, respect_handler_level=True)
+    listener.start()
+    return listener
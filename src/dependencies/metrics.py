@@ -0,0 +1,125 @@
+"""
+    This Module provides the in-memory latency histograms used for the bot metrics, the per command phase timings
+and their Prometheus text rendering.
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class Histogram:
+    """A fixed bucket latency histogram (in seconds), cheap enough to observe on every call"""
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # The last slot counts the observations above the largest bucket
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, quantile: float) -> float:
+        """Estimates the quantile by interpolating linearly inside the bucket it falls in"""
+        if self.count == 0:
+            return 0.0
+        rank = quantile * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / bucket_count, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def cumulative_buckets(self) -> Dict[str, int]:
+        """Cumulative counts keyed by the upper bound, in the Prometheus `le` format"""
+        cumulative = 0
+        result = {}
+        for bound, bucket_count in zip((*self.buckets, '+Inf'), self.bucket_counts):
+            cumulative += bucket_count
+            result[str(bound)] = cumulative
+        return result
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'p50': self.quantile(0.5), 'p99': self.quantile(0.99),
+                'max': self.max}
+
+
+# Seconds spent in each phase by the command running in the current task, None outside of commands. Tasks started by
+# the command copy the context and add to the same dict.
+phase_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('phase_timings', default=None)
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    """Adds the time spent in the block to `phase` of the running command, does nothing outside of commands"""
+    timings = phase_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+class CommandMetrics:
+    """
+    A histogram per command and phase: `check` (permission and whitelist lookups), `upstream` (Nucleus requests),
+    `discord` (Discord API requests) and `total`. Concurrent requests of one command add up, so a phase can exceed
+    the total.
+    """
+    PHASES = ('check', 'upstream', 'discord', 'total')
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def observe(self, command: str, timings: Dict[str, float], failed: bool = False):
+        for phase in self.PHASES:
+            histogram = self.histograms.get((command, phase))
+            if histogram is None:
+                histogram = self.histograms[(command, phase)] = Histogram()
+            histogram.observe(timings.get(phase, 0.0))
+        if failed:
+            self.errors[command] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        """Phase summaries of every command that has run, keyed by command then phase"""
+        result = defaultdict(dict)
+        for (command, phase), histogram in self.histograms.items():
+            result[command][phase] = histogram.summary()
+        return dict(result)
+
+
+def prometheus_labels(labels: Dict[str, str]) -> str:
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+def prometheus_histogram(name: str, histogram: Histogram, labels: Dict[str, str]) -> List[str]:
+    """The `_bucket`, `_sum` and `_count` sample lines of one labelled histogram"""
+    label_text = prometheus_labels(labels)
+    lines = [f'{name}_bucket{{{label_text},le="{bound}"}} {count}'
+             for bound, count in histogram.cumulative_buckets().items()]
+    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+    return lines
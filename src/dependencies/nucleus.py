@@ -1,9 +1,12 @@
+import hashlib
 import json
+import logging
 from datetime import datetime
 
-import aiohttp
-
 from dependencies.database import Database
+from dependencies.session import EndpointProfile, NucleusSession, Validators
+
+log = logging.getLogger(__name__)
 
 
 class CookiesExpired(Exception):
@@ -11,7 +14,7 @@ class CookiesExpired(Exception):
 
 
 class Nucleus:
-    domain = 'https://nucleus.amcspsgtech.in'
+    domain = EndpointProfile().base_url
     login_url = f'{domain}/oauth'
     server_url = f'{domain}/server'
     oauth_path = '/oauth'
@@ -20,46 +23,90 @@ class Nucleus:
     assignments_path = '/assignment'
     schedule_path = '/schedule/schedule'
     profile_path = '/profile'
-
-    def __init__(self, username: str, cookies: dict = None):
+    # Shared by every instance, the bot swaps this for a configured session and closes it on shutdown
+    session = NucleusSession()
+    # Returned by conditional requests when the response hasn't changed since the last poll
+    NOT_MODIFIED = object()
+
+    @classmethod
+    def use_base_url(cls, base_url: str):
+        """Points every request at another Nucleus deployment, ex: the local stand-in used by the benchmarks"""
+        cls.domain = base_url
+        cls.login_url = f'{base_url}{cls.oauth_path}'
+        cls.server_url = f'{base_url}/server'
+
+    @classmethod
+    def use_profile(cls, profile: EndpointProfile) -> NucleusSession:
+        """Sends every request through a new session configured by the profile and returns that session"""
+        cls.use_base_url(profile.base_url.rstrip('/'))
+        cls.session = NucleusSession(profile)
+        return cls.session
+
+    def __init__(self, username: str, cookies: dict = None, class_id: str = None):
         self.username = username
         self.cookies = cookies
+        self.class_id = class_id
 
     async def __get_request_to_server__(self, headers: dict = None) -> dict:
-        async with aiohttp.request('GET', Nucleus.server_url, headers=headers, cookies=self.cookies) as resp:
-            try:
-                response_bin = await resp.read()
-                response_str = response_bin.decode()
-                response_dict = json.loads(response_str)
-                return response_dict
-            except json.JSONDecodeError:
-                return {}
+        response_bin = await Nucleus.session.get(Nucleus.server_url, headers=headers, cookies=self.cookies)
+        try:
+            response_str = response_bin.decode()
+            response_dict = json.loads(response_str)
+            return response_dict
+        except json.JSONDecodeError:
+            return {}
+
+    async def __get_conditional_request_to_server__(self, headers: dict):
+        """
+        Polls the server with the validators of the previous response for the same account and path.
+
+        Returns `Nucleus.NOT_MODIFIED` when the server answers 304 or the body hashes the same as before, in which case
+        the body isn't parsed at all.
+        """
+        key = (self.username, headers['path'])
+        validators = Nucleus.session.validators.get(key)
+        request_headers = dict(headers)
+        if validators:
+            if validators.etag:
+                request_headers['If-None-Match'] = validators.etag
+            if validators.last_modified:
+                request_headers['If-Modified-Since'] = validators.last_modified
+        status, response_headers, response_bin = await Nucleus.session.get_response(
+            Nucleus.server_url, headers=request_headers, cookies=self.cookies)
+        if status == 304 and validators:
+            return Nucleus.NOT_MODIFIED
+        digest = hashlib.sha1(response_bin).digest()
+        if validators and validators.digest == digest:
+            return Nucleus.NOT_MODIFIED
+        try:
+            response_dict = json.loads(response_bin.decode())
+        except json.JSONDecodeError:
+            return {}
+        Nucleus.session.validators.set(key, Validators(response_headers.get('ETag'),
+                                                       response_headers.get('Last-Modified'), digest))
+        return response_dict
 
     @staticmethod
     async def login(username, password):
-        print(f'Logging in as {username}')
+        log.info('Logging in as %s', username, extra={'event': 'nucleus.login', 'username': username})
         auth_credentials = {
             "rollNo": username,
             "password": password
         }
         headers = {"path": Nucleus.oauth_path}
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url=Nucleus.login_url, data=auth_credentials, headers=headers) as resp:
-                response_bin = await resp.read()
-                response_str = response_bin.decode()
-                try:
-                    response_dict = json.loads(response_str)
-                    # print(response_dict)
-                    cookies_dict = {}
-                    for cookie in session.cookie_jar:
-                        cookies_dict[cookie.key] = cookie.value
-                    if response_dict.get('status') == 'Success':
-                        return Nucleus(username, cookies_dict)
-                    elif response_dict.get('message') == 'Invalid Password':
-                        return 'Invalid Password'
-                    return None
-                except json.JSONDecodeError:
-                    return None
+        response_bin, cookies_dict = await Nucleus.session.post(Nucleus.login_url, data=auth_credentials,
+                                                                headers=headers)
+        try:
+            response_dict = json.loads(response_bin.decode())
+            # print(response_dict)
+            if response_dict.get('status') == 'Success':
+                return Nucleus(username, cookies_dict)
+            elif response_dict.get('message') == 'Invalid Password':
+                return 'Invalid Password'
+            return None
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            # Not the JSON answer of the login API, ex: an HTML error page from a proxy
+            return None
 
     @staticmethod
     async def check_for_expiry(cookies: dict):
@@ -69,14 +116,18 @@ class Nucleus:
         headers = {"path": f'{Nucleus.schedule_path}/{date}', "referrer": f'{Nucleus.domain}/schedule'}
         return self.__get_request_to_server__(headers)
 
-    def assignments(self, course_id: str = 'all'):
+    def assignments(self, course_id: str = 'all', conditional: bool = False):
         headers = {"path": f'{Nucleus.assignments_path}?courseId={course_id}&submissionDetails=true',
                    "referrer": f'{Nucleus.domain}/assignments'}
+        if conditional:
+            return self.__get_conditional_request_to_server__(headers)
         return self.__get_request_to_server__(headers)
 
-    def resources(self, course_id: str):
+    def resources(self, course_id: str, conditional: bool = False):
         headers = {"path": f'{Nucleus.resources_path}?courseId={course_id}',
                    "referrer": f'{Nucleus.domain}/resources?courseId={course_id}'}
+        if conditional:
+            return self.__get_conditional_request_to_server__(headers)
         return self.__get_request_to_server__(headers)
 
     def class_details(self, class_id: str):
@@ -89,9 +140,22 @@ class Nucleus:
                    "referrer": f'{Nucleus.domain}/profile'}
         return self.__get_request_to_server__(headers)
 
-    async def is_expired(self):
-        response = await self.get_profile()
-        if response == {}:
+    async def is_expired(self) -> bool:
+        """
+        Probes the profile. Only a clear rejection counts as expired: a 401/403, or the login page served in place of
+        the JSON. Raises `NucleusUnavailable` or a connection error when Nucleus is down.
+        """
+        headers = {"path": f'{Nucleus.profile_path}',
+                   "referrer": f'{Nucleus.domain}/profile'}
+        status, _response_headers, response_bin = await Nucleus.session.get_response(
+            Nucleus.server_url, headers=headers, cookies=self.cookies)
+        if status in (401, 403):
+            return True
+        if not 200 <= status < 300:
+            return False
+        try:
+            json.loads(response_bin.decode())
+        except (UnicodeDecodeError, json.JSONDecodeError):
             return True
         return False
 
@@ -143,6 +207,7 @@ async def main():
     res = await acc.assignments()
     resp = await acc.get_profile()
     print(res, resp)
+    await Nucleus.session.close()
 
 if __name__ == '__main__':
     import asyncio
@@ -0,0 +1,90 @@
+"""
+    This Module provides the ownership of the detector classes when several bot processes run the detector.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import List, Optional, Set
+
+from dependencies.database import Database
+
+log = logging.getLogger(__name__)
+
+
+def preferred_node(class_id: str, nodes: List[str]) -> str:
+    """Rendezvous hashing, a node joining or leaving only moves the classes it gains or had"""
+    return max(nodes, key=lambda node: hashlib.sha1(f'{class_id}/{node}'.encode()).digest())
+
+
+class DetectorOwnership:
+    """
+    Splits the alert account classes between the live detector nodes and only lets the detector poll the classes
+    this node holds a lease on.
+
+    Every `renew_interval` seconds the node heartbeats in `DETECTOR_NODES`, works out the classes it should own by
+    rendezvous hashing over the nodes seen in the last `node_ttl` seconds, releases the leases it should no longer
+    hold and takes or renews the others for `lease` seconds. A lease held by another node is only taken over once it
+    expires, so a node that dies hands its classes over within `lease` seconds and two nodes never hold the same
+    class. `owns` turns false on its own when the leases couldn't be renewed in time, ex: while the database is down.
+    """
+
+    def __init__(self, db: Database, node_id: str, lease: float = 120, renew_interval: float = 30,
+                 node_ttl: float = 90):
+        self.db = db
+        self.node_id = node_id
+        self.lease = lease
+        self.renew_interval = renew_interval
+        self.node_ttl = node_ttl
+        self.owned: Set[str] = set()
+        self.nodes: List[str] = []
+        self.__expires_at = 0.0
+        self.__task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.__task is not None:
+            return
+        try:
+            await self.refresh()
+        except Exception:
+            log.exception('Detector ownership refresh failed')
+        self.__task = asyncio.ensure_future(self.__run())
+
+    async def close(self):
+        """Gives the classes back at once instead of letting the leases expire"""
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+        self.owned = set()
+        try:
+            await self.db.remove_detector_node(self.node_id)
+        except Exception:
+            log.exception('Releasing the detector leases of %s failed', self.node_id)
+
+    def owns(self, class_id: str) -> bool:
+        return class_id in self.owned and time.monotonic() < self.__expires_at
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception('Detector ownership refresh failed')
+
+    async def refresh(self) -> Set[str]:
+        # Taken before the database sets the expiry, the local deadline never outlives the lease
+        started = time.monotonic()
+        self.nodes = await self.db.heartbeat_detector_node(self.node_id, self.node_ttl)
+        classes = await self.db.get_alert_classes()
+        wanted = [class_id for class_id in classes if preferred_node(class_id, self.nodes) == self.node_id]
+        unwanted = self.owned - set(wanted)
+        if unwanted:
+            await self.db.release_detector_leases(self.node_id, list(unwanted))
+        held = set(await self.db.claim_detector_leases(self.node_id, wanted, self.lease))
+        if held != self.owned:
+            log.info('Detector node %s now owns %d of %d classes across %d nodes: %s', self.node_id, len(held),
+                     len(classes), len(self.nodes), ', '.join(sorted(held)) or '-')
+        self.owned = held
+        self.__expires_at = started + self.lease
+        return held
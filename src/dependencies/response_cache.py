@@ -0,0 +1,85 @@
+"""
+    This Module provides the cache of parsed Nucleus responses used by the user facing commands.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class ResponseCache:
+    """
+    Caches parsed Nucleus responses per endpoint with stale-while-revalidate and single-flight fetching.
+
+    A fresh entry (younger than the endpoint TTL) is returned as is. A stale entry (within `stale_ttl` after that)
+    is returned right away while a single background refresh is started. Concurrent misses for the same key share
+    one upstream request. A caller that joined a shared request which failed `should_cache` fetches again with its
+    own `fetch`, so it doesn't get the error caused by another caller's session.
+    """
+
+    def __init__(self, ttls: Dict[str, float], stale_ttl: float = 600, maxsize: int = 2048):
+        self.ttls = ttls
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+
+    async def get_or_fetch(self, endpoint: str, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                           should_cache: Callable[[Any], bool] = bool) -> Any:
+        """
+        endpoint: str - Name of the endpoint, picks the TTL.
+        key: Hashable - Identifies the response within the endpoint, ex: (class_id, date).
+        fetch: Callable - Coroutine function doing the upstream request.
+        should_cache: Callable - Responses for which this returns False (ex: expired sessions) aren't stored.
+        """
+        cache_key = (endpoint, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            ttl = self.ttls.get(endpoint, 0)
+            if age < ttl:
+                self.hits += 1
+                self._entries.move_to_end(cache_key)
+                return entry[1]
+            if age < ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.__single_flight(cache_key, fetch, should_cache)
+                return entry[1]
+        self.misses += 1
+        joined = cache_key in self._in_flight
+        response = await asyncio.shield(self.__single_flight(cache_key, fetch, should_cache))
+        if joined and not should_cache(response):
+            # The shared fetch ran with the first caller's session, which may be the one at fault
+            response = await self.__fetch(cache_key, fetch, should_cache)
+        return response
+
+    def __single_flight(self, cache_key: Tuple[str, Hashable], fetch: Callable[[], Awaitable[Any]],
+                        should_cache: Callable[[Any], bool]) -> asyncio.Future:
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self.__fetch(cache_key, fetch, should_cache))
+            self._in_flight[cache_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+            # Background refreshes nobody awaits shouldn't log "exception never retrieved"
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def __fetch(self, cache_key: Tuple[str, Hashable], fetch: Callable[[], Awaitable[Any]],
+                      should_cache: Callable[[Any], bool]) -> Any:
+        response = await fetch()
+        if should_cache(response):
+            self._entries[cache_key] = (time.monotonic(), response)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return response
+
+    def invalidate(self, endpoint: str, key: Hashable):
+        self._entries.pop((endpoint, key), None)
+
+    def stats(self) -> dict:
+        return {'size': len(self._entries), 'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses,
+                'in_flight': len(self._in_flight)}
@@ -0,0 +1,46 @@
+"""
+    This Module provides the per account scheduling used by the assignments detector
+so that accounts which fail to refresh are retried with an exponential backoff.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dependencies.database import Database
+
+
+class AccountScheduler:
+    """
+    Tracks the failure state of the alert accounts and decides when an account is eligible to run again.
+
+    The state is persisted in `ALERT_ACCOUNTS` so a restart doesn't reset the backoff and hammer the login endpoint.
+    """
+
+    def __init__(self, db: Database, base_delay: float = 300, max_delay: float = 21600, jitter: float = 0.2):
+        self.db = db
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    @staticmethod
+    def is_due(next_run_at: Optional[datetime], now: datetime = None) -> bool:
+        if next_run_at is None:
+            return True
+        return next_run_at <= (now or datetime.now())
+
+    def backoff_delay(self, failure_count: int) -> float:
+        """Exponential delay for the given number of consecutive failures with +/- jitter applied"""
+        delay = min(self.base_delay * 2 ** max(failure_count - 1, 0), self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def record_failure(self, user_id: str, failure_count: int) -> datetime:
+        """Stores the failure and returns the time after which the account will be retried"""
+        failure_count += 1
+        next_run_at = datetime.now() + timedelta(seconds=self.backoff_delay(failure_count))
+        await self.db.update_alert_account_backoff(user_id, failure_count, next_run_at)
+        return next_run_at
+
+    async def record_success(self, user_id: str, failure_count: int):
+        if failure_count == 0:
+            return
+        await self.db.update_alert_account_backoff(user_id, 0, None)
@@ -0,0 +1,196 @@
+"""
+    This Module provides the long lived HTTP session layer shared by every
+`Nucleus` instance.
+"""
+import asyncio
+import random
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, NamedTuple, Optional, Tuple, TypeVar
+
+import aiohttp
+from multidict import CIMultiDictProxy
+from yarl import URL
+
+from dependencies.metrics import timed_phase
+from dependencies.tracing import span
+
+T = TypeVar('T')
+
+
+class NucleusUnavailable(Exception):
+    """Raised when a GET request still gets a server error once the retries allowed by the profile are spent"""
+
+    def __init__(self, status: int):
+        self.status = status
+        super().__init__(f'Nucleus answered with HTTP {status}')
+
+
+# Redirects followed by `NucleusSession.post`, the same limit aiohttp applies by default
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Everything a request raises when Nucleus is down or unreachable, as opposed to rejecting the session
+UPSTREAM_ERRORS = (NucleusUnavailable, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class EndpointProfile(NamedTuple):
+    """
+    Where the Nucleus requests go and how they are sent, built from the `[nucleus]` section of settings.ini.
+
+    base_url: str - The Nucleus deployment, or a caching proxy / mirror / local stand-in in front of it.
+    connect_timeout: float - Seconds allowed to open a connection, `request_timeout` covers the whole request.
+    max_retries: int - Retries after the first attempt. GET requests are retried on connection errors, timeouts and
+    `retry_statuses`, POST requests only when the connection couldn't be opened so a login is never sent twice. A GET
+    still answered with a server error after that raises `NucleusUnavailable` instead of returning the error page.
+    retry_backoff: float - Delay before the first retry in seconds, doubled on every further retry and jittered.
+    """
+    base_url: str = 'https://nucleus.amcspsgtech.in'
+    conn_limit: int = 100
+    conn_limit_per_host: int = 10
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30
+    connect_timeout: float = 10
+    request_timeout: float = 30
+    max_retries: int = 2
+    retry_backoff: float = 0.5
+    retry_statuses: Tuple[int, ...] = (502, 503, 504)
+
+
+class Validators(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: bytes
+
+
+class ValidatorStore:
+    """
+    Remembers the ETag / Last-Modified headers and the body hash of the last response for every (account, path)
+    pair so repeated polls can be sent as conditional requests and unchanged bodies can be skipped.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._validators: 'OrderedDict[Hashable, Validators]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Validators]:
+        return self._validators.get(key)
+
+    def set(self, key: Hashable, validators: Validators):
+        self._validators[key] = validators
+        self._validators.move_to_end(key)
+        while len(self._validators) > self.maxsize:
+            self._validators.popitem(last=False)
+
+    def forget_account(self, username: str):
+        """Drops every validator of the account so the next poll is a full fetch"""
+        for key in [key for key in self._validators if key[0] == username]:
+            del self._validators[key]
+
+
+class NucleusSession:
+    """
+    Owns a single pooled `aiohttp.ClientSession` for all the requests made to Nucleus.
+
+    The session is created lazily on the first request so that it is bound to the running event loop. A
+    `DummyCookieJar` is used so cookies set for one account never leak into the requests of another, the
+    per-user cookies are passed along with every request instead.
+    """
+
+    def __init__(self, profile: EndpointProfile = EndpointProfile()):
+        self.profile = profile
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.validators = ValidatorStore()
+        self.retries = 0
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            profile = self.profile
+            connector = aiohttp.TCPConnector(limit=profile.conn_limit, limit_per_host=profile.conn_limit_per_host,
+                                             use_dns_cache=True, ttl_dns_cache=profile.dns_cache_ttl,
+                                             keepalive_timeout=profile.keepalive_timeout)
+            timeout = aiohttp.ClientTimeout(total=profile.request_timeout, sock_connect=profile.connect_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar(),
+                                                  timeout=timeout)
+        return self._session
+
+    async def __request(self, method: str, url: str, read: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+                        **kwargs) -> T:
+        """Sends the request, retrying as the profile allows, and returns what `read` makes of the response"""
+        path = (kwargs.get('headers') or {}).get('path', url)
+        with timed_phase('upstream'), span('nucleus', f"{method} {path.split('?')[0]}"):
+            return await self.__send(method, url, read, **kwargs)
+
+    async def __send(self, method: str, url: str, read: Callable[[aiohttp.ClientResponse], Awaitable[T]],
+                     **kwargs) -> T:
+        session = await self.get_session()
+        profile = self.profile
+        idempotent = method == 'GET'
+        for attempt in range(profile.max_retries + 1):
+            last_attempt = attempt == profile.max_retries
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    if not idempotent or resp.status < 500:
+                        return await read(resp)
+                    if last_attempt or resp.status not in profile.retry_statuses:
+                        # The error page would otherwise be taken for the login page of an expired session
+                        raise NucleusUnavailable(resp.status)
+            except aiohttp.ClientConnectorError:
+                # The request never left, safe to send again whatever the method
+                if last_attempt:
+                    raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt or not idempotent:
+                    raise
+            self.retries += 1
+            await asyncio.sleep(profile.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def get(self, url: str, *, headers: dict = None, cookies: dict = None) -> bytes:
+        return await self.__request('GET', url, lambda resp: resp.read(), headers=headers, cookies=cookies)
+
+    async def get_response(self, url: str, *, headers: dict = None,
+                           cookies: dict = None) -> Tuple[int, CIMultiDictProxy, bytes]:
+        """Same as `get` but also returns the status and headers, used for the conditional requests"""
+        async def read(resp: aiohttp.ClientResponse):
+            return resp.status, resp.headers, await resp.read()
+
+        return await self.__request('GET', url, read, headers=headers, cookies=cookies)
+
+    async def post(self, url: str, *, data: dict = None, headers: dict = None,
+                   cookies: dict = None) -> Tuple[bytes, dict]:
+        """
+        Returns the response body along with the cookies set by the server, including the ones set on redirects.
+
+        The redirects are followed here instead of by aiohttp: with the `DummyCookieJar` a cookie set on one hop
+        would otherwise not be sent on the next, ex: a login that sets the session cookie and then redirects to a
+        page checking it.
+        """
+        async def read(resp: aiohttp.ClientResponse):
+            set_cookies = {key: morsel.value for key, morsel in resp.cookies.items()}
+            return resp.status, resp.headers.get('Location'), await resp.read(), set_cookies
+
+        response_cookies = {}
+        method = 'POST'
+        for _ in range(MAX_REDIRECTS + 1):
+            status, location, response_bin, set_cookies = await self.__request(
+                method, url, read, data=data, headers=headers, cookies={**(cookies or {}), **response_cookies},
+                allow_redirects=False)
+            response_cookies.update(set_cookies)
+            if status not in REDIRECT_STATUSES or location is None:
+                break
+            url = str(URL(url).join(URL(location)))
+            # As browsers and aiohttp do, only 307 and 308 send the form again
+            if status not in (307, 308):
+                method, data = 'GET', None
+        # Past the limit the redirect itself is returned, the caller can't parse it and treats it as a failure
+        return response_bin, response_cookies
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # Gives the underlying SSL transports a moment to close cleanly
+            await asyncio.sleep(0.250)
+        self._session = None
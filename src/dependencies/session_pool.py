@@ -0,0 +1,133 @@
+"""
+    This Module provides the pool of logged in alert account sessions used by the assignments detector.
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+from dependencies.database import Database
+from dependencies.nucleus import Nucleus
+from dependencies.scheduler import AccountScheduler
+
+
+class AlertAccount(NamedTuple):
+    password: str
+    class_id: str
+    failure_count: int
+    next_run_at: Optional[datetime]
+    updated_at: datetime
+
+
+class AlertSessionPool:
+    """
+    Keeps a ready to use `Nucleus` session for every alert account and logs in again before the cookies expire.
+
+    The cookie age comes from `ALERT_ACCOUNTS.UPDATED_AT`. Each account is refreshed `refresh_margin` seconds before
+    `cookie_max_age`, minus a random share (`spread`) of its lifetime so accounts logged in together don't all
+    refresh on the same tick. Failed logins and failed detections go through the same `AccountScheduler` backoff,
+    an account in backoff is neither logged in nor polled. The previous session is kept meanwhile since its cookies
+    may still be valid. The detector only reads `ready_sessions` and never logs in.
+    """
+
+    def __init__(self, db: Database, scheduler: AccountScheduler, cookie_max_age: float = 86400,
+                 refresh_margin: float = 3600, spread: float = 0.1, max_concurrent_logins: int = 2):
+        self.db = db
+        self.scheduler = scheduler
+        self.cookie_max_age = cookie_max_age
+        self.refresh_margin = refresh_margin
+        self.spread = spread
+        self.max_concurrent_logins = max_concurrent_logins
+        self.sessions: Dict[str, Nucleus] = {}
+        self.__accounts: Dict[str, AlertAccount] = {}
+        self.__refresh_at: Dict[str, datetime] = {}
+
+    def __next_refresh(self, updated_at: datetime) -> datetime:
+        lifetime = max(self.cookie_max_age - self.refresh_margin, 0)
+        return updated_at + timedelta(seconds=lifetime * (1 - random.uniform(0, self.spread)))
+
+    async def sync(self):
+        """Picks up added, removed and externally updated accounts from the database"""
+        accounts = await self.db.get_alert_accounts()
+        usernames = set()
+        for username, cookies, class_id, password, failure_count, next_run_at, updated_at in accounts:
+            usernames.add(username)
+            updated_at = updated_at or datetime.now()
+            known = self.__accounts.get(username)
+            self.__accounts[username] = AlertAccount(password, class_id, failure_count, next_run_at,
+                                                     max(updated_at, known.updated_at) if known else updated_at)
+            # Rows read before one of our own refreshes are older than the session we already hold
+            if known is None or updated_at > known.updated_at:
+                self.sessions[username] = Nucleus(username, json.loads(cookies), class_id)
+                self.__refresh_at[username] = self.__next_refresh(updated_at)
+        for username in set(self.__accounts) - usernames:
+            del self.__accounts[username]
+            self.sessions.pop(username, None)
+            self.__refresh_at.pop(username, None)
+
+    def ready_sessions(self, class_filter: Callable[[str], bool] = None) -> List[Nucleus]:
+        """The sessions of the accounts not in backoff, only of those whose class passes `class_filter` when given"""
+        now = datetime.now()
+        return [user for username, user in self.sessions.items()
+                if self.scheduler.is_due(self.__accounts[username].next_run_at, now)
+                and (class_filter is None or class_filter(user.class_id))]
+
+    async def record_failure(self, username: str) -> Optional[datetime]:
+        """Backs the account off after a failure, returns the time after which it is retried"""
+        account = self.__accounts.get(username)
+        if account is None:
+            return None
+        next_run_at = await self.scheduler.record_failure(username, account.failure_count)
+        self.__accounts[username] = account._replace(failure_count=account.failure_count + 1, next_run_at=next_run_at)
+        return next_run_at
+
+    async def record_success(self, username: str):
+        account = self.__accounts.get(username)
+        if account is None or account.failure_count == 0:
+            return
+        await self.scheduler.record_success(username, account.failure_count)
+        self.__accounts[username] = account._replace(failure_count=0, next_run_at=None)
+
+    def invalidate(self, username: str):
+        """Drops a session found to be expired, the next `refresh_due` logs in again"""
+        self.sessions.pop(username, None)
+        if username in self.__refresh_at:
+            self.__refresh_at[username] = datetime.now()
+
+    async def refresh_due(self, class_filter: Callable[[str], bool] = None) -> List[Tuple[str, datetime]]:
+        """
+        Logs in every account whose session is missing or close to expiry and isn't in backoff, only the accounts
+        whose class passes `class_filter` when given.
+        Returns the accounts that failed along with the time of their next attempt.
+        """
+        await self.sync()
+        now = datetime.now()
+        due = [username for username, refresh_at in self.__refresh_at.items()
+               if (refresh_at <= now or username not in self.sessions)
+               and self.scheduler.is_due(self.__accounts[username].next_run_at, now)
+               and (class_filter is None or class_filter(self.__accounts[username].class_id))]
+        login_semaphore = asyncio.Semaphore(self.max_concurrent_logins)
+        results = await asyncio.gather(*(self.__refresh(login_semaphore, username) for username in due))
+        return [(username, next_run_at) for username, next_run_at in zip(due, results) if next_run_at is not None]
+
+    async def __refresh(self, login_semaphore: asyncio.Semaphore, username: str) -> Optional[datetime]:
+        account = self.__accounts[username]
+        async with login_semaphore:
+            try:
+                user = await Nucleus.login(username, account.password)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                user = None
+        if not isinstance(user, Nucleus):
+            return await self.record_failure(username)
+        await self.db.update_alert_account(username, json.dumps(user.cookies), account.password)
+        await self.scheduler.record_success(username, account.failure_count)
+        if username not in self.__accounts:
+            return None
+        updated_at = datetime.now()
+        self.__accounts[username] = account._replace(failure_count=0, next_run_at=None, updated_at=updated_at)
+        self.sessions[username] = Nucleus(username, user.cookies, account.class_id)
+        self.__refresh_at[username] = self.__next_refresh(updated_at)
+        return None
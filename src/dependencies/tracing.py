@@ -0,0 +1,232 @@
+"""
+    This Module provides the on demand span tracer used to find where the detector ticks and the commands spend
+their time.
+
+The running trace lives in a `ContextVar`, tasks started while tracing copy the context and record into the same
+trace. Outside of a trace `span` and `tagged` only read the `ContextVar`, so they are left in the hot paths.
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+from dependencies.utils import format_table
+
+T = TypeVar('T')
+TAG_KEYS = ('account', 'course')
+REPORT_KINDS = ('detector', 'command', 'nucleus', 'db', 'discord')
+
+
+class Span(NamedTuple):
+    kind: str
+    name: str
+    duration: float
+    tags: Tuple[Tuple[str, str], ...]
+
+
+class Trace:
+    # Bounds the memory of a single trace, the spans after it are counted but not kept
+    MAX_SPANS = 20000
+
+    def __init__(self, target: str, label: str, capture: int = 0):
+        self.target = target
+        self.label = label
+        # The `arm` call of the tracer that started it
+        self.capture = capture
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def record(self, span: Span):
+        if len(self.spans) < self.MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+current_tags: ContextVar[Tuple[Tuple[str, str], ...]] = ContextVar('current_tags', default=())
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[None]:
+    """Records the time spent in the block as a span of the running trace, does nothing outside of traces"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(Span(kind, name, time.perf_counter() - start, current_tags.get()))
+
+
+@contextmanager
+def tagged(**tags: str) -> Iterator[None]:
+    """Tags the spans recorded in the block, ex: with the account or course they belong to"""
+    if current_trace.get() is None:
+        yield
+        return
+    token = current_tags.set((*current_tags.get(), *tags.items()))
+    try:
+        yield
+    finally:
+        current_tags.reset(token)
+
+
+async def with_tags(awaitable: Awaitable[T], **tags: str) -> T:
+    """Same as `tagged` for an awaitable handed to `asyncio.gather`"""
+    with tagged(**tags):
+        return await awaitable
+
+
+class Tracer:
+    """
+    Traces the next `count` detector ticks or command invocations once armed, each one with a `sample_rate` chance,
+    and hands the report to the callback given to `arm` when the last one ends. With `profile` the detector ticks also
+    run under cProfile, which slows them down noticeably and is meant for short captures.
+    """
+    TARGETS = ('detector', 'command')
+
+    def __init__(self):
+        self.target: Optional[str] = None
+        self.remaining = 0
+        self.sample_rate = 1.0
+        self.profile = False
+        self.traces: List[Trace] = []
+        self.__capture = 0
+        self.__active = 0
+        self.__profile_stats: Optional[pstats.Stats] = None
+        self.__callback: Optional[Callable[[str], Awaitable[None]]] = None
+
+    @property
+    def armed(self) -> bool:
+        return self.target is not None
+
+    def arm(self, target: str, count: int, sample_rate: float = 1.0, profile: bool = False,
+            callback: Callable[[str], Awaitable[None]] = None):
+        if target not in self.TARGETS:
+            raise ValueError(f'Unknown trace target {target}, expected one of {", ".join(self.TARGETS)}')
+        self.target = target
+        self.remaining = count
+        self.sample_rate = sample_rate
+        self.profile = profile and target == 'detector'
+        self.traces = []
+        # The traces still running from an earlier capture are told apart by the id and left out of this one
+        self.__capture += 1
+        self.__active = 0
+        self.__profile_stats = None
+        self.__callback = callback
+
+    def disarm(self) -> Optional[str]:
+        """Stops tracing and returns the report of what was captured so far"""
+        if not self.armed:
+            return None
+        report = self.report() if self.traces else None
+        self.target = None
+        self.remaining = 0
+        return report
+
+    def begin(self, target: str, label: str) -> Optional[Tuple[Trace, Token]]:
+        """Starts a trace in the current context when armed for `target` and sampled, returns the handle for `end`"""
+        if self.target != target or self.remaining <= 0 or random.random() >= self.sample_rate:
+            return None
+        self.remaining -= 1
+        self.__active += 1
+        trace = Trace(target, label, self.__capture)
+        if self.profile:
+            trace.profiler = cProfile.Profile()
+            try:
+                trace.profiler.enable()
+            except ValueError:
+                # Another profiler is already running in this thread
+                trace.profiler = None
+        return trace, current_trace.set(trace)
+
+    def end(self, handle: Optional[Tuple[Trace, Token]]):
+        if handle is None:
+            return
+        trace, token = handle
+        current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace.start
+        if trace.profiler is not None:
+            trace.profiler.disable()
+        if trace.capture != self.__capture:
+            # Started before the tracer was re-armed
+            return
+        if trace.profiler is not None:
+            if self.__profile_stats is None:
+                self.__profile_stats = pstats.Stats(trace.profiler)
+            else:
+                self.__profile_stats.add(trace.profiler)
+        self.__active -= 1
+        if self.target != trace.target:
+            # Disarmed meanwhile
+            return
+        self.traces.append(trace)
+        if self.remaining <= 0 and self.__active <= 0:
+            report = self.report()
+            callback = self.__callback
+            self.target = None
+            if callback is not None:
+                asyncio.ensure_future(callback(report))
+
+    def report(self, slowest: int = 15) -> str:
+        traces = self.traces
+        spans = [span_ for trace in traces for span_ in trace.spans]
+        lines = [f'{self.target} trace: {len(traces)} traced, {sum(trace.duration for trace in traces):.3f} s total, '
+                 f'{len(spans)} spans' + (f' ({sum(trace.dropped for trace in traces)} dropped)'
+                                          if any(trace.dropped for trace in traces) else '')]
+        lines.extend(['', '== Traces (ms) =='])
+        lines.extend(format_table(('trace', 'duration', 'spans'),
+                                  [(trace.label, f'{trace.duration * 1000:.1f}', len(trace.spans))
+                                   for trace in sorted(traces, key=lambda trace: trace.duration, reverse=True)]))
+
+        by_name = defaultdict(list)
+        for span_ in spans:
+            by_name[(span_.kind, span_.name)].append(span_.duration)
+        rows = sorted(by_name.items(), key=lambda item: sum(item[1]), reverse=True)
+        lines.extend(['', '== Spans by total time (ms) =='])
+        lines.extend(format_table(('kind', 'name', 'count', 'total', 'mean', 'max'),
+                                  [(kind, name, len(durations), f'{sum(durations) * 1000:.1f}',
+                                    f'{sum(durations) / len(durations) * 1000:.2f}', f'{max(durations) * 1000:.2f}')
+                                   for (kind, name), durations in rows]))
+
+        lines.extend(['', f'== Slowest {slowest} spans (ms) =='])
+        lines.extend(format_table(('kind', 'name', 'duration', 'tags'),
+                                  [(span_.kind, span_.name, f'{span_.duration * 1000:.2f}',
+                                    ' '.join(f'{key}={value}' for key, value in span_.tags))
+                                   for span_ in sorted(spans, key=lambda span_: span_.duration,
+                                                       reverse=True)[:slowest]]))
+
+        for tag_key in TAG_KEYS:
+            totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            for span_ in spans:
+                for key, value in span_.tags:
+                    if key == tag_key:
+                        totals[value][span_.kind] += span_.duration
+            if not totals:
+                continue
+            kinds = [kind for kind in REPORT_KINDS if any(kind in kind_totals for kind_totals in totals.values())]
+            lines.extend(['', f'== By {tag_key} (total ms) =='])
+            lines.extend(format_table((tag_key, *kinds),
+                                      [(value, *(f'{kind_totals.get(kind, 0.0) * 1000:.1f}' for kind in kinds))
+                                       for value, kind_totals in sorted(totals.items(),
+                                                                        key=lambda item: sum(item[1].values()),
+                                                                        reverse=True)]))
+
+        if self.__profile_stats is not None:
+            stream = io.StringIO()
+            self.__profile_stats.stream = stream
+            self.__profile_stats.sort_stats('cumulative').print_stats(30)
+            lines.extend(['', '== cProfile, top 30 by cumulative time ==', stream.getvalue()])
+        return '\n'.join(lines) + '\n'
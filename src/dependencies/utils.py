@@ -0,0 +1,42 @@
+"""
+    This Module includes the helpers shared by the bot and the Nucleus client.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List
+
+IST = timezone(timedelta(hours=5, minutes=30), 'IST')
+NUCLEUS_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+@lru_cache(maxsize=8192)
+def parse_nucleus_timestamp(timestamp: str, aware: bool = True) -> datetime:
+    """
+    Parses the ISO timestamps sent by Nucleus, ex: `2021-08-10T06:30:00.000Z`.
+
+    The usual millisecond precision strings are sliced directly, anything else goes through `strptime`. Results
+    are memoized since the same timestamps show up on every poll.
+
+    timestamp: str - The timestamp in UTC.
+    aware: bool - Returns an UTC aware datetime when set, a naive UTC datetime (as stored in the database) otherwise.
+    """
+    if len(timestamp) == 24 and timestamp[4] == '-' and timestamp[10] == 'T' and timestamp[19] == '.' \
+            and timestamp[23] == 'Z':
+        parsed = datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]), int(timestamp[11:13]),
+                          int(timestamp[14:16]), int(timestamp[17:19]), int(timestamp[20:23]) * 1000)
+    else:
+        parsed = datetime.strptime(timestamp, NUCLEUS_TIMESTAMP_FORMAT)
+    if aware:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def nucleus_timestamp_to_ist(timestamp: str) -> datetime:
+    """Parses a Nucleus timestamp and converts it to Indian Standard Time for display"""
+    return parse_nucleus_timestamp(timestamp).astimezone(IST)
+
+
+def format_table(header: tuple, rows: list) -> List[str]:
+    """Lines of a fixed width table with the columns padded to their widest cell"""
+    widths = [max(len(str(row[index])) for row in (header, *rows)) for index in range(len(header))]
+    return ['  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)) for row in (header, *rows)]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The bot runs from src/ and imports its packages relative to it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
@@ -0,0 +1,101 @@
+"""Stand-ins for the database and the bot, enough for `NucleusCog` to run its detector against `fake_nucleus`"""
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict
+
+from benchmarks.fake_nucleus import PASSWORD, SESSION_COOKIE, FakeNucleus
+from dependencies.tracing import Tracer
+from dependencies.utils import parse_nucleus_timestamp
+
+
+class InMemoryDatabase:
+    """The subset of `Database` used by the detector, kept in dictionaries"""
+
+    def __init__(self):
+        self.healthy = True
+        self.alert_accounts: Dict[str, list] = {}
+        self.courses: Dict[str, Dict[str, list]] = defaultdict(dict)
+        self.alert_channels: Dict[str, list] = defaultdict(list)
+        self.outbox: Dict[tuple, tuple] = {}
+
+    async def get_alert_accounts(self):
+        return [(username, *account) for username, account in self.alert_accounts.items()]
+
+    async def update_alert_account(self, user_id: str, cookies: str, password: str):
+        self.alert_accounts[user_id][0] = cookies
+        self.alert_accounts[user_id][2] = password
+        self.alert_accounts[user_id][5] = datetime.now()
+
+    async def update_alert_account_backoff(self, user_id: str, failure_count: int, next_run_at):
+        self.alert_accounts[user_id][3:5] = [failure_count, next_run_at]
+
+    async def get_courses_last_checked(self, class_id: str) -> dict:
+        return {course_id: tuple(last_checked) for course_id, last_checked in self.courses[class_id].items()}
+
+    async def record_detection(self, assignment_updates, resource_updates, alerts):
+        for index, updates in enumerate((assignment_updates, resource_updates)):
+            for class_id, course_id, new_date in updates:
+                last_checked = self.courses[class_id][course_id]
+                last_checked[index] = max(last_checked[index], new_date)
+        for alert in alerts:
+            self.outbox.setdefault((alert[2], alert[4], alert[5]), alert)
+
+    async def get_alert_details(self, class_id: str):
+        return self.alert_channels[class_id]
+
+
+class RecordingHTTP:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, channel_id: int, content: str, **kwargs):
+        self.messages.append((channel_id, content))
+
+
+class StubBot:
+    def __init__(self, db: InMemoryDatabase):
+        self.db = db
+        self.http = RecordingHTTP()
+        self.alert_dispatcher = SimpleNamespace(wake=lambda: None)
+        self.tracer = Tracer()
+        self.detector_ownership = SimpleNamespace(owns=lambda class_id: True)
+        self.configs = SimpleNamespace(
+            detector_max_accounts=5, detector_account_timeout=300, detector_backoff_base=300,
+            detector_backoff_max=21600, detector_backoff_jitter=0.2, detector_keepalive_interval=60,
+            detector_cookie_max_age=86400, detector_cookie_refresh_margin=3600, detector_cookie_refresh_spread=0.1,
+            detector_max_logins=2, cache_ttls={'schedule': 300, 'assignments': 60, 'resources': 300, 'profile': 3600},
+            cache_stale_ttl=600)
+        self.__never_ready = asyncio.Event()
+
+    async def wait_until_ready(self):
+        # Keeps the cog's own loops idle, the tests run the ticks themselves
+        await self.__never_ready.wait()
+
+    def get_channel(self, _channel_id):
+        return None
+
+    def get_guild(self, _guild_id):
+        return None
+
+
+def seed(db: InMemoryDatabase, fake: FakeNucleus):
+    """One alert channel per class, watermarks at the latest upload and a logged in account per synthetic user"""
+    channel_id = 10 ** 17
+    for synthetic_class in fake.classes.values():
+        channel_id += 1
+        db.alert_channels[synthetic_class.class_id] = [(channel_id, channel_id, channel_id)]
+        for course in synthetic_class.courses:
+            course_id = course['courseId']
+            assignments = [parse_nucleus_timestamp(assignment['addedOn'], aware=False)
+                           for assignment in synthetic_class.assignments if assignment['courseId'] == course_id]
+            resources = [parse_nucleus_timestamp(resource['details']['addedOn'], aware=False)
+                         for resource in synthetic_class.resources[course_id]]
+            db.courses[synthetic_class.class_id][course_id] = [max(assignments, default=datetime.min),
+                                                               max(resources, default=datetime.min)]
+        for username in synthetic_class.usernames:
+            cookies = json.dumps({SESSION_COOKIE: fake.login(username)})
+            # Cookies, class, password, failure count, next run, updated at
+            db.alert_accounts[username] = [cookies, synthetic_class.class_id, PASSWORD, 0, None, datetime.now()]
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot.alert_dispatcher import AlertDispatcher
+from dependencies.database import OutboxAlert
+
+CHANNEL_ID = 30
+
+
+class OutboxDatabase:
+    """Hands out the given alerts once and records what the dispatcher does with them"""
+
+    def __init__(self, alerts):
+        self.alerts = alerts
+        self.sent = []
+        self.retried = []
+        self.mentioned = []
+
+    async def claim_alerts(self, batch_size, lease, max_attempts):
+        alerts, self.alerts = self.alerts, []
+        return alerts
+
+    async def mark_alerts_sent(self, alert_ids):
+        self.sent.extend(alert_ids)
+
+    async def mark_alerts_mentioned(self, alert_ids):
+        self.mentioned.extend(alert_ids)
+
+    async def retry_alerts(self, alert_ids, delay):
+        self.retried.extend(alert_ids)
+
+
+class RecordingHTTP:
+    def __init__(self, fail_on: int = None):
+        self.messages = []
+        self.fail_on = fail_on
+
+    async def request(self, route, json):
+        if len(self.messages) == self.fail_on:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason='Internal Server Error'), 'down')
+        self.messages.append((json.get('content'), [embed['title'] for embed in json['embeds']]))
+
+
+def alert(alert_id: int, role_id: int, item_type: str = 'assignment', mentioned: bool = False) -> OutboxAlert:
+    return OutboxAlert(alert_id, 10, CHANNEL_ID, role_id, item_type, {'title': f'item {alert_id}'}, mentioned)
+
+
+def dispatch(alerts, http: RecordingHTTP):
+    # No guild in the cache, as in a process that doesn't hold the guild's shard
+    bot = SimpleNamespace(http=http, get_guild=lambda guild_id: None)
+    db = OutboxDatabase(alerts)
+    asyncio.run(AlertDispatcher(bot, db).dispatch_once())
+    return db
+
+
+def test_roles_sharing_a_channel_are_pinged_separately():
+    http = RecordingHTTP()
+    db = dispatch([alert(1, 1), alert(2, 2, 'resource'), alert(3, 1), alert(4, 2, mentioned=True)], http)
+    assert http.messages == [('<@&1> - Assignments', ['item 1', 'item 3']),
+                             ('<@&2> - Assignments + Resources', ['item 2', 'item 4'])]
+    assert db.sent == [1, 3, 2, 4]
+
+
+def test_a_failed_group_holds_back_the_rest_of_the_channel():
+    http = RecordingHTTP(fail_on=0)
+    db = dispatch([alert(1, 1), alert(2, 2)], http)
+    assert http.messages == []
+    assert db.sent == []
+    assert db.retried == [1, 2]
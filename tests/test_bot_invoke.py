@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot.bot import Bot
+from dependencies.log import correlation_id
+from dependencies.metrics import CommandMetrics, phase_timings
+from dependencies.tracing import Tracer, current_trace
+
+
+class UnavailableDatabase:
+    is_ready = False
+
+    async def wait_until_ready(self):
+        raise ConnectionError('database down')
+
+
+def test_context_is_restored_when_the_command_never_starts():
+    bot = SimpleNamespace(db=UnavailableDatabase(), tracer=Tracer(), command_metrics=CommandMetrics(),
+                          dispatch=lambda *args: None)
+    ctx = SimpleNamespace(command=SimpleNamespace(qualified_name='ping'), message=SimpleNamespace(id=1))
+
+    async def invoke():
+        with pytest.raises(ConnectionError):
+            await Bot.invoke(bot, ctx)
+        return correlation_id.get(), phase_timings.get(), current_trace.get()
+
+    assert asyncio.run(invoke()) == (None, None, None)
+    assert bot.command_metrics.errors['ping'] == 1
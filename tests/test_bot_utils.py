@@ -0,0 +1,34 @@
+import discord
+
+from bot.bot_utils import MAX_EMBED_CHARACTERS, MAX_EMBEDS_PER_MESSAGE, pack_embeds
+
+
+def embed(characters: int) -> discord.Embed:
+    return discord.Embed(title='t', description='d' * (characters - 1))
+
+
+def test_empty():
+    assert pack_embeds([]) == []
+
+
+def test_count_limit():
+    embeds = [embed(10) for _ in range(MAX_EMBEDS_PER_MESSAGE * 2 + 1)]
+    messages = pack_embeds(embeds)
+    assert [len(message) for message in messages] == [MAX_EMBEDS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, 1]
+
+
+def test_character_limit():
+    embeds = [embed(2500) for _ in range(5)]
+    messages = pack_embeds(embeds)
+    assert [len(message) for message in messages] == [2, 2, 1]
+    assert all(sum(len(item) for item in message) <= MAX_EMBED_CHARACTERS for message in messages)
+
+
+def test_order_is_kept():
+    embeds = [embed(1000 * (index % 3 + 1)) for index in range(12)]
+    assert [item for message in pack_embeds(embeds) for item in message] == embeds
+
+
+def test_oversized_embed_gets_its_own_message():
+    embeds = [embed(10), embed(MAX_EMBED_CHARACTERS), embed(10)]
+    assert [len(message) for message in pack_embeds(embeds)] == [1, 1, 1]
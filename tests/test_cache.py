@@ -0,0 +1,58 @@
+from dependencies.database.cache import TTLCache
+
+
+def test_get_returns_set_value():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set('key', 1)
+    assert cache.get('key') == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_missing_and_expired_entries():
+    cache = TTLCache(maxsize=4, ttl=-1)
+    assert cache.get('key') is TTLCache.MISSING
+    cache.set('key', 1)
+    assert cache.get('key') is TTLCache.MISSING
+    assert cache.stats()['misses'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is TTLCache.MISSING
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_set_with_stale_generation_is_dropped():
+    cache = TTLCache(maxsize=4, ttl=60)
+    generation = cache.generation
+    # An invalidation lands while the database is queried
+    cache.invalidate('key')
+    cache.set('key', 'stale', generation)
+    assert cache.get('key') is TTLCache.MISSING
+    cache.set('key', 'fresh', cache.generation)
+    assert cache.get('key') == 'fresh'
+
+
+def test_invalidate_where_drops_matching_keys():
+    cache = TTLCache(maxsize=8, ttl=60)
+    cache.set((1, 2), 'a')
+    cache.set((3, 4), 'b')
+    generation = cache.generation
+    cache.invalidate_where(lambda key: 1 in key)
+    assert cache.generation == generation + 1
+    assert cache.get((1, 2)) is TTLCache.MISSING
+    assert cache.get((3, 4)) == 'b'
+
+
+def test_clear_bumps_generation():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set('key', 1)
+    generation = cache.generation
+    cache.clear()
+    cache.set('key', 2, generation)
+    assert cache.get('key') is TTLCache.MISSING
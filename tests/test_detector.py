@@ -0,0 +1,87 @@
+"""Runs the real detector against the local Nucleus stand-in, with an in-memory database"""
+import asyncio
+
+from benchmarks.fake_nucleus import FakeNucleus, generate_classes
+from bot.cogs.nucleus_cog import ADMIN_CHANNEL_ID, NucleusCog
+from dependencies.nucleus import Nucleus
+from dependencies.session import EndpointProfile
+from doubles import InMemoryDatabase, StubBot, seed
+
+
+def run_with_detector(scenario, **fake_options):
+    async def run():
+        fake = FakeNucleus(generate_classes(1, 3, 2), **fake_options)
+        domain, session = Nucleus.domain, Nucleus.session
+        Nucleus.use_profile(EndpointProfile(await fake.start(), max_retries=0))
+        db = InMemoryDatabase()
+        seed(db, fake)
+        cog = NucleusCog(StubBot(db))
+        try:
+            await cog.session_pool.sync()
+            return await scenario(cog, fake, db)
+        finally:
+            cog.assignments_detector.cancel()
+            cog.cookie_keepalive.cancel()
+            await Nucleus.session.close()
+            Nucleus.use_base_url(domain)
+            Nucleus.session = session
+            await fake.close()
+
+    return asyncio.run(run())
+
+
+def test_new_items_are_queued_once():
+    async def scenario(cog, fake, db):
+        synthetic_class = next(iter(fake.classes.values()))
+        await cog.assignments_detector.coro(cog)
+        nothing_new = len(db.outbox)
+        synthetic_class.upload(assignments=1, resources=1)
+        await cog.assignments_detector.coro(cog)
+        queued = len(db.outbox)
+        await cog.assignments_detector.coro(cog)
+        return nothing_new, queued, len(db.outbox), fake.not_modified
+
+    nothing_new, queued, requeued, not_modified = run_with_detector(scenario)
+    assert nothing_new == 0
+    # One assignment and one resource for the single alert channel of the class
+    assert queued == 2
+    assert requeued == 2
+    assert not_modified > 0
+
+
+def test_expired_sessions_are_dropped():
+    async def scenario(cog, fake, db):
+        fake.sessions.clear()
+        await cog.assignments_detector.coro(cog)
+        return set(cog.session_pool.sessions), [account[3] for account in db.alert_accounts.values()]
+
+    sessions, failure_counts = run_with_detector(scenario)
+    assert sessions == set()
+    # An expired session isn't a Nucleus failure, the accounts aren't backed off
+    assert failure_counts == [0, 0, 0]
+
+
+def test_server_errors_keep_the_session_and_back_off():
+    async def scenario(cog, fake, db):
+        await cog.assignments_detector.coro(cog)
+        return (set(cog.session_pool.sessions), cog.session_pool.ready_sessions(),
+                [account[3] for account in db.alert_accounts.values()])
+
+    sessions, ready, failure_counts = run_with_detector(scenario, error_rate=1.0)
+    # A Nucleus outage isn't taken for expired sessions, the accounts are backed off instead
+    assert len(sessions) == 3
+    assert ready == []
+    assert failure_counts == [1, 1, 1]
+
+
+def test_failed_cookie_refreshes_are_reported_by_channel_id():
+    async def scenario(cog, fake, db):
+        username = next(iter(db.alert_accounts))
+        del cog.session_pool.sessions[username]
+        await cog.cookie_keepalive.coro(cog)
+        return username, cog.bot.http.messages
+
+    username, messages = run_with_detector(scenario, error_rate=1.0)
+    # The stand-in bot caches no channel, as in a process that doesn't hold the admin channel's shard
+    assert [channel_id for channel_id, _ in messages] == [ADMIN_CHANNEL_ID]
+    assert f'`{username}`' in messages[0][1]
@@ -0,0 +1,55 @@
+"""`Nucleus.login` against small stand-ins for the login endpoint"""
+import asyncio
+
+from aiohttp import web
+
+from dependencies.nucleus import Nucleus
+from dependencies.session import EndpointProfile
+
+
+def login_with(handlers: dict):
+    async def run():
+        app = web.Application()
+        for path, handler in handlers.items():
+            app.router.add_route('*', path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        domain, session = Nucleus.domain, Nucleus.session
+        Nucleus.use_profile(EndpointProfile(f'http://127.0.0.1:{port}', max_retries=0))
+        try:
+            return await Nucleus.login('21z201', 'password')
+        finally:
+            await Nucleus.session.close()
+            Nucleus.use_base_url(domain)
+            Nucleus.session = session
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_cookies_set_on_redirects_are_kept():
+    async def oauth(request):
+        response = web.HTTPFound('/oauth/callback')
+        response.set_cookie('state', 'started')
+        return response
+
+    async def callback(request):
+        if request.cookies.get('state') != 'started':
+            return web.json_response({'status': 'Failed'})
+        response = web.json_response({'status': 'Success'})
+        response.set_cookie('connect.sid', 'session')
+        return response
+
+    user = login_with({'/oauth': oauth, '/oauth/callback': callback})
+    assert isinstance(user, Nucleus)
+    assert user.cookies == {'state': 'started', 'connect.sid': 'session'}
+
+
+def test_undecodable_answer_is_a_failed_login():
+    async def oauth(request):
+        return web.Response(body=b'\xff\xfe<html>', content_type='text/html')
+
+    assert login_with({'/oauth': oauth}) is None
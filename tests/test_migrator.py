@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from dependencies.database.migrator import MIGRATIONS_PATH, discover_migrations, migrate
+
+
+class RecordingConnection:
+    """Records the statements run by `migrate`, with `applied` as the versions already in SCHEMA_MIGRATIONS"""
+
+    def __init__(self, applied=()):
+        self.applied = set(applied)
+        self.statements = []
+
+    async def execute(self, query: str, *args):
+        self.statements.append(query)
+        if query.startswith('INSERT INTO "SCHEMA_MIGRATIONS"'):
+            self.applied.add(args[0])
+
+    async def fetch(self, query: str, *args):
+        return [(version,) for version in sorted(self.applied)]
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def write_migrations(path, *names):
+    for name in names:
+        (path / name).write_text(f'-- {name}')
+
+
+def test_discovery_sorts_by_version_and_skips_other_files(tmp_path):
+    write_migrations(tmp_path, '0010_later.sql', '0002_second.sql', '0001_first.sql', 'README.md', '12_short.sql',
+                     '0003_notes.txt')
+    migrations = discover_migrations(tmp_path)
+    assert [(migration.version, migration.name) for migration in migrations] == [(1, 'first'), (2, 'second'),
+                                                                                  (10, 'later')]
+
+
+def test_duplicate_versions_are_rejected(tmp_path):
+    write_migrations(tmp_path, '0001_first.sql', '0001_other.sql')
+    with pytest.raises(ValueError):
+        discover_migrations(tmp_path)
+
+
+def test_shipped_migrations_are_numbered_without_gaps():
+    versions = [migration.version for migration in discover_migrations(MIGRATIONS_PATH)]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_pending_migrations_are_applied_in_order(tmp_path):
+    write_migrations(tmp_path, '0003_third.sql', '0001_first.sql', '0002_second.sql')
+    connection = RecordingConnection(applied={1})
+    applied = asyncio.run(migrate(connection, path=tmp_path))
+    assert [migration.version for migration in applied] == [2, 3]
+    scripts = [statement for statement in connection.statements if statement.startswith('-- ')]
+    assert scripts == ['-- 0002_second.sql', '-- 0003_third.sql']
+    assert connection.applied == {1, 2, 3}
+    # The advisory lock is held around the whole run
+    assert 'pg_advisory_lock' in connection.statements[0]
+    assert 'pg_advisory_unlock' in connection.statements[-1]
+
+
+def test_target_stops_at_version(tmp_path):
+    write_migrations(tmp_path, '0001_first.sql', '0002_second.sql', '0003_third.sql')
+    connection = RecordingConnection()
+    applied = asyncio.run(migrate(connection, target=2, path=tmp_path))
+    assert [migration.version for migration in applied] == [1, 2]
+    assert asyncio.run(migrate(connection, path=tmp_path))[0].version == 3
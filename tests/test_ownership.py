@@ -0,0 +1,37 @@
+from collections import Counter
+
+from dependencies.ownership import preferred_node
+
+CLASSES = [f'{year}P{letter}' for year in range(18, 24) for letter in 'ABCDEFGHIJ']
+
+
+def test_independent_of_node_order():
+    nodes = ['a:1', 'b:2', 'c:3']
+    for class_id in CLASSES:
+        assert preferred_node(class_id, nodes) == preferred_node(class_id, list(reversed(nodes)))
+
+
+def test_single_node_owns_everything():
+    assert {preferred_node(class_id, ['only']) for class_id in CLASSES} == {'only'}
+
+
+def test_every_node_gets_a_share():
+    nodes = ['a:1', 'b:2', 'c:3']
+    shares = Counter(preferred_node(class_id, nodes) for class_id in CLASSES)
+    assert set(shares) == set(nodes)
+    assert min(shares.values()) >= len(CLASSES) // len(nodes) // 2
+
+
+def test_leaving_node_only_moves_its_own_classes():
+    nodes = ['a:1', 'b:2', 'c:3']
+    before = {class_id: preferred_node(class_id, nodes) for class_id in CLASSES}
+    after = {class_id: preferred_node(class_id, ['a:1', 'c:3']) for class_id in CLASSES}
+    moved = {class_id for class_id in CLASSES if before[class_id] != after[class_id]}
+    assert moved == {class_id for class_id, node in before.items() if node == 'b:2'}
+
+
+def test_joining_node_only_takes_classes():
+    nodes = ['a:1', 'b:2']
+    before = {class_id: preferred_node(class_id, nodes) for class_id in CLASSES}
+    after = {class_id: preferred_node(class_id, nodes + ['c:3']) for class_id in CLASSES}
+    assert all(after[class_id] in (before[class_id], 'c:3') for class_id in CLASSES)
@@ -0,0 +1,116 @@
+import asyncio
+
+from dependencies.response_cache import ResponseCache
+
+
+def has_data(response) -> bool:
+    return 'data' in response
+
+
+class Upstream:
+    def __init__(self, response=None, delay: float = 0.01):
+        self.response = response if response is not None else {'data': 1}
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.response
+
+
+def backdate(cache: ResponseCache, endpoint: str, key, seconds: float):
+    created, response = cache._entries[(endpoint, key)]
+    cache._entries[(endpoint, key)] = (created - seconds, response)
+
+
+def test_fresh_hit():
+    async def run():
+        cache = ResponseCache({'schedule': 60})
+        upstream = Upstream()
+        assert await cache.get_or_fetch('schedule', 'k', upstream.fetch, has_data) == {'data': 1}
+        assert await cache.get_or_fetch('schedule', 'k', upstream.fetch, has_data) == {'data': 1}
+        return upstream.calls, cache.stats()
+
+    calls, stats = asyncio.run(run())
+    assert calls == 1
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_concurrent_misses_share_one_request():
+    async def run():
+        cache = ResponseCache({'schedule': 60})
+        upstream = Upstream()
+        responses = await asyncio.gather(*(cache.get_or_fetch('schedule', 'k', upstream.fetch, has_data)
+                                           for _ in range(5)))
+        return upstream.calls, responses
+
+    calls, responses = asyncio.run(run())
+    assert calls == 1
+    assert responses == [{'data': 1}] * 5
+
+
+def test_stale_entry_is_served_while_refreshing():
+    async def run():
+        cache = ResponseCache({'schedule': 60}, stale_ttl=600)
+        await cache.get_or_fetch('schedule', 'k', Upstream({'data': 'old'}).fetch, has_data)
+        backdate(cache, 'schedule', 'k', 120)
+        refreshed = Upstream({'data': 'new'})
+        stale = await cache.get_or_fetch('schedule', 'k', refreshed.fetch, has_data)
+        # A second stale read joins the refresh already running
+        await cache.get_or_fetch('schedule', 'k', refreshed.fetch, has_data)
+        await asyncio.sleep(0.05)
+        fresh = await cache.get_or_fetch('schedule', 'k', refreshed.fetch, has_data)
+        return stale, fresh, refreshed.calls, cache.stats()
+
+    stale, fresh, calls, stats = asyncio.run(run())
+    assert stale == {'data': 'old'}
+    assert fresh == {'data': 'new'}
+    assert calls == 1
+    assert stats['stale_hits'] == 2
+
+
+def test_expired_entry_is_fetched_again():
+    async def run():
+        cache = ResponseCache({'schedule': 60}, stale_ttl=600)
+        await cache.get_or_fetch('schedule', 'k', Upstream({'data': 'old'}).fetch, has_data)
+        backdate(cache, 'schedule', 'k', 1000)
+        return await cache.get_or_fetch('schedule', 'k', Upstream({'data': 'new'}).fetch, has_data)
+
+    assert asyncio.run(run()) == {'data': 'new'}
+
+
+def test_failed_responses_are_not_cached():
+    async def run():
+        cache = ResponseCache({'schedule': 60})
+        failing = Upstream({})
+        await cache.get_or_fetch('schedule', 'k', failing.fetch, has_data)
+        await cache.get_or_fetch('schedule', 'k', failing.fetch, has_data)
+        return failing.calls, cache.stats()['size']
+
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_waiters_fetch_with_their_own_session_when_the_shared_fetch_fails():
+    async def run():
+        cache = ResponseCache({'schedule': 60})
+        expired, valid = Upstream({}), Upstream({'data': 1})
+        responses = await asyncio.gather(cache.get_or_fetch('schedule', 'k', expired.fetch, has_data),
+                                         cache.get_or_fetch('schedule', 'k', valid.fetch, has_data))
+        return responses, expired.calls, valid.calls
+
+    responses, expired_calls, valid_calls = asyncio.run(run())
+    assert responses == [{}, {'data': 1}]
+    assert (expired_calls, valid_calls) == (1, 1)
+
+
+def test_invalidate():
+    async def run():
+        cache = ResponseCache({'profile': 60})
+        upstream = Upstream()
+        await cache.get_or_fetch('profile', 'user', upstream.fetch, has_data)
+        cache.invalidate('profile', 'user')
+        await cache.get_or_fetch('profile', 'user', upstream.fetch, has_data)
+        return upstream.calls
+
+    assert asyncio.run(run()) == 2
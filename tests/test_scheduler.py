@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from dependencies.scheduler import AccountScheduler
+
+
+class BackoffStore:
+    def __init__(self):
+        self.updates = []
+
+    async def update_alert_account_backoff(self, user_id: str, failure_count: int, next_run_at):
+        self.updates.append((user_id, failure_count, next_run_at))
+
+
+def test_is_due():
+    now = datetime(2021, 8, 10, 12)
+    assert AccountScheduler.is_due(None, now)
+    assert AccountScheduler.is_due(now, now)
+    assert AccountScheduler.is_due(now - timedelta(seconds=1), now)
+    assert not AccountScheduler.is_due(now + timedelta(seconds=1), now)
+
+
+@pytest.mark.parametrize('failure_count, delay', [(0, 300), (1, 300), (2, 600), (3, 1200), (10, 21600)])
+def test_exponential_delay_is_capped(failure_count, delay):
+    scheduler = AccountScheduler(BackoffStore(), base_delay=300, max_delay=21600, jitter=0)
+    assert scheduler.backoff_delay(failure_count) == delay
+
+
+def test_jitter_bounds():
+    scheduler = AccountScheduler(BackoffStore(), base_delay=100, max_delay=1000, jitter=0.2)
+    delays = [scheduler.backoff_delay(1) for _ in range(200)]
+    assert all(80 <= delay <= 120 for delay in delays)
+
+
+def test_record_failure_persists_the_next_attempt():
+    store = BackoffStore()
+    scheduler = AccountScheduler(store, base_delay=300, max_delay=21600, jitter=0)
+    before = datetime.now()
+    next_run_at = asyncio.run(scheduler.record_failure('19PW01', 2))
+    assert store.updates == [('19PW01', 3, next_run_at)]
+    assert before + timedelta(seconds=1200) <= next_run_at <= datetime.now() + timedelta(seconds=1200)
+
+
+def test_record_success_resets_only_after_failures():
+    store = BackoffStore()
+    scheduler = AccountScheduler(store)
+    asyncio.run(scheduler.record_success('19PW01', 0))
+    assert store.updates == []
+    asyncio.run(scheduler.record_success('19PW01', 4))
+    assert store.updates == [('19PW01', 0, None)]
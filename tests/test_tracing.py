@@ -0,0 +1,31 @@
+import asyncio
+
+from dependencies.tracing import Tracer
+
+
+def test_rearming_leaves_out_the_traces_of_the_earlier_capture():
+    async def capture():
+        reports = []
+
+        async def callback(report):
+            reports.append(report)
+
+        tracer = Tracer()
+        tracer.arm('command', 1)
+        stale = tracer.begin('command', 'stale')
+        tracer.arm('command', 2, callback=callback)
+        first = tracer.begin('command', 'first')
+        tracer.end(stale)
+        second = tracer.begin('command', 'second')
+        tracer.end(first)
+        # The stale trace ending doesn't count towards this capture, it only completes with the second trace
+        assert tracer.armed
+        tracer.end(second)
+        await asyncio.sleep(0)
+        return tracer, reports
+
+    tracer, reports = asyncio.run(capture())
+    assert not tracer.armed
+    assert [trace.label for trace in tracer.traces] == ['first', 'second']
+    assert len(reports) == 1
+    assert 'command trace: 2 traced' in reports[0]
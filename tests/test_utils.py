@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from dependencies.utils import IST, format_table, nucleus_timestamp_to_ist, parse_nucleus_timestamp
+
+
+def test_millisecond_timestamp():
+    assert parse_nucleus_timestamp('2021-08-10T06:30:00.123Z') == datetime(2021, 8, 10, 6, 30, 0, 123000,
+                                                                            tzinfo=timezone.utc)
+
+
+def test_naive_timestamp():
+    parsed = parse_nucleus_timestamp('2021-08-10T06:30:00.000Z', aware=False)
+    assert parsed == datetime(2021, 8, 10, 6, 30)
+    assert parsed.tzinfo is None
+
+
+@pytest.mark.parametrize('timestamp', ['2021-08-10T06:30:00.5Z', '2021-08-10T06:30:00.123456Z'])
+def test_other_precisions_match_strptime(timestamp):
+    expected = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+    assert parse_nucleus_timestamp(timestamp) == expected
+
+
+def test_invalid_timestamp():
+    with pytest.raises(ValueError):
+        parse_nucleus_timestamp('10/08/2021 06:30')
+
+
+def test_ist_conversion():
+    converted = nucleus_timestamp_to_ist('2021-08-10T20:00:00.000Z')
+    assert converted.tzinfo is IST
+    assert (converted.day, converted.hour, converted.minute) == (11, 1, 30)
+
+
+def test_format_table_pads_columns():
+    assert format_table(('name', 'n'), [('a', 10), ('long name', 2)]) == ['name       n ',
+                                                                           'a          10',
+                                                                           'long name  2 ']